@@ -0,0 +1,132 @@
+"""Benchmark the login, registration, session check and logout hot paths.
+
+Usage (from the benchmarks directory):
+
+    python auth_hot_paths.py --users 1000 --ops 2000 --concurrency 20
+
+Each operation is run `--ops` times (`--registrations` times for registration,
+which pays the full bcrypt cost) with at most `--concurrency` in flight, and
+reports throughput, latency percentiles and database queries per operation.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from harness import PASSWORD, create_users, new_state, percentiles, reset_database
+from reflex.config import get_config
+from reflex.model import get_async_engine, get_engine
+from reflex_local_auth import LocalAuthState, LoginState, RegistrationState, db
+from sqlalchemy import event
+
+_queries = 0
+
+
+def _count_query(*args) -> None:
+    global _queries
+    _queries += 1
+
+
+def _install_query_counter() -> None:
+    event.listen(get_engine(), "before_cursor_execute", _count_query)
+    if get_config().async_db_url is not None:
+        event.listen(
+            get_async_engine(None).sync_engine, "before_cursor_execute", _count_query
+        )
+
+
+async def _run(
+    name: str,
+    count: int,
+    concurrency: int,
+    operation: Callable[[int], Awaitable[object]],
+) -> None:
+    global _queries
+    semaphore = asyncio.Semaphore(concurrency)
+    timings: list[float] = []
+
+    async def timed(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await operation(i)
+            timings.append(time.perf_counter() - start)
+
+    _queries = 0
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(count)))
+    elapsed = time.perf_counter() - start
+    latency = percentiles(timings)
+    print(
+        f"{name:<20} {count:>7} {count / elapsed:>10.1f} "
+        f"{latency['p50']:>9.2f} {latency['p95']:>9.2f} {latency['p99']:>9.2f} "
+        f"{_queries / count:>11.2f}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    usernames = create_users(args.users)
+    tokens = [f"client-{i}" for i in range(args.ops)]
+
+    async def register(i: int) -> None:
+        state = new_state(RegistrationState, f"register-{i}")
+        form = {"username": f"new{i}", "password": PASSWORD}
+        form["confirm_password"] = PASSWORD
+        await RegistrationState.handle_registration.fn(state, form)
+        assert state.new_user_id >= 0, state.error_message
+
+    async def login(i: int) -> None:
+        state = new_state(LoginState, tokens[i])
+        form = {"username": usernames[i % len(usernames)], "password": PASSWORD}
+        await LoginState.on_submit.fn(state, form)
+        assert state.error_message == "", state.error_message
+
+    def check_session(i: int) -> None:
+        state = new_state(LocalAuthState, tokens[i])
+        state.auth_token = tokens[i]
+        assert state.is_authenticated
+
+    def logout(i: int) -> None:
+        state = new_state(LocalAuthState, tokens[i])
+        state.auth_token = tokens[i]
+        LocalAuthState.do_logout.fn(state)
+
+    print(
+        f"{'operation':<20} {'count':>7} {'ops/s':>10} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries/op':>11}"
+    )
+    await _run("register", args.registrations, args.concurrency, register)
+    await _run("login", args.ops, args.concurrency, login)
+    # Sync paths run in threads, like they would across several backend workers.
+    await _run(
+        "authenticated_user",
+        args.ops,
+        args.concurrency,
+        lambda i: asyncio.to_thread(check_session, i),
+    )
+    await _run(
+        "do_logout",
+        args.ops,
+        args.concurrency,
+        lambda i: asyncio.to_thread(logout, i),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=(__doc__ or "").splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--ops", type=int, default=1_000)
+    parser.add_argument("--registrations", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument(
+        "--sync-db",
+        action="store_true",
+        help="Use rx.session() even when async_db_url is configured.",
+    )
+    args = parser.parse_args()
+    db.set_async_db(not args.sync_db)
+    reset_database()
+    _install_query_counter()
+    asyncio.run(main(args))
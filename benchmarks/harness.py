@@ -0,0 +1,100 @@
+"""Helpers for driving reflex_local_auth states outside of a running app.
+
+Benchmarks are run from this directory, so rxconfig.py here configures the
+database (override with BENCH_DB_URL and BENCH_ASYNC_DB_URL).
+"""
+
+from __future__ import annotations
+
+import statistics
+from typing import TypeVar
+
+import bcrypt
+import reflex as rx
+import sqlmodel
+from reflex.istate.data import RouterData
+from reflex.model import get_engine
+from reflex.state import State
+from reflex_local_auth.user import LocalUser
+
+S = TypeVar("S", bound=rx.State)
+
+PASSWORD = "benchmark-password"
+# Seed users with a cheap bcrypt cost so hashing doesn't dominate DB timings.
+SEED_ROUNDS = 4
+
+
+def reset_database() -> None:
+    """Drop and recreate all tables in the benchmark database."""
+    engine = get_engine()
+    sqlmodel.SQLModel.metadata.drop_all(engine)
+    sqlmodel.SQLModel.metadata.create_all(engine)
+
+
+def create_users(
+    count: int,
+    rounds: int = SEED_ROUNDS,
+    enabled: bool = True,
+    prefix: str = "user",
+) -> list[str]:
+    """Insert users sharing the same password.
+
+    Args:
+        count: The number of users to create.
+        rounds: The bcrypt cost of the password hash.
+        enabled: Whether the users are enabled.
+        prefix: The username prefix, followed by the user's number.
+
+    Returns:
+        The created usernames.
+    """
+    password_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds))
+    usernames = [f"{prefix}{i}" for i in range(count)]
+    with rx.session() as session:
+        session.exec(
+            sqlmodel.insert(LocalUser).values(  # pyright: ignore[reportArgumentType]
+                [
+                    {"username": u, "password_hash": password_hash, "enabled": enabled}
+                    for u in usernames
+                ]
+            )
+        )
+        session.commit()
+    return usernames
+
+
+def new_state(state_cls: type[S], client_token: str, path: str = "/") -> S:
+    """Create a state instance as if a client had connected.
+
+    Args:
+        state_cls: The substate to return.
+        client_token: The client token for the connection.
+        path: The current page path.
+
+    Returns:
+        The substate instance.
+    """
+    root = State(_reflex_internal_init=True)  # pyright: ignore[reportCallIssue]
+    root.router = RouterData.from_router_data(
+        {"token": client_token, "pathname": path, "headers": {}}
+    )
+    return root.get_substate(state_cls.get_full_name().split("."))  # pyright: ignore[reportReturnType]
+
+
+def percentiles(timings: list[float]) -> dict[str, float]:
+    """Summarize timings in milliseconds.
+
+    Args:
+        timings: Durations in seconds.
+
+    Returns:
+        The p50, p95 and p99 of the timings in milliseconds.
+    """
+    if len(timings) < 2:
+        timings = timings * 2
+    quantiles = statistics.quantiles(timings, n=100)
+    return {
+        "p50": quantiles[49] * 1000,
+        "p95": quantiles[94] * 1000,
+        "p99": quantiles[98] * 1000,
+    }
@@ -0,0 +1,76 @@
+"""Compare concurrent login throughput of the sync and async database paths.
+
+Usage (from the benchmarks directory):
+
+    python login_throughput.py --logins 2000 --concurrency 50
+
+Also reports how long the event loop was blocked, which is what the async path
+is meant to fix: while a sync query runs, no other event can be processed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from harness import PASSWORD, create_users, new_state, percentiles, reset_database
+from reflex_local_auth import LoginState, db
+
+
+async def _watch_loop_lag(lags: list[float], stop: asyncio.Event) -> None:
+    interval = 0.001
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run(usernames: list[str], logins: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    timings: list[float] = []
+    lags: list[float] = []
+    stop = asyncio.Event()
+
+    async def login(i: int) -> None:
+        async with semaphore:
+            state = new_state(LoginState, f"client-{i}")
+            start = time.perf_counter()
+            await LoginState.on_submit.fn(
+                state,
+                {"username": usernames[i % len(usernames)], "password": PASSWORD},
+            )
+            timings.append(time.perf_counter() - start)
+            assert state.error_message == "", state.error_message
+
+    watcher = asyncio.create_task(_watch_loop_lag(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(login(i) for i in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await watcher
+    mode = "async" if db.async_db_enabled() else "sync"
+    latency = percentiles(timings)
+    print(
+        f"{mode:<6} {logins / elapsed:8.1f} logins/s  "
+        f"p50={latency['p50']:.1f}ms p99={latency['p99']:.1f}ms  "
+        f"max loop lag={max(lags, default=0) * 1000:.1f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--logins", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    for use_async in (False, True):
+        reset_database()
+        usernames = create_users(args.users)
+        db.set_async_db(use_async)
+        asyncio.run(run(usernames, args.logins, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
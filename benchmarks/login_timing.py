@@ -0,0 +1,78 @@
+"""Compare login latency for valid, wrong-password, unknown and disabled users.
+
+Usage (from the benchmarks directory):
+
+    python login_timing.py --attempts 50
+
+Users are created with the default bcrypt cost, so the timings match a real
+deployment. Attempts are run one at a time, in random order, and the spread is
+the difference between the slowest and fastest branch's median latency: the
+smaller it is, the less the response time reveals about the username.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+
+import bcrypt
+from harness import PASSWORD, create_users, new_state, percentiles, reset_database
+from reflex_local_auth import LoginState, throttle
+
+
+async def main(args: argparse.Namespace) -> None:
+    enabled = create_users(args.attempts, rounds=args.rounds)
+    disabled = create_users(1, rounds=args.rounds, enabled=False, prefix="disabled")
+    branches = {
+        "valid password": lambda i: (enabled[i], PASSWORD),
+        "wrong password": lambda i: (enabled[i], "wrong-password"),
+        "unknown user": lambda i: (f"nobody{i}", PASSWORD),
+        "disabled user": lambda i: (disabled[0], PASSWORD),
+    }
+    attempts = [(name, i) for name in branches for i in range(args.attempts)]
+    random.shuffle(attempts)
+    # Warm up the pool, the database connection and any lazily computed hashes.
+    for name in branches:
+        await LoginState.on_submit.fn(
+            new_state(LoginState, "warmup"),
+            dict(zip(("username", "password"), branches[name](0), strict=True)),
+        )
+
+    timings: dict[str, list[float]] = {name: [] for name in branches}
+    for n, (name, i) in enumerate(attempts):
+        username, password = branches[name](i)
+        state = new_state(LoginState, f"client-{n}")
+        start = time.perf_counter()
+        await LoginState.on_submit.fn(
+            state, {"username": username, "password": password}
+        )
+        timings[name].append(time.perf_counter() - start)
+
+    print(f"{'branch':<16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    medians = []
+    for name, branch_timings in timings.items():
+        latency = percentiles(branch_timings)
+        medians.append(latency["p50"])
+        print(
+            f"{name:<16} {latency['p50']:>9.2f} "
+            f"{latency['p95']:>9.2f} {latency['p99']:>9.2f}"
+        )
+    print(f"spread of p50 across branches: {max(medians) - min(medians):.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=(__doc__ or "").splitlines()[0])
+    parser.add_argument("--attempts", type=int, default=50)
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=int(bcrypt.gensalt().split(b"$")[2]),
+        help="bcrypt cost of the users' password hashes.",
+    )
+    args = parser.parse_args()
+    # Every attempt must reach the database and bcrypt.
+    throttle.set_login_throttle(username_ip_limiter=None, ip_limiter=None)
+    reset_database()
+    asyncio.run(main(args))
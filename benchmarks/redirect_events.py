@@ -0,0 +1,187 @@
+"""Count the events of an unauthenticated page view, redir vs. check_login.
+
+A protected page redirects unauthenticated clients to the login page in one of
+two ways:
+
+* redir: `@require_login` renders a placeholder whose on_mount sends
+  `LoginState.redir`, which re-queues itself until the state is hydrated.
+* check_login: `@require_login(redirect_on_load=True)` with
+  `LoginState.check_login` as the page's on_load, run once in the hydrate chain.
+
+Each page view is replayed through Reflex's own event processing: the events
+the client sends are queued in order, and the events a handler returns are
+queued after them, like the backend event queue does. Whether the placeholder
+mounts before or after the websocket sends its hydrate event depends on the
+browser, so redir is measured both ways. The "with on_load" pages also load
+data on_load, which lengthens the hydrate chain that redir waits out.
+
+Usage:
+
+    python redirect_events.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import dataclasses
+from typing import Any
+
+import reflex as rx
+import reflex_local_auth
+from harness import reset_database
+from reflex.istate.manager.memory import StateManagerMemory
+from reflex.state import State
+from reflex_base.event import Event
+from reflex_base.event.context import EventContext
+from reflex_base.event.processor.base_state_processor import process_event
+from reflex_base.registry import RegistrationContext
+from reflex_local_auth import instrumentation
+from reflex_local_auth.login import LoginState
+
+
+class PageDataState(rx.State):
+    """Stands in for a page's own on_load data loading."""
+
+    rows: list[str] = []
+
+    @rx.event
+    def load(self):
+        self.rows = ["a", "b", "c"]
+
+
+@reflex_local_auth.require_login
+def redir_page() -> rx.Component:
+    return rx.text("protected")
+
+
+@reflex_local_auth.require_login(redirect_on_load=True)
+def check_login_page() -> rx.Component:
+    return rx.text("protected")
+
+
+app = rx.App()
+app.add_page(redir_page, route="/redir")
+app.add_page(redir_page, route="/redir-data", on_load=PageDataState.load)
+app.add_page(check_login_page, route="/check", on_load=LoginState.check_login)
+app.add_page(
+    check_login_page,
+    route="/check-data",
+    on_load=[LoginState.check_login, PageDataState.load],
+)
+
+HYDRATE = Event(name=f"{State.get_full_name()}.hydrate_and_load", payload={})
+REDIR = Event(name=f"{LoginState.get_full_name()}.redir", payload={})
+
+
+@dataclasses.dataclass
+class PageView:
+    client_events: int = 0
+    chained_events: int = 0
+    # Events processed before the redirect was sent to the client.
+    events_before_redirect: int | None = None
+    auth_checks: collections.Counter[str] = dataclasses.field(
+        default_factory=collections.Counter
+    )
+
+
+class AuthCheckCounter(instrumentation.InstrumentationHook):
+    def __init__(self):
+        self.view = PageView()
+
+    def counter(self, name: str, value: int, attributes: dict[str, Any]) -> None:
+        if name == instrumentation.COUNT_REDIR:
+            hydrated = "hydrated" if attributes["hydrated"] else "unhydrated"
+            self.view.auth_checks[f"redir ({hydrated})"] += value
+        elif name == instrumentation.COUNT_CHECK_LOGIN:
+            self.view.auth_checks["check_login"] += value
+
+
+async def page_view(
+    state_manager: StateManagerMemory,
+    hook: AuthCheckCounter,
+    client_token: str,
+    path: str,
+    client_events: list[Event],
+) -> PageView:
+    view = hook.view = PageView(client_events=len(client_events))
+    queue = collections.deque(client_events)
+    processed = 0
+
+    async def enqueue(token: str, *events: Event) -> None:
+        view.chained_events += len(events)
+        queue.extend(events)
+
+    async def emit_event(token: str, *events: Event) -> None:
+        if view.events_before_redirect is None and any(
+            event.name == "_redirect" for event in events
+        ):
+            view.events_before_redirect = processed
+
+    async def emit_delta(token: str, delta: Any) -> None:
+        pass
+
+    router_data = {"token": client_token, "pathname": path, "asPath": path}
+    EventContext.set(
+        EventContext(
+            token=client_token,
+            state_manager=state_manager,
+            enqueue_impl=enqueue,
+            emit_event_impl=emit_event,
+            emit_delta_impl=emit_delta,
+            router_data=router_data,
+        )
+    )
+    handlers = RegistrationContext.get().event_handlers
+    while queue:
+        event = queue.popleft()
+        processed += 1
+        registered = handlers[event.name]
+        token = rx.BaseStateToken(ident=client_token, cls=registered.states[0])
+        async with state_manager.modify_state(token) as state:
+            root = state._get_root_state()
+            if not root.router_data:
+                root.router_data = root._update_router_vars(router_data, {})
+            await process_event(
+                handler=registered.handler,
+                payload=event.payload,
+                state=await root.get_state(registered.states[0]),
+                root_state=root,
+            )
+    return view
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").splitlines()[0])
+    parser.parse_args()
+
+    reset_database()
+    hook = AuthCheckCounter()
+    instrumentation.add_hook(hook)
+    scenarios = [
+        ("redir, mount before hydrate", "/redir", [REDIR, HYDRATE]),
+        ("redir, mount after hydrate", "/redir", [HYDRATE, REDIR]),
+        ("redir with on_load, mount before", "/redir-data", [REDIR, HYDRATE]),
+        ("redir with on_load, mount after", "/redir-data", [HYDRATE, REDIR]),
+        ("check_login", "/check", [HYDRATE]),
+        ("check_login with on_load", "/check-data", [HYDRATE]),
+    ]
+    print(
+        f"{'page view':<34} {'client':>6} {'chained':>7} {'total':>5} "
+        f"{'to redirect':>11}  auth checks"
+    )
+    for i, (name, path, client_events) in enumerate(scenarios):
+        view = await page_view(
+            StateManagerMemory(), hook, f"client-{i}", path, client_events
+        )
+        checks = ", ".join(f"{k} x{v}" for k, v in sorted(view.auth_checks.items()))
+        print(
+            f"{name:<34} {view.client_events:>6} {view.chained_events:>7} "
+            f"{view.client_events + view.chained_events:>5} "
+            f"{view.events_before_redirect or '-':>11}  {checks}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""Check read/write routing against a lagging replica, using two SQLite files.
+
+A background thread copies the primary database into the replica file every
+`--lag` seconds, like a replica that is that far behind. Each client logs in and
+immediately resolves authenticated_user, then keeps resolving it once the
+replica has caught up. Without read-your-writes, the first lookup goes to the
+replica and misses the new session; with it, the client reads from the primary
+until the replica has caught up, and from the replica after that.
+
+Usage:
+
+    python replica_routing.py --clients 200 --lag 1 --reads 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import datetime
+import sqlite3
+import threading
+import time
+
+from harness import create_users, new_state, reset_database
+from reflex_local_auth import db
+from reflex_local_auth.local_auth import LocalAuthState
+from sqlalchemy import event
+
+
+def replicate(primary: str, replica: str) -> None:
+    with sqlite3.connect(primary) as source, sqlite3.connect(replica) as target:
+        source.backup(target)
+
+
+def replicate_every(
+    primary: str, replica: str, lag: float, stop: threading.Event
+) -> None:
+    while not stop.wait(lag):
+        replicate(primary, replica)
+
+
+def count_selects(counts: collections.Counter[str]) -> None:
+    for name, engine in (
+        ("primary", db.get_engine()),
+        ("replica", db.get_engine(replica=True)),
+    ):
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _count(
+            conn, cursor, statement, parameters, context, executemany, name=name
+        ):
+            if statement.lstrip().upper().startswith("SELECT"):
+                counts[name] += 1
+
+
+def run(label: str, args: argparse.Namespace, replica_lag: float) -> None:
+    db.set_engine_config(
+        db.EngineConfig(
+            replica_url=f"sqlite:///{args.replica}",
+            replica_lag=datetime.timedelta(seconds=replica_lag),
+        )
+    )
+    counts: collections.Counter[str] = collections.Counter()
+    count_selects(counts)
+    states = []
+    logged_in = 0
+    for i in range(args.clients):
+        state = new_state(LocalAuthState, f"{label}-{i}")
+        state._login(i % args.users + 1)
+        logged_in += state._get_authenticated_user().id >= 0
+        states.append(state)
+    after_login = counts.copy()
+    # Let the replica and the read-your-writes window catch up.
+    time.sleep(max(args.lag, replica_lag) * 2)
+    counts.clear()
+    for _ in range(args.reads):
+        for state in states:
+            state._get_authenticated_user()
+    print(
+        f"{label:<20} logged in right after login: {logged_in}/{args.clients}  "
+        f"(primary {after_login['primary']}, replica {after_login['replica']} "
+        f"SELECTs)  steady state: primary {counts['primary']}, "
+        f"replica {counts['replica']} SELECTs"
+    )
+    db.set_engine_config(None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument(
+        "--lag", type=float, default=1, help="Seconds between replica copies."
+    )
+    parser.add_argument(
+        "--reads", type=int, default=5, help="Lookups per client in steady state."
+    )
+    parser.add_argument("--replica", default="bench_replica.db")
+    args = parser.parse_args()
+
+    reset_database()
+    create_users(args.users)
+    primary = db.get_engine().url.database
+    assert primary, "replica_routing.py needs a SQLite file as the primary."
+    replicate(primary, args.replica)
+    stop = threading.Event()
+    replicator = threading.Thread(
+        target=replicate_every, args=(primary, args.replica, args.lag, stop)
+    )
+    replicator.start()
+    try:
+        run("no read-your-writes", args, replica_lag=0)
+        run("read-your-writes", args, replica_lag=args.lag)
+    finally:
+        stop.set()
+        replicator.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import os
+
+import reflex as rx
+
+config = rx.Config(
+    app_name="benchmarks",
+    db_url=os.environ.get("BENCH_DB_URL", "sqlite:///bench.db"),
+    async_db_url=os.environ.get("BENCH_ASYNC_DB_URL", "sqlite+aiosqlite:///bench.db"),
+)
@@ -0,0 +1,171 @@
+"""Compare authenticated_user resolution with and without a session batcher.
+
+Two workloads, each with and without a batcher:
+
+* refresh: every client's authenticated_user interval has passed, and each
+  client sends an event, so Reflex recomputes the var. Without a batcher each
+  recompute runs its own query. With a batcher, a session cache and the
+  refresh prefetch task, the tokens due are resolved ahead of time with one IN
+  query per batch and the recomputes are cache hits.
+* lookups: many clients resolve their auth_token at the same moment through
+  `_aget_authenticated_user`, like the session management handlers. With a
+  batcher, lookups arriving within the window share an IN query.
+
+Usage:
+
+    python session_batching.py --clients 100 1000 --rounds 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import datetime
+import statistics
+import time
+
+import reflex as rx
+import sqlmodel
+from harness import create_users, new_state, reset_database
+from reflex_local_auth import batch, cache
+from reflex_local_auth.auth_session import LocalAuthSession
+from reflex_local_auth.local_auth import DEFAULT_AUTH_REFRESH_DELTA, LocalAuthState
+from sqlalchemy import Engine, event
+
+# Past the longest jittered interval, so every client is due.
+ELAPSED = DEFAULT_AUTH_REFRESH_DELTA * 1.2
+
+
+def create_sessions(count: int) -> list[str]:
+    tokens = [f"session-{i}" for i in range(count)]
+    expiration = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
+        days=1
+    )
+    with rx.session() as session:
+        session.exec(
+            sqlmodel.insert(LocalAuthSession).values(  # pyright: ignore[reportArgumentType]
+                [
+                    {
+                        "user_id": i % 100 + 1,
+                        "session_id": token,
+                        "expiration": expiration,
+                    }
+                    for i, token in enumerate(tokens)
+                ]
+            )
+        )
+        session.commit()
+    return tokens
+
+
+def count_selects(counts: collections.Counter[str]) -> None:
+    # Every engine, so that queries on the async engine are counted too.
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            counts["selects"] += 1
+
+
+def new_states(tokens: list[str]) -> list[LocalAuthState]:
+    states = []
+    for token in tokens:
+        state = new_state(LocalAuthState, f"client-{token}")
+        state.auth_token = token
+        states.append(state)
+    return states
+
+
+async def send_event(state: LocalAuthState) -> None:
+    # Like an event handled for the client: the delta recomputes expired vars.
+    state._mark_ancestors_dirty()
+    root = state.parent_state
+    assert root is not None
+    await root._get_resolved_delta()
+    root._clean()
+
+
+def expire_auth_vars(state: LocalAuthState) -> None:
+    last_updated = datetime.datetime.now() - ELAPSED
+    for name in ("authenticated_user", "is_authenticated"):
+        cvar = LocalAuthState.computed_vars[name]
+        setattr(state, cvar._last_updated_attr, last_updated)
+
+
+async def refresh(
+    states: list[LocalAuthState], counts: collections.Counter[str]
+) -> tuple[float, int]:
+    for state in states:
+        # The first event computes the vars and schedules the next refresh.
+        await send_event(state)
+        expire_auth_vars(state)
+    session_cache = cache.get_session_cache()
+    if session_cache is not None:
+        # The interval has passed: the entries cached by the first events expired.
+        session_cache.clear()
+    counts.clear()
+    start = time.perf_counter()
+    batcher = batch.get_session_batcher()
+    if batcher is not None:
+        # Stands in for the runs of the prefetch task during the interval.
+        await batcher.prefetch_refreshes(within=ELAPSED)
+    for state in states:
+        await send_event(state)
+        assert state.is_authenticated
+    return time.perf_counter() - start, counts["selects"]
+
+
+async def lookups(states: list[LocalAuthState]) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(state._aget_authenticated_user() for state in states))
+    return time.perf_counter() - start
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    reset_database()
+    create_users(100)
+    tokens = create_sessions(max(args.clients))
+    counts: collections.Counter[str] = collections.Counter()
+    count_selects(counts)
+
+    print("refresh: one event per client after the interval")
+    for clients in args.clients:
+        batch.set_session_batcher(None)
+        cache.set_session_cache(None)
+        unbatched = await refresh(new_states(tokens[:clients]), counts)
+        batch.set_session_batcher(batch.SessionBatcher())
+        cache.set_session_cache(cache.MemorySessionCache())
+        batched = await refresh(new_states(tokens[:clients]), counts)
+        print(
+            f"{clients:>5} clients: "
+            f"unbatched {unbatched[0] * 1000:7.1f}ms ({unbatched[1]} queries) | "
+            f"prefetched {batched[0] * 1000:7.1f}ms ({batched[1]} queries)"
+        )
+    batch.set_session_batcher(None)
+    cache.set_session_cache(None)
+
+    print("lookups: concurrent _aget_authenticated_user calls")
+    for clients in args.clients:
+        states = new_states(tokens[:clients])
+        unbatched = [await lookups(states) for _ in range(args.rounds)]
+        batcher = batch.SessionBatcher()
+        batch.set_session_batcher(batcher)
+        batched = [await lookups(states) for _ in range(args.rounds)]
+        batch.set_session_batcher(None)
+        print(
+            f"{clients:>5} clients: "
+            f"unbatched {statistics.median(unbatched) * 1000:7.1f}ms "
+            f"({clients} queries) | "
+            f"batched {statistics.median(batched) * 1000:7.1f}ms "
+            f"({batcher.metrics.queries / args.rounds:.0f} queries, "
+            f"largest batch {batcher.metrics.largest_batch})"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+"""Measure authenticated_user query latency with and without the composite index.
+
+Usage:
+
+    python benchmarks/session_lookup.py --rows 10000 1000000 10000000
+    python benchmarks/session_lookup.py --db-url postgresql+psycopg://localhost/bench
+
+The target database is dropped and recreated for every row count, so never point
+--db-url at a database holding real data.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import random
+import statistics
+import time
+
+import sqlalchemy
+import sqlmodel
+from reflex_local_auth.auth_session import LocalAuthSession
+from reflex_local_auth.user import LocalUser
+
+COMPOSITE_INDEX = "ix_localauthsession_session_id_expiration_user_id"
+INSERT_CHUNK = 50_000
+N_USERS = 1_000
+
+
+def populate(engine: sqlalchemy.Engine, rows: int) -> None:
+    sqlmodel.SQLModel.metadata.drop_all(engine)
+    sqlmodel.SQLModel.metadata.create_all(engine)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(
+            sqlalchemy.insert(LocalUser),
+            [
+                {"username": f"user{i}", "password_hash": b"x", "enabled": True}
+                for i in range(N_USERS)
+            ],
+        )
+        for start in range(0, rows, INSERT_CHUNK):
+            conn.execute(
+                sqlalchemy.insert(LocalAuthSession),
+                [
+                    {
+                        "user_id": i % N_USERS + 1,
+                        "session_id": f"session-{i}",
+                        # Half of the sessions are already expired.
+                        "expiration": now + datetime.timedelta(days=1 if i % 2 else -1),
+                    }
+                    for i in range(start, min(start + INSERT_CHUNK, rows))
+                ],
+            )
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(sqlalchemy.text("VACUUM ANALYZE localauthsession"))
+    else:
+        with engine.begin() as conn:
+            conn.execute(sqlalchemy.text("ANALYZE"))
+
+
+def measure(engine: sqlalchemy.Engine, rows: int, lookups: int) -> list[float]:
+    # Execute through Core rather than the ORM, so object loading doesn't hide the
+    # index effect.
+    query = sqlmodel.select(LocalUser, LocalAuthSession.expiration).where(
+        LocalAuthSession.session_id == sqlalchemy.bindparam("token"),
+        LocalAuthSession.expiration >= sqlalchemy.bindparam("now"),
+        LocalUser.id == LocalAuthSession.user_id,
+    )
+    timings = []
+    with engine.connect() as conn:
+        for _ in range(lookups):
+            params = {
+                "token": f"session-{random.randrange(rows)}",
+                "now": datetime.datetime.now(datetime.timezone.utc),
+            }
+            start = time.perf_counter()
+            conn.execute(query, params).all()
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: list[float]) -> None:
+    quantiles = statistics.quantiles(timings, n=100)
+    print(
+        f"{label:<40} p50={quantiles[49] * 1e6:8.1f}us p99={quantiles[98] * 1e6:8.1f}us"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").splitlines()[0])
+    parser.add_argument("--db-url", default="sqlite:///session_lookup_bench.db")
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000]
+    )
+    parser.add_argument("--lookups", type=int, default=5_000)
+    args = parser.parse_args()
+
+    engine = sqlalchemy.create_engine(args.db_url)
+    for rows in args.rows:
+        populate(engine, rows)
+        report(
+            f"{engine.dialect.name} {rows} rows, composite",
+            measure(engine, rows, args.lookups),
+        )
+        with engine.begin() as conn:
+            conn.execute(sqlalchemy.text(f"DROP INDEX {COMPOSITE_INDEX}"))
+        report(
+            f"{engine.dialect.name} {rows} rows, single",
+            measure(engine, rows, args.lookups),
+        )
+    sqlmodel.SQLModel.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
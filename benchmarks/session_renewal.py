@@ -0,0 +1,132 @@
+"""Count the session writes made by sliding expiration, against renewing on every request.
+
+Simulates users active for a few hours every day, each with several open tabs
+served by several backend workers. Every tab resolves authenticated_user once
+per refresh interval, reading its session from the benchmark database; a naive
+sliding expiration would UPDATE the session on each of those reads. The
+simulation advances a virtual clock, so weeks run in seconds.
+
+Usage:
+
+    python session_renewal.py --sessions 100 --tabs 3 --workers 4 --days 14
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import random
+import time
+
+import reflex as rx
+import sqlalchemy
+import sqlmodel
+from harness import reset_database
+from reflex.model import get_engine
+from reflex_local_auth import db
+from reflex_local_auth.auth_session import LocalAuthSession
+from reflex_local_auth.local_auth import (
+    DEFAULT_AUTH_REFRESH_DELTA,
+    DEFAULT_AUTH_SESSION_EXPIRATION_DELTA,
+)
+from reflex_local_auth.renewal import SessionRenewer
+
+
+def create_sessions(count: int, now: datetime.datetime) -> list[str]:
+    tokens = [f"session-{i}" for i in range(count)]
+    with rx.session() as session:
+        session.exec(
+            sqlmodel.insert(LocalAuthSession).values(  # pyright: ignore[reportArgumentType]
+                [
+                    {
+                        "user_id": i + 1,
+                        "session_id": token,
+                        "expiration": now + DEFAULT_AUTH_SESSION_EXPIRATION_DELTA,
+                    }
+                    for i, token in enumerate(tokens)
+                ]
+            )
+        )
+        session.commit()
+    return tokens
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--tabs", type=int, default=3, help="Open tabs per session.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument(
+        "--active-hours", type=float, default=8, help="Active hours per day."
+    )
+    parser.add_argument(
+        "--threshold-days",
+        type=float,
+        default=DEFAULT_AUTH_SESSION_EXPIRATION_DELTA.days / 2,
+        help="Renew when less than this much lifetime remains.",
+    )
+    args = parser.parse_args()
+
+    reset_database()
+    start = datetime.datetime.now(datetime.timezone.utc)
+    tokens = create_sessions(args.sessions, start)
+    # One renewer per simulated worker, each with its own coalescing memory.
+    renewers = [
+        SessionRenewer(renew_threshold=datetime.timedelta(days=args.threshold_days))
+        for _ in range(args.workers)
+    ]
+    slots = int(
+        datetime.timedelta(hours=args.active_hours) / DEFAULT_AUTH_REFRESH_DELTA
+    )
+    checks = expired = 0
+    elapsed = time.perf_counter()
+    query = sqlmodel.select(LocalAuthSession.expiration).where(
+        LocalAuthSession.session_id == sqlalchemy.bindparam("token")
+    )
+    # Autocommit, so each read sees the renewals committed by the renewers.
+    with (
+        get_engine()
+        .connect()
+        .execution_options(isolation_level="AUTOCOMMIT") as connection
+    ):
+        for day in range(args.days):
+            for slot in range(slots):
+                now = (
+                    start
+                    + datetime.timedelta(days=day)
+                    + slot * DEFAULT_AUTH_REFRESH_DELTA
+                )
+                for token in tokens:
+                    # The tabs of a session refresh together, so they all read
+                    # the same expiration before any of them renews it.
+                    expiration = connection.execute(
+                        query, {"token": token}
+                    ).scalar_one()
+                    for _ in range(args.tabs):
+                        checks += 1
+                        if db.as_utc(expiration) < now:
+                            expired += 1
+                            continue
+                        random.choice(renewers).renew(token, expiration, now=now)
+    elapsed = time.perf_counter() - elapsed
+
+    statements = sum(renewer.metrics.statements for renewer in renewers)
+    rows = sum(renewer.metrics.rows_renewed for renewer in renewers)
+    coalesced = sum(renewer.metrics.coalesced for renewer in renewers)
+    print(
+        f"{args.sessions} sessions x {args.tabs} tabs, {args.workers} workers, "
+        f"{args.days} days at {args.active_hours}h/day ({elapsed:.1f}s)"
+    )
+    print(f"authenticated_user reads:          {checks:>9}")
+    print(f"UPDATEs, renew on every read:      {checks:>9}")
+    print(f"UPDATEs, sliding with coalescing:  {statements:>9}")
+    print(f"  rows written:                    {rows:>9}")
+    print(f"  due renewals coalesced locally:  {coalesced:>9}")
+    print(f"reads of expired sessions:         {expired:>9}")
+    if statements:
+        print(f"write reduction:                   {checks / statements:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
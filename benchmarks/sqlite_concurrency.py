@@ -0,0 +1,123 @@
+"""Compare concurrent logins and session lookups on SQLite, with and without an engine config.
+
+Simulates several backend workers, each a thread with its own connection, that
+log users in and resolve authenticated_user against the same SQLite file. With
+the default rollback journal, every login commit waits for readers to finish and
+blocks new ones; the engine config switches to WAL mode with synchronous=NORMAL
+and a busy_timeout.
+
+Usage:
+
+    python sqlite_concurrency.py --workers 8 --seconds 5 --write-ratio 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import threading
+import time
+
+from harness import create_users, new_state, percentiles, reset_database
+from reflex_local_auth import db
+from reflex_local_auth.local_auth import LocalAuthState
+from sqlalchemy.exc import OperationalError
+
+
+def set_journal_mode(mode: str) -> None:
+    # The journal mode is stored in the database file, so reset it between runs.
+    with db.get_engine().connect() as connection:
+        connection.exec_driver_sql(f"PRAGMA journal_mode={mode}")
+
+
+def worker(
+    state: LocalAuthState,
+    number: int,
+    users: int,
+    write_ratio: float,
+    deadline: float,
+    reads: list[float],
+    writes: list[float],
+    errors: list[str],
+) -> None:
+    rng = random.Random(number)
+    while time.perf_counter() < deadline:
+        login = rng.random() < write_ratio
+        start = time.perf_counter()
+        try:
+            if login:
+                state._login(rng.randrange(users) + 1)
+            else:
+                assert state._get_authenticated_user().id >= 0
+        except OperationalError as err:
+            errors.append(str(err.orig))
+            continue
+        (writes if login else reads).append(time.perf_counter() - start)
+
+
+def run(label: str, args: argparse.Namespace) -> None:
+    reads: list[float] = []
+    writes: list[float] = []
+    errors: list[str] = []
+    # States can only be created in the main thread.
+    states = []
+    for i in range(args.workers):
+        state = new_state(LocalAuthState, f"{label}-{i}")
+        state._login(i % args.users + 1)
+        states.append(state)
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(
+                state,
+                i,
+                args.users,
+                args.write_ratio,
+                deadline,
+                reads,
+                writes,
+                errors,
+            ),
+        )
+        for i, state in enumerate(states)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    read_latency = percentiles(reads)
+    write_latency = percentiles(writes)
+    print(
+        f"{label:<8} {(len(reads) + len(writes)) / args.seconds:8.1f} ops/s  "
+        f"lookups p50={read_latency['p50']:.2f}ms p99={read_latency['p99']:.2f}ms  "
+        f"logins p50={write_latency['p50']:.2f}ms p99={write_latency['p99']:.2f}ms  "
+        f"locked errors={len(errors)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument(
+        "--write-ratio", type=float, default=0.2, help="Fraction of ops that log in."
+    )
+    args = parser.parse_args()
+
+    reset_database()
+    create_users(args.users)
+    db.set_engine_config(None)
+    set_journal_mode("DELETE")
+    run("default", args)
+    db.set_engine_config(
+        db.EngineConfig(pool_size=args.workers, max_overflow=0),
+    )
+    run("tuned", args)
+    db.set_engine_config(None)
+    set_journal_mode("DELETE")
+
+
+if __name__ == "__main__":
+    main()
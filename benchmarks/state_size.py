@@ -0,0 +1,62 @@
+"""Measure the serialized size of the auth state tree for one client.
+
+Usage (from the benchmarks directory):
+
+    python state_size.py
+
+For an anonymous and an authenticated client, reports the bytes each auth
+substate takes in the state manager (what StateManagerRedis stores and loads on
+every event) and in the full state sent to the frontend on hydration.
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from harness import create_users, new_state, reset_database
+from reflex.state import BaseState
+from reflex.utils.format import json_dumps
+from reflex_local_auth import LocalAuthState, LoginState, RegistrationState
+
+AUTH_STATES: tuple[type[BaseState], ...] = (
+    LocalAuthState,
+    LoginState,
+    RegistrationState,
+)
+
+
+def measure(authenticated: bool) -> None:
+    auth_state = new_state(LocalAuthState, "client")
+    if authenticated:
+        auth_state._login(1)
+    root = auth_state.parent_state
+    assert root is not None
+    substates = [
+        root.get_substate(state_cls.get_full_name().split("."))
+        for state_cls in AUTH_STATES
+    ]
+    # The full state is what a client receives when it hydrates.
+    full_state = root.dict()
+    label = "authenticated" if authenticated else "anonymous"
+    total_stored = total_sent = 0
+    for state in substates:
+        stored = len(state._serialize())
+        sent = len(json_dumps(full_state[state.get_full_name()]))
+        total_stored += stored
+        total_sent += sent
+        print(f"{label:<14} {type(state).__name__:<18} {stored:>8} {sent:>8}")
+    print(f"{label:<14} {'total':<18} {total_stored:>8} {total_sent:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").splitlines()[0])
+    parser.parse_args()
+    reset_database()
+    create_users(1)
+    print(f"{'client':<14} {'state':<18} {'stored B':>8} {'sent B':>8}")
+    measure(authenticated=False)
+    measure(authenticated=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Measure the per-call overhead of the fixed auth queries, rebuilt or prebuilt.
+
+Each query is executed repeatedly on one open session, so the timings are
+dominated by statement construction, cache key generation, compilation and
+result processing rather than by connection handling:
+
+* rebuilt: a new select()/delete() expression per call, like the queries
+  before they were prebuilt, with literal values.
+* lambda: the same expression wrapped in sqlalchemy.lambda_stmt().
+* prebuilt: the module-level statements with bound parameters that
+  reflex_local_auth executes.
+
+Usage:
+
+    python statement_overhead.py --calls 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import timeit
+from collections.abc import Callable
+from typing import Any
+
+import reflex as rx
+import sqlalchemy
+from harness import create_users, reset_database
+from reflex_local_auth.auth_session import LocalAuthSession
+from reflex_local_auth.batch import _BATCH_QUERY, _batch_params
+from reflex_local_auth.local_auth import (
+    _AUTHENTICATED_USER_QUERY,
+    _LOGOUT_STATEMENT,
+    _authenticated_user_params,
+)
+from reflex_local_auth.login import _LOGIN_QUERY
+from reflex_local_auth.user import LocalUser
+from sqlalchemy.orm import undefer
+from sqlmodel import col, delete, select
+
+
+def now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def rebuilt_authenticated_user(auth_token: str):
+    return select(
+        LocalUser.id, LocalUser.username, LocalUser.enabled, LocalAuthSession.expiration
+    ).where(
+        LocalAuthSession.session_id == auth_token,
+        LocalAuthSession.expiration >= now(),
+        LocalUser.id == LocalAuthSession.user_id,
+    )
+
+
+def lambda_authenticated_user(auth_token: str):
+    expiration = now()
+    return sqlalchemy.lambda_stmt(
+        lambda: select(
+            LocalUser.id,
+            LocalUser.username,
+            LocalUser.enabled,
+            LocalAuthSession.expiration,
+        ).where(
+            LocalAuthSession.session_id == auth_token,
+            LocalAuthSession.expiration >= expiration,
+            LocalUser.id == LocalAuthSession.user_id,
+        )
+    )
+
+
+def rebuilt_login(username: str):
+    return (
+        select(LocalUser)
+        .where(LocalUser.username == username)
+        .options(undefer(LocalUser.password_hash))  # pyright: ignore[reportArgumentType]
+    )
+
+
+def rebuilt_logout(auth_token: str):
+    return delete(LocalAuthSession).where(
+        col(LocalAuthSession.session_id) == auth_token
+    )
+
+
+def rebuilt_batch(auth_tokens: list[str]):
+    return select(  # pyright: ignore[reportCallIssue]
+        LocalAuthSession.session_id,
+        LocalUser.id,
+        LocalUser.username,
+        LocalUser.enabled,
+        LocalAuthSession.expiration,
+    ).where(
+        col(LocalAuthSession.session_id).in_(auth_tokens),
+        LocalAuthSession.expiration >= now(),
+        LocalUser.id == LocalAuthSession.user_id,
+    )
+
+
+def create_session(username: str) -> str:
+    with rx.session() as session:
+        user_id = session.exec(
+            select(LocalUser.id).where(LocalUser.username == username)
+        ).one()
+        assert user_id is not None
+        session.add(
+            LocalAuthSession(  # type: ignore
+                user_id=user_id,
+                session_id="benchmark-token",
+                expiration=now() + datetime.timedelta(days=1),
+            )
+        )
+        session.commit()
+    return "benchmark-token"
+
+
+def measure(calls: int, fn: Callable[[], Any]) -> float:
+    fn()  # warm the compiled cache
+    return timeit.timeit(fn, number=calls) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").splitlines()[0])
+    parser.add_argument("--calls", type=int, default=5000)
+    args = parser.parse_args()
+
+    reset_database()
+    username = create_users(1)[0]
+    auth_token = create_session(username)
+    batch = [auth_token] + [f"missing-{i}" for i in range(49)]
+    with rx.session() as session:
+        cases: dict[str, dict[str, Callable[[], Any]]] = {
+            "authenticated_user": {
+                "rebuilt": lambda: session.exec(
+                    rebuilt_authenticated_user(auth_token)
+                ).first(),
+                "lambda": lambda: session.exec(
+                    lambda_authenticated_user(auth_token)  # pyright: ignore[reportCallIssue, reportArgumentType]
+                ).first(),
+                "prebuilt": lambda: session.exec(
+                    _AUTHENTICATED_USER_QUERY,
+                    params=_authenticated_user_params(auth_token),
+                ).first(),
+            },
+            "login lookup": {
+                "rebuilt": lambda: session.exec(rebuilt_login(username)).first(),
+                "prebuilt": lambda: session.exec(
+                    _LOGIN_QUERY, params={"username": username}
+                ).first(),
+            },
+            "do_logout": {
+                "rebuilt": lambda: session.exec(rebuilt_logout("missing")),
+                "prebuilt": lambda: session.exec(
+                    _LOGOUT_STATEMENT, params={"auth_token": "missing"}
+                ),
+            },
+            "batch of 50": {
+                "rebuilt": lambda: session.exec(rebuilt_batch(batch)).all(),
+                "prebuilt": lambda: session.exec(
+                    _BATCH_QUERY, params=_batch_params(batch)
+                ).all(),
+            },
+        }
+        for query, variants in cases.items():
+            timings = {
+                variant: measure(args.calls, fn) for variant, fn in variants.items()
+            }
+            speedup = timings["rebuilt"] / timings["prebuilt"]
+            print(
+                f"{query:<20} "
+                + "  ".join(f"{v} {t:7.1f}us" for v, t in timings.items())
+                + f"  ({speedup:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,49 @@
-from . import pages, routes
+from . import (
+    batch,
+    bulk,
+    cache,
+    db,
+    hashers,
+    hashing,
+    instrumentation,
+    pages,
+    push,
+    reaper,
+    redis_client,
+    renewal,
+    routes,
+    sessions,
+    throttle,
+    tokens,
+)
 from .local_auth import LocalAuthState
 from .login import LoginState, require_login
 from .registration import RegistrationState
 from .routes import set_login_route, set_register_route
-from .user import LocalUser
+from .user import AuthenticatedUser, LocalUser
 
 __all__ = [
+    "AuthenticatedUser",
     "LocalAuthState",
     "LocalUser",
     "LoginState",
     "RegistrationState",
+    "batch",
+    "bulk",
+    "cache",
+    "db",
+    "hashers",
+    "hashing",
+    "instrumentation",
     "pages",
+    "push",
+    "reaper",
+    "renewal",
     "require_login",
     "routes",
+    "sessions",
     "set_login_route",
     "set_register_route",
+    "throttle",
+    "tokens",
 ]
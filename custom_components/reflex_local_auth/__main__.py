@@ -0,0 +1,183 @@
+"""Command line utilities: `python -m reflex_local_auth <command>`.
+
+Run from the app directory, so that rxconfig.py selects the database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import sys
+import time
+from pathlib import Path
+
+import sqlalchemy
+
+from . import bulk, hashers
+
+_HASHERS: dict[str, type[hashers.PasswordHasher]] = {
+    hashers.BcryptHasher.name: hashers.BcryptHasher,
+    hashers.ScryptHasher.name: hashers.ScryptHasher,
+    hashers.Argon2Hasher.name: hashers.Argon2Hasher,
+}
+
+
+def calibrate(args: argparse.Namespace) -> None:
+    """Print the hasher configuration that hits a target verification time.
+
+    Args:
+        args: The parsed command line arguments.
+    """
+    hasher, elapsed = hashers.calibrate(
+        _HASHERS[args.algorithm](),
+        datetime.timedelta(milliseconds=args.target_ms),
+    )
+    print(f"{hasher!r} verifies in {elapsed * 1000:.1f}ms")
+    print(
+        "reflex_local_auth.hashers.set_password_hasher("
+        f"reflex_local_auth.hashers.{hasher!r})"
+    )
+
+
+def _engine(args: argparse.Namespace) -> sqlalchemy.Engine:
+    if args.db_url:
+        return sqlalchemy.create_engine(args.db_url)
+    from reflex.model import get_engine
+
+    # Uses db_url from the rxconfig.py in the current directory.
+    return get_engine()
+
+
+def import_users(args: argparse.Namespace) -> None:
+    """Import users from a CSV or JSON lines file.
+
+    Args:
+        args: The parsed command line arguments.
+    """
+    hasher = hashers.get_password_hasher()
+    if args.algorithm:
+        hasher = _HASHERS[args.algorithm]()
+    if args.cost:
+        hasher = hasher.with_cost(args.cost)
+    checkpoint = args.checkpoint
+    if checkpoint is None and args.input != "-":
+        checkpoint = f"{args.input}.checkpoint"
+    if checkpoint is not None and (resumed := bulk.read_checkpoint(checkpoint)):
+        print(f"Resuming after {resumed} records ({checkpoint}).", file=sys.stderr)
+    start = time.perf_counter()
+
+    def report(progress: bulk.ImportProgress) -> None:
+        elapsed = time.perf_counter() - start
+        print(
+            f"{progress.records} records: {progress.inserted} inserted, "
+            f"{progress.skipped_existing} already existed, "
+            f"{progress.rejected} rejected, {progress.hashed} hashed "
+            f"({progress.inserted / elapsed:.0f} inserts/s)",
+            file=sys.stderr,
+        )
+
+    fmt = args.format or bulk.detect_format(args.input)
+    with (
+        sys.stdin
+        if args.input == "-"
+        else Path(args.input).open(newline="", encoding="utf-8")
+    ) as stream:
+        bulk.import_users(
+            _engine(args),
+            bulk.read_records(stream, fmt),
+            batch_size=args.batch_size,
+            hasher=hasher,
+            max_workers=args.workers,
+            checkpoint=checkpoint,
+            on_batch=report,
+        )
+    if checkpoint is not None:
+        # Finished; a new import from the same path starts from the beginning.
+        Path(checkpoint).unlink(missing_ok=True)
+
+
+def export_users(args: argparse.Namespace) -> None:
+    """Export users to a CSV or JSON lines file.
+
+    Args:
+        args: The parsed command line arguments.
+    """
+    fmt = args.format or bulk.detect_format(args.output)
+    with (
+        sys.stdout
+        if args.output == "-"
+        else Path(args.output).open("w", newline="", encoding="utf-8")
+    ) as stream:
+        count = bulk.export_users(
+            _engine(args), stream, fmt, batch_size=args.batch_size
+        )
+    print(f"Exported {count} users.", file=sys.stderr)
+
+
+def main() -> None:
+    """Parse the command line and run the command."""
+    parser = argparse.ArgumentParser(prog="python -m reflex_local_auth")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    calibrate_parser = commands.add_parser(
+        "calibrate", help="Pick a password hashing cost for this machine."
+    )
+    calibrate_parser.add_argument(
+        "--algorithm", choices=sorted(_HASHERS), default="bcrypt"
+    )
+    calibrate_parser.add_argument(
+        "--target-ms",
+        type=float,
+        default=hashers.DEFAULT_CALIBRATION_TARGET.total_seconds() * 1000,
+        help="Maximum time for one password verification.",
+    )
+    calibrate_parser.set_defaults(func=calibrate)
+
+    import_parser = commands.add_parser(
+        "import", help="Import users from a CSV or JSON lines file."
+    )
+    import_parser.add_argument("input", help="The file to read, or - for stdin.")
+    import_parser.add_argument(
+        "--checkpoint",
+        help="Progress file for resuming; defaults to <input>.checkpoint.",
+    )
+    import_parser.add_argument(
+        "--workers",
+        type=int,
+        help="Processes hashing plaintext passwords; defaults to the CPU count.",
+    )
+    import_parser.add_argument(
+        "--algorithm",
+        choices=sorted(_HASHERS),
+        help="Hasher for plaintext passwords; defaults to bcrypt.",
+    )
+    import_parser.add_argument(
+        "--cost", type=int, help="Cost for the hasher, as chosen by calibrate."
+    )
+    import_parser.set_defaults(func=import_users)
+
+    export_parser = commands.add_parser(
+        "export", help="Export users to a CSV or JSON lines file."
+    )
+    export_parser.add_argument("output", help="The file to write, or - for stdout.")
+    export_parser.set_defaults(func=export_users)
+
+    for bulk_parser in (import_parser, export_parser):
+        bulk_parser.add_argument(
+            "--format",
+            choices=bulk.FORMATS,
+            help="Defaults to jsonl for .jsonl/.ndjson/.json files, otherwise csv.",
+        )
+        bulk_parser.add_argument(
+            "--batch-size", type=int, default=bulk.DEFAULT_BATCH_SIZE
+        )
+        bulk_parser.add_argument(
+            "--db-url", help="Defaults to db_url from ./rxconfig.py."
+        )
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import datetime
 
-from sqlmodel import Column, DateTime, Field, SQLModel, String, func
+from sqlmodel import Column, DateTime, Field, Index, SQLModel, String, func
 
 
 class LocalAuthSession(
@@ -9,6 +9,16 @@ class LocalAuthSession(
 ):
     """Correlate a session_id with an arbitrary user_id."""
 
+    __table_args__ = (
+        # Covers the authenticated_user lookup, so it never reads the table itself.
+        Index(
+            "ix_localauthsession_session_id_expiration_user_id",
+            "session_id",
+            "expiration",
+            "user_id",
+        ),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     user_id: int = Field(index=True, nullable=False)
     session_id: str = Field(
@@ -0,0 +1,348 @@
+"""Resolve many auth_tokens with one query.
+
+Each `authenticated_user` lookup runs its own query. When many clients resolve
+their tokens at once, for example after a deploy reconnects every tab, N
+lookups cost N queries. A session batcher gathers the lookups made within
+`window` and resolves them with one `WHERE session_id IN (...)` query, then
+hands each waiting caller its row:
+
+```python
+reflex_local_auth.batch.set_session_batcher(
+    reflex_local_auth.batch.SessionBatcher(),
+)
+```
+
+Async lookups, through `LocalAuthState._aget_authenticated_user` and the event
+handlers built on it, wait for the batch. The `authenticated_user` var is
+computed synchronously and cannot wait, so its refreshes are batched ahead of
+time, into the session cache: each recompute schedules the token's next
+refresh, and a lifespan task resolves the tokens due in the next `interval`
+with one query, so the recomputes are cache hits:
+
+```python
+reflex_local_auth.cache.set_session_cache(
+    reflex_local_auth.cache.MemorySessionCache(),
+)
+app.register_lifespan_task(reflex_local_auth.batch.prefetch_refreshes_task)
+```
+
+Push invalidation also prefetches the tokens it refreshes through the batcher.
+Without a session cache, nothing is prefetched.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import datetime
+import logging
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from sqlalchemy import bindparam
+from sqlmodel import col, select
+
+from . import db
+from .auth_session import LocalAuthSession
+from .cache import get_session_cache
+from .instrumentation import SPAN_DB_AUTHENTICATED_USER_BATCH, span
+from .renewal import get_session_renewer
+from .user import AuthenticatedUser, LocalUser
+
+DEFAULT_BATCH_WINDOW = datetime.timedelta(milliseconds=2)
+DEFAULT_MAX_BATCH_SIZE = 500
+DEFAULT_REFRESH_PREFETCH_INTERVAL = datetime.timedelta(seconds=10)
+DEFAULT_MAX_SCHEDULED_REFRESHES = 100_000
+
+logger = logging.getLogger(__name__)
+
+# (user id, username, enabled, expiration), like the authenticated_user query.
+SessionRow = tuple[int, str, bool, datetime.datetime]
+
+
+@dataclasses.dataclass
+class BatchMetrics:
+    """Counters describing the work done by a session batcher."""
+
+    lookups: int = 0
+    batches: int = 0
+    queries: int = 0
+    largest_batch: int = 0
+    # Tokens resolved into the session cache ahead of their lookups.
+    prefetched: int = 0
+
+
+# Built once; the expanding IN is compiled once and rendered per batch size.
+_BATCH_QUERY = select(  # pyright: ignore[reportCallIssue]
+    LocalAuthSession.session_id,
+    LocalUser.id,
+    LocalUser.username,
+    LocalUser.enabled,
+    LocalAuthSession.expiration,
+).where(
+    col(LocalAuthSession.session_id).in_(bindparam("auth_tokens", expanding=True)),
+    LocalAuthSession.expiration >= bindparam("now"),
+    LocalUser.id == LocalAuthSession.user_id,
+)
+
+
+def _batch_params(auth_tokens: list[str]) -> dict[str, Any]:
+    return {
+        "auth_tokens": auth_tokens,
+        "now": datetime.datetime.now(datetime.timezone.utc),
+    }
+
+
+def _chunks(auth_tokens: Iterable[str], size: int) -> list[list[str]]:
+    unique = list(dict.fromkeys(auth_tokens))
+    return [unique[start : start + size] for start in range(0, len(unique), size)]
+
+
+class SessionBatcher:
+    """Coalesce concurrent auth_token lookups into IN queries."""
+
+    def __init__(
+        self,
+        window: datetime.timedelta = DEFAULT_BATCH_WINDOW,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_scheduled_refreshes: int = DEFAULT_MAX_SCHEDULED_REFRESHES,
+    ):
+        """Initialize the batcher.
+
+        Args:
+            window: How long the first lookup of a batch waits for others.
+            max_batch_size: The maximum number of tokens per query; a full
+                batch is resolved without waiting for the window.
+            max_scheduled_refreshes: The maximum number of tokens whose next
+                refresh this worker remembers; the oldest are dropped.
+        """
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.max_scheduled_refreshes = max_scheduled_refreshes
+        self.metrics = BatchMetrics()
+        self._pending: dict[str, asyncio.Future[SessionRow | None]] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        # auth_token -> timestamp when a client using it refreshes next
+        self._refreshes: dict[str, float] = {}
+
+    def resolve_many(
+        self, auth_tokens: Iterable[str], replica: bool = True
+    ) -> dict[str, SessionRow]:
+        """Look up many auth_tokens with the sync session.
+
+        Args:
+            auth_tokens: The auth_tokens to look up.
+            replica: Read from the replica, if one is configured.
+
+        Returns:
+            The row of each auth_token with an unexpired session.
+        """
+        rows: dict[str, SessionRow] = {}
+        for chunk in _chunks(auth_tokens, self.max_batch_size):
+            with (
+                span(SPAN_DB_AUTHENTICATED_USER_BATCH, size=len(chunk)),
+                db.read_session() if replica else db.session() as session,
+            ):
+                result = session.exec(_BATCH_QUERY, params=_batch_params(chunk)).all()
+            self.metrics.queries += 1
+            rows.update((row[0], row[1:]) for row in result)
+        return rows
+
+    async def aresolve_many(
+        self, auth_tokens: Iterable[str], replica: bool = True
+    ) -> dict[str, SessionRow]:
+        """Look up many auth_tokens, using the async session when enabled.
+
+        Args:
+            auth_tokens: The auth_tokens to look up.
+            replica: Read from the replica, if one is configured.
+
+        Returns:
+            The row of each auth_token with an unexpired session.
+        """
+        if not db.async_db_enabled():
+            return self.resolve_many(auth_tokens, replica=replica)
+        rows: dict[str, SessionRow] = {}
+        for chunk in _chunks(auth_tokens, self.max_batch_size):
+            with span(SPAN_DB_AUTHENTICATED_USER_BATCH, size=len(chunk)):
+                async with db.aread_session() if replica else db.asession() as session:
+                    result = (
+                        await session.exec(_BATCH_QUERY, params=_batch_params(chunk))
+                    ).all()
+            self.metrics.queries += 1
+            rows.update((row[0], row[1:]) for row in result)
+        return rows
+
+    async def get(self, auth_token: str) -> SessionRow | None:
+        """Look up one auth_token as part of the next batch.
+
+        Args:
+            auth_token: The auth_token to look up.
+
+        Returns:
+            The row for the auth_token, or None if it has no unexpired session.
+        """
+        self.metrics.lookups += 1
+        future = self._pending.get(auth_token)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[auth_token] = loop.create_future()
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(
+                    self.window.total_seconds(), self._flush
+                )
+        # Shield the shared future, so a cancelled caller doesn't cancel the others.
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        self.metrics.batches += 1
+        self.metrics.largest_batch = max(self.metrics.largest_batch, len(batch))
+        task = asyncio.get_running_loop().create_task(self._resolve(batch))
+        # Keep a reference until the task is done, so it is not garbage collected.
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(
+        self, batch: dict[str, asyncio.Future[SessionRow | None]]
+    ) -> None:
+        try:
+            rows = await self.aresolve_many(batch)
+        except Exception as err:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(err)
+            return
+        for auth_token, future in batch.items():
+            if not future.done():
+                future.set_result(rows.get(auth_token))
+
+    async def prefetch(self, auth_tokens: Iterable[str], replica: bool = False) -> int:
+        """Resolve auth_tokens ahead of their lookups, into the session cache.
+
+        Tokens without an unexpired session, like those just revoked, are
+        cached as rejected. Like the lookups they replace, the sessions
+        resolved are renewed when a session renewer is configured. Does
+        nothing without a session cache.
+
+        Args:
+            auth_tokens: The auth_tokens about to be looked up.
+            replica: Read from the replica, if one is configured. Prefetches
+                that follow writes read from the primary.
+
+        Returns:
+            The number of users cached.
+        """
+        cache = get_session_cache()
+        if cache is None:
+            return 0
+        auth_tokens = list(auth_tokens)
+        rows = await self.aresolve_many(auth_tokens, replica=replica)
+        self.metrics.prefetched += len(auth_tokens)
+        renewer = get_session_renewer()
+        for auth_token in auth_tokens:
+            row = rows.get(auth_token)
+            if row is None:
+                cache.reject(auth_token)
+                continue
+            user_id, username, enabled, expiration = row
+            cache.set(
+                auth_token,
+                AuthenticatedUser(id=user_id, username=username, enabled=enabled),
+                expiration,
+            )
+            if renewer is not None:
+                await renewer.arenew(auth_token, expiration)
+        return len(rows)
+
+    def schedule_refresh(self, auth_token: str, due: float) -> None:
+        """Record when a client using auth_token refreshes authenticated_user next.
+
+        Does nothing without a session cache, which the prefetch fills.
+
+        Args:
+            auth_token: The auth_token of the client.
+            due: When its refresh interval ends, in seconds since the epoch.
+        """
+        if get_session_cache() is None:
+            return
+        scheduled = self._refreshes.get(auth_token)
+        if scheduled is not None and scheduled <= due:
+            # Another tab using the token refreshes first.
+            return
+        self._refreshes[auth_token] = due
+        if len(self._refreshes) > self.max_scheduled_refreshes:
+            del self._refreshes[next(iter(self._refreshes))]
+
+    async def prefetch_refreshes(
+        self,
+        within: datetime.timedelta = DEFAULT_REFRESH_PREFETCH_INTERVAL,
+    ) -> int:
+        """Prefetch the scheduled refreshes that are due, or will be within a time.
+
+        Each token is prefetched once; recomputing authenticated_user schedules
+        it again.
+
+        Args:
+            within: Prefetch the refreshes due before now plus this.
+
+        Returns:
+            The number of users cached.
+        """
+        horizon = time.time() + within.total_seconds()
+        due = [token for token, at in self._refreshes.items() if at <= horizon]
+        for auth_token in due:
+            del self._refreshes[auth_token]
+        if not due:
+            return 0
+        return await self.prefetch(due, replica=True)
+
+
+_session_batcher: SessionBatcher | None = None
+
+
+def set_session_batcher(batcher: SessionBatcher | None) -> None:
+    """Set the batcher used for authenticated_user lookups.
+
+    Args:
+        batcher: The batcher to use, or None to run one query per lookup.
+    """
+    global _session_batcher
+    _session_batcher = batcher
+
+
+def get_session_batcher() -> SessionBatcher | None:
+    """Get the configured session batcher.
+
+    Returns:
+        The configured SessionBatcher, or None if lookups are not batched.
+    """
+    return _session_batcher
+
+
+async def prefetch_refreshes_task(
+    interval: datetime.timedelta = DEFAULT_REFRESH_PREFETCH_INTERVAL,
+) -> None:
+    """Prefetch the authenticated_user refreshes due in each interval, for the lifetime of the app.
+
+    Args:
+        interval: How long to wait between prefetches. The tokens due before
+            the next one are resolved with one query per max_batch_size tokens.
+    """
+    while True:
+        batcher = get_session_batcher()
+        if batcher is not None:
+            try:
+                prefetched = await batcher.prefetch_refreshes(interval)
+            except Exception:
+                logger.exception("Failed to prefetch authenticated_user refreshes.")
+            else:
+                logger.debug("Prefetched %d authenticated_user refreshes.", prefetched)
+        await asyncio.sleep(interval.total_seconds())
@@ -0,0 +1,290 @@
+"""Import and export LocalUser records in bulk.
+
+Used by `python -m reflex_local_auth import` and `python -m reflex_local_auth
+export`, run from the app directory so rxconfig.py selects the database.
+
+Input is streamed from CSV (with a header row) or JSON lines, with the fields
+`username`, either `password` or `password_hash`, and optionally `enabled`
+(default true). A `password_hash` in any registered hasher's format, like
+bcrypt's `$2b$12$...`, is stored verbatim. Plaintext passwords are hashed with
+the default hasher across a process pool.
+
+Records are inserted in batches, one transaction and one executemany INSERT per
+batch. Usernames that already exist are skipped. After every committed batch,
+the number of input records consumed is written to a checkpoint file, so an
+interrupted import resumes where it stopped.
+
+Export streams rows from the database in the same formats, never holding more
+than one batch in memory.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import csv
+import dataclasses
+import itertools
+import json
+import os
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+from typing import IO, Any
+
+import sqlalchemy
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import col, insert, select
+
+from .hashers import PasswordHasher, get_password_hasher, identify_hasher
+from .user import LocalUser
+
+DEFAULT_BATCH_SIZE = 1_000
+FORMATS = ("csv", "jsonl")
+EXPORT_FIELDS = ("username", "password_hash", "enabled")
+
+
+@dataclasses.dataclass
+class ImportProgress:
+    """Counters describing a bulk import, updated after each batch."""
+
+    # Input records consumed, including skipped and rejected ones.
+    records: int = 0
+    inserted: int = 0
+    skipped_existing: int = 0
+    rejected: int = 0
+    hashed: int = 0
+
+
+def detect_format(path: str | Path) -> str:
+    """Guess the file format from a file name.
+
+    Args:
+        path: The file name.
+
+    Returns:
+        "jsonl" for .jsonl, .ndjson and .json files, otherwise "csv".
+    """
+    suffix = Path(path).suffix.lower()
+    return "jsonl" if suffix in (".jsonl", ".ndjson", ".json") else "csv"
+
+
+def read_records(stream: IO[str], fmt: str) -> Iterator[dict[str, Any]]:
+    """Lazily read user records from a CSV or JSON lines stream.
+
+    Args:
+        stream: The text stream to read.
+        fmt: "csv" or "jsonl".
+
+    Yields:
+        One dict per input record.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _parse_enabled(value: Any) -> bool:
+    if value is None or value == "":
+        return True
+    if isinstance(value, str):
+        return value.strip().lower() not in ("0", "false", "no", "n", "f")
+    return bool(value)
+
+
+def _prepare(record: dict[str, Any]) -> tuple[dict[str, Any] | None, str | None]:
+    # Returns the row to insert (None if the record is invalid) and the
+    # plaintext password still to hash, if any.
+    username = (record.get("username") or "").strip()
+    if not username:
+        return None, None
+    row: dict[str, Any] = {
+        "username": username,
+        "enabled": _parse_enabled(record.get("enabled")),
+    }
+    password_hash = record.get("password_hash")
+    if password_hash:
+        try:
+            if isinstance(password_hash, str):
+                password_hash = password_hash.encode("ascii")
+            identify_hasher(password_hash)
+        except ValueError:
+            return None, None
+        row["password_hash"] = password_hash
+        return row, None
+    password = record.get("password")
+    if not password:
+        return None, None
+    return row, password
+
+
+def read_checkpoint(path: str | Path) -> int:
+    """Get the number of records consumed by a previous import.
+
+    Args:
+        path: The checkpoint file.
+
+    Returns:
+        The recorded count, or 0 if there is no checkpoint.
+    """
+    try:
+        return int(Path(path).read_text().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _write_checkpoint(path: str | Path, records: int) -> None:
+    # Replace atomically, so a crash never leaves a truncated checkpoint.
+    tmp_path = Path(f"{path}.tmp")
+    tmp_path.write_text(str(records))
+    tmp_path.replace(path)
+
+
+def _existing_usernames(
+    connection: sqlalchemy.Connection, usernames: list[str]
+) -> set[str]:
+    return set(
+        connection.execute(
+            select(LocalUser.username).where(col(LocalUser.username).in_(usernames))
+        ).scalars()
+    )
+
+
+def _insert_batch(engine: sqlalchemy.Engine, rows: dict[str, dict[str, Any]]) -> int:
+    if not rows:
+        return 0
+    try:
+        with engine.begin() as connection:
+            # A list of parameter sets executes as a single executemany.
+            connection.execute(insert(LocalUser), list(rows.values()))
+    except IntegrityError:
+        # Some usernames were registered since they were checked; drop them.
+        with engine.begin() as connection:
+            existing = _existing_usernames(connection, list(rows))
+            for username in existing:
+                del rows[username]
+            if rows:
+                connection.execute(insert(LocalUser), list(rows.values()))
+        return len(existing)
+    return 0
+
+
+def import_users(
+    engine: sqlalchemy.Engine,
+    records: Iterable[dict[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    hasher: PasswordHasher | None = None,
+    max_workers: int | None = None,
+    checkpoint: str | Path | None = None,
+    on_batch: Callable[[ImportProgress], None] | None = None,
+) -> ImportProgress:
+    """Insert user records in batches, hashing plaintext passwords in parallel.
+
+    Args:
+        engine: The database to import into.
+        records: The input records, as returned by read_records.
+        batch_size: The number of records per transaction.
+        hasher: The hasher for plaintext passwords; defaults to the default hasher.
+        max_workers: The number of hashing processes; defaults to the CPU count.
+        checkpoint: A file recording progress. When it exists, that many input
+            records are skipped before importing.
+        on_batch: Called with the progress after each committed batch.
+
+    Returns:
+        The final progress counters.
+    """
+    hasher = hasher or get_password_hasher()
+    progress = ImportProgress()
+    records = iter(records)
+    if checkpoint is not None:
+        progress.records = read_checkpoint(checkpoint)
+        records = itertools.islice(records, progress.records, None)
+    workers = max_workers or os.cpu_count() or 1
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        while batch := list(itertools.islice(records, batch_size)):
+            rows: dict[str, dict[str, Any]] = {}
+            plaintext: dict[str, str] = {}
+            for record in batch:
+                row, password = _prepare(record)
+                if row is None:
+                    progress.rejected += 1
+                elif row["username"] in rows:
+                    # Duplicate within the batch; keep the first, like the database.
+                    progress.skipped_existing += 1
+                else:
+                    rows[row["username"]] = row
+                    if password is not None:
+                        plaintext[row["username"]] = password
+            with engine.connect() as connection:
+                existing = _existing_usernames(connection, list(rows))
+            for username in existing:
+                del rows[username]
+                plaintext.pop(username, None)
+            progress.skipped_existing += len(existing)
+            if plaintext:
+                # Hash without holding a connection or transaction open.
+                chunksize = max(1, len(plaintext) // (workers * 4))
+                hashes = executor.map(
+                    hasher.hash, plaintext.values(), chunksize=chunksize
+                )
+                for username, password_hash in zip(plaintext, hashes, strict=True):
+                    rows[username]["password_hash"] = password_hash
+                progress.hashed += len(plaintext)
+            progress.skipped_existing += _insert_batch(engine, rows)
+            progress.inserted += len(rows)
+            progress.records += len(batch)
+            if checkpoint is not None:
+                _write_checkpoint(checkpoint, progress.records)
+            if on_batch is not None:
+                on_batch(progress)
+    return progress
+
+
+def export_users(
+    engine: sqlalchemy.Engine,
+    stream: IO[str],
+    fmt: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Write all users to a stream, fetching batch_size rows at a time.
+
+    Args:
+        engine: The database to export from.
+        stream: The text stream to write to.
+        fmt: "csv" or "jsonl".
+        batch_size: The number of rows fetched from the database at a time.
+
+    Returns:
+        The number of users written.
+    """
+    writer = None
+    if fmt == "csv":
+        writer = csv.writer(stream)
+        writer.writerow(EXPORT_FIELDS)
+    count = 0
+    statement = select(
+        LocalUser.username, LocalUser.password_hash, LocalUser.enabled
+    ).order_by(col(LocalUser.id))
+    with engine.connect() as connection:
+        # yield_per streams with a server-side cursor where the driver supports it.
+        result = connection.execution_options(yield_per=batch_size).execute(statement)
+        for username, password_hash, enabled in result:
+            password_hash = password_hash.decode("ascii")
+            if writer is not None:
+                writer.writerow(
+                    (username, password_hash, "true" if enabled else "false")
+                )
+            else:
+                stream.write(
+                    json.dumps(
+                        {
+                            "username": username,
+                            "password_hash": password_hash,
+                            "enabled": enabled,
+                        }
+                    )
+                    + "\n"
+                )
+            count += 1
+    return count
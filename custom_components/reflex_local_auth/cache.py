@@ -0,0 +1,428 @@
+"""Cache the auth_token -> user resolution performed by LocalAuthState.
+
+Every recompute of `LocalAuthState.authenticated_user` joins LocalUser with
+LocalAuthSession. With a session cache configured, the result of that join is
+kept in memory until the cache TTL or the session's own expiration, whichever
+comes first.
+
+The cache is disabled by default. Enable it before the app starts handling events:
+
+```python
+reflex_local_auth.cache.set_session_cache(
+    reflex_local_auth.cache.MemorySessionCache(max_size=10_000),
+)
+```
+
+When running several backend workers, `RedisSessionCache` shares entries through
+the Redis instance Reflex already uses for `StateManagerRedis`, and broadcasts
+invalidations so a logout on one worker is seen by all of them.
+`shared_session_cache()` picks RedisSessionCache when Redis is configured, and
+falls back to MemorySessionCache for single-process deployments.
+
+Tokens without an unexpired session, like stale local storage values sent by
+logged out clients, are remembered in a separate bounded LRU for
+`negative_ttl`, so repeated lookups of the same unknown token skip the
+database too. `_login` invalidates the token it creates a session for, which
+drops its negative entry on every worker. Negative entries are kept per worker,
+even with RedisSessionCache, so unknown tokens never cost a Redis write.
+
+Custom backends subclass SessionCache and implement `_get`, `_set`,
+`invalidate` and `clear`, and `_reject` to support negative caching.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any
+
+from . import db
+from .instrumentation import COUNT_SESSION_CACHE_HIT, COUNT_SESSION_CACHE_MISS, count
+from .redis_client import resolve_redis
+from .user import AuthenticatedUser
+
+DEFAULT_SESSION_CACHE_MAX_SIZE = 10_000
+DEFAULT_SESSION_CACHE_TTL = datetime.timedelta(minutes=1)
+DEFAULT_NEGATIVE_CACHE_MAX_SIZE = 10_000
+DEFAULT_NEGATIVE_CACHE_TTL = datetime.timedelta(seconds=30)
+DEFAULT_REDIS_KEY_PREFIX = "reflex_local_auth:session:"
+# Published on the invalidation channel to clear every worker's local cache.
+_CLEAR_ALL = "*"
+# Returned for rejected tokens; the same unauthenticated user the query resolves to.
+_REJECTED = AuthenticatedUser()
+
+
+def _seconds_until(expiration: datetime.datetime) -> float:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return (db.as_utc(expiration) - now).total_seconds()
+
+
+class SessionCache:
+    """Base class for caches mapping an auth_token to its AuthenticatedUser.
+
+    Cached users are immutable and shared between all states reading the same
+    token.
+    """
+
+    def __init__(
+        self,
+        ttl: datetime.timedelta = DEFAULT_SESSION_CACHE_TTL,
+        negative_ttl: datetime.timedelta | None = DEFAULT_NEGATIVE_CACHE_TTL,
+    ):
+        """Initialize the cache.
+
+        Args:
+            ttl: The maximum time an entry is kept, regardless of session expiration.
+            negative_ttl: How long a token without a session is remembered, or
+                None to look up unknown tokens every time.
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, auth_token: str) -> AuthenticatedUser | None:
+        """Look up the user for an auth_token, counting hits and misses.
+
+        Args:
+            auth_token: The auth_token to look up.
+
+        Returns:
+            The cached AuthenticatedUser, an AuthenticatedUser with id=-1 if the
+            token was rejected, or None if the token is not cached.
+        """
+        user = self._get(auth_token)
+        if user is None:
+            self.misses += 1
+            count(COUNT_SESSION_CACHE_MISS, backend=type(self).__name__)
+        else:
+            self.hits += 1
+            count(COUNT_SESSION_CACHE_HIT, backend=type(self).__name__)
+        return user
+
+    def set(
+        self, auth_token: str, user: AuthenticatedUser, expiration: datetime.datetime
+    ) -> None:
+        """Cache the user for an auth_token until the TTL or session expiration.
+
+        Args:
+            auth_token: The auth_token to cache.
+            user: The AuthenticatedUser associated with the auth_token.
+            expiration: When the LocalAuthSession for the auth_token expires.
+        """
+        ttl = min(self.ttl.total_seconds(), _seconds_until(expiration))
+        if ttl > 0:
+            self._set(auth_token, user, ttl)
+
+    def reject(self, auth_token: str) -> None:
+        """Remember that an auth_token has no unexpired session, for negative_ttl.
+
+        Args:
+            auth_token: The auth_token that resolved to no user.
+        """
+        if self.negative_ttl is not None:
+            self._reject(auth_token, self.negative_ttl.total_seconds())
+
+    def _get(self, auth_token: str) -> AuthenticatedUser | None:
+        raise NotImplementedError
+
+    def _set(self, auth_token: str, user: AuthenticatedUser, ttl: float) -> None:
+        raise NotImplementedError
+
+    def _reject(self, auth_token: str, ttl: float) -> None:
+        """Negative caching is optional; backends without it look up every time."""
+
+    def invalidate(self, auth_token: str) -> None:
+        """Remove any cached user for an auth_token.
+
+        Args:
+            auth_token: The auth_token to remove.
+        """
+        raise NotImplementedError
+
+    def invalidate_many(self, auth_tokens: Iterable[str]) -> None:
+        """Remove any cached users for several auth_tokens.
+
+        Args:
+            auth_tokens: The auth_tokens to remove.
+        """
+        for auth_token in auth_tokens:
+            self.invalidate(auth_token)
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        raise NotImplementedError
+
+
+class MemorySessionCache(SessionCache):
+    """A size-bounded, in-process LRU cache with per-entry expiration.
+
+    Rejected tokens are kept in a second LRU, so a flood of unknown tokens
+    cannot evict the cached users.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_SESSION_CACHE_MAX_SIZE,
+        ttl: datetime.timedelta = DEFAULT_SESSION_CACHE_TTL,
+        negative_ttl: datetime.timedelta | None = DEFAULT_NEGATIVE_CACHE_TTL,
+        negative_max_size: int = DEFAULT_NEGATIVE_CACHE_MAX_SIZE,
+    ):
+        """Initialize the cache.
+
+        Args:
+            max_size: The maximum number of entries before the least recently
+                used entry is evicted.
+            ttl: The maximum time an entry is kept, regardless of session expiration.
+            negative_ttl: How long a token without a session is remembered, or
+                None to look up unknown tokens every time.
+            negative_max_size: The maximum number of rejected tokens remembered.
+        """
+        super().__init__(ttl=ttl, negative_ttl=negative_ttl)
+        self.max_size = max_size
+        self.negative_max_size = negative_max_size
+        self._entries: OrderedDict[str, tuple[float, AuthenticatedUser]] = OrderedDict()
+        # auth_token -> timestamp when the rejection expires
+        self._rejected: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get(self, auth_token: str) -> AuthenticatedUser | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(auth_token)
+            if entry is not None:
+                expires_at, user = entry
+                if expires_at > now:
+                    self._entries.move_to_end(auth_token)
+                    return user
+                del self._entries[auth_token]
+            rejected_until = self._rejected.get(auth_token)
+            if rejected_until is None:
+                return None
+            if rejected_until <= now:
+                del self._rejected[auth_token]
+                return None
+            self._rejected.move_to_end(auth_token)
+            return _REJECTED
+
+    def _set(self, auth_token: str, user: AuthenticatedUser, ttl: float) -> None:
+        with self._lock:
+            self._rejected.pop(auth_token, None)
+            self._entries[auth_token] = (time.monotonic() + ttl, user)
+            self._entries.move_to_end(auth_token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _reject(self, auth_token: str, ttl: float) -> None:
+        with self._lock:
+            self._entries.pop(auth_token, None)
+            self._rejected[auth_token] = time.monotonic() + ttl
+            self._rejected.move_to_end(auth_token)
+            while len(self._rejected) > self.negative_max_size:
+                self._rejected.popitem(last=False)
+
+    def invalidate(self, auth_token: str) -> None:
+        """Remove any cached user for an auth_token.
+
+        Args:
+            auth_token: The auth_token to remove.
+        """
+        with self._lock:
+            self._entries.pop(auth_token, None)
+            self._rejected.pop(auth_token, None)
+
+    def invalidate_many(self, auth_tokens: Iterable[str]) -> None:
+        """Remove any cached users for several auth_tokens.
+
+        Args:
+            auth_tokens: The auth_tokens to remove.
+        """
+        with self._lock:
+            for auth_token in auth_tokens:
+                self._entries.pop(auth_token, None)
+                self._rejected.pop(auth_token, None)
+
+    def clear(self) -> None:
+        """Remove all cached entries."""
+        with self._lock:
+            self._entries.clear()
+            self._rejected.clear()
+
+
+class RedisSessionCache(SessionCache):
+    """A session cache shared by all backend workers through Redis.
+
+    Each worker keeps a small local LRU in front of Redis. Invalidations delete
+    the shared entry and are published to every worker, which drops its local
+    copy. Rejected tokens are only remembered in the local LRU.
+    """
+
+    def __init__(
+        self,
+        redis: Any = None,
+        ttl: datetime.timedelta = DEFAULT_SESSION_CACHE_TTL,
+        key_prefix: str = DEFAULT_REDIS_KEY_PREFIX,
+        local_max_size: int = DEFAULT_SESSION_CACHE_MAX_SIZE,
+        negative_ttl: datetime.timedelta | None = DEFAULT_NEGATIVE_CACHE_TTL,
+        negative_max_size: int = DEFAULT_NEGATIVE_CACHE_MAX_SIZE,
+    ):
+        """Initialize the cache.
+
+        Args:
+            redis: A synchronous redis client, see `redis_client.resolve_redis`.
+            ttl: The maximum time an entry is kept, regardless of session expiration.
+            key_prefix: Prefix for cache keys and the invalidation channel name.
+            local_max_size: The maximum number of entries in the local LRU.
+            negative_ttl: How long a token without a session is remembered, or
+                None to look up unknown tokens every time.
+            negative_max_size: The maximum number of rejected tokens remembered
+                by each worker.
+
+        Raises:
+            ValueError: If no redis client is passed and redis_url is not configured.
+        """
+        super().__init__(ttl=ttl, negative_ttl=negative_ttl)
+        self.redis = resolve_redis(redis, "RedisSessionCache")
+        self.key_prefix = key_prefix
+        self.channel = f"{key_prefix}invalidate"
+        self.local = MemorySessionCache(
+            max_size=local_max_size,
+            ttl=ttl,
+            negative_ttl=negative_ttl,
+            negative_max_size=negative_max_size,
+        )
+        self._listener = None
+
+    def _key(self, auth_token: str) -> str:
+        return f"{self.key_prefix}{auth_token}"
+
+    def _ensure_listener(self) -> None:
+        if self._listener is not None:
+            return
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: self._on_invalidate})
+        self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def _on_invalidate(self, message: dict) -> None:
+        auth_token = message["data"]
+        if isinstance(auth_token, bytes):
+            auth_token = auth_token.decode()
+        if auth_token == _CLEAR_ALL:
+            self.local.clear()
+        else:
+            self.local.invalidate(auth_token)
+
+    def _get(self, auth_token: str) -> AuthenticatedUser | None:
+        self._ensure_listener()
+        user = self.local._get(auth_token)
+        if user is not None:
+            return user
+        pipe = self.redis.pipeline()
+        pipe.get(self._key(auth_token))
+        pipe.pttl(self._key(auth_token))
+        data, pttl = pipe.execute()
+        if data is None or pttl <= 0:
+            return None
+        user = AuthenticatedUser(**json.loads(data))
+        self.local._set(auth_token, user, min(pttl / 1000, self.ttl.total_seconds()))
+        return user
+
+    def _set(self, auth_token: str, user: AuthenticatedUser, ttl: float) -> None:
+        self._ensure_listener()
+        data = json.dumps(dataclasses.asdict(user))
+        self.redis.set(self._key(auth_token), data, px=max(int(ttl * 1000), 1))
+        self.local._set(auth_token, user, ttl)
+
+    def _reject(self, auth_token: str, ttl: float) -> None:
+        # Local only: a login on another worker invalidates it through the channel.
+        self._ensure_listener()
+        self.local._reject(auth_token, ttl)
+
+    def invalidate(self, auth_token: str) -> None:
+        """Remove the cached user for an auth_token from all workers.
+
+        Args:
+            auth_token: The auth_token to remove.
+        """
+        self.local.invalidate(auth_token)
+        self.redis.delete(self._key(auth_token))
+        self.redis.publish(self.channel, auth_token)
+
+    def invalidate_many(self, auth_tokens: Iterable[str]) -> None:
+        """Remove the cached users for several auth_tokens from all workers.
+
+        Args:
+            auth_tokens: The auth_tokens to remove.
+        """
+        auth_tokens = list(auth_tokens)
+        if not auth_tokens:
+            return
+        self.local.invalidate_many(auth_tokens)
+        # One round trip for the whole batch.
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(*(self._key(auth_token) for auth_token in auth_tokens))
+        for auth_token in auth_tokens:
+            pipe.publish(self.channel, auth_token)
+        pipe.execute()
+
+    def clear(self) -> None:
+        """Remove all cached entries from all workers."""
+        self.local.clear()
+        keys = list(self.redis.scan_iter(match=f"{self.key_prefix}*"))
+        if keys:
+            self.redis.delete(*keys)
+        self.redis.publish(self.channel, _CLEAR_ALL)
+
+
+def shared_session_cache(**kwargs: Any) -> SessionCache:
+    """Create a session cache suitable for the current deployment.
+
+    Args:
+        **kwargs: Passed to RedisSessionCache when redis_url is configured,
+            otherwise `ttl`, `negative_ttl` and `negative_max_size` are passed
+            to MemorySessionCache.
+
+    Returns:
+        A RedisSessionCache if the app uses redis, otherwise a MemorySessionCache.
+    """
+    from reflex.utils import prerequisites
+
+    if kwargs.get("redis") is not None or prerequisites.parse_redis_url():
+        return RedisSessionCache(**kwargs)
+    return MemorySessionCache(
+        **{
+            name: kwargs[name]
+            for name in ("ttl", "negative_ttl", "negative_max_size")
+            if name in kwargs
+        }
+    )
+
+
+_session_cache: SessionCache | None = None
+
+
+def set_session_cache(cache: SessionCache | None) -> None:
+    """Set the cache used by LocalAuthState.authenticated_user.
+
+    Args:
+        cache: The cache to use, or None to disable caching.
+    """
+    global _session_cache
+    _session_cache = cache
+
+
+def get_session_cache() -> SessionCache | None:
+    """Get the configured session cache.
+
+    Returns:
+        The configured SessionCache, or None if caching is disabled.
+    """
+    return _session_cache
@@ -0,0 +1,426 @@
+"""Database sessions used for all auth queries.
+
+When the app configures `async_db_url` (for example `sqlite+aiosqlite://...` or
+`postgresql+asyncpg://...`), the async variants of the auth queries use
+`rx.asession()` so they don't block the event loop during I/O. Without an
+`async_db_url`, or after `set_async_db(False)`, they fall back to the sync
+`rx.session()`.
+
+By default auth queries share the engines Reflex builds for `rx.session()`.
+An engine config gives them engines of their own, with a dedicated connection
+pool, SQLite pragmas suited to concurrent logins, and an optional read replica
+for the `authenticated_user` query and the login username lookup:
+
+```python
+reflex_local_auth.db.set_engine_config(
+    reflex_local_auth.db.EngineConfig(pool_size=20, max_overflow=10),
+)
+```
+
+On SQLite, the default config switches the database to WAL mode, so reads no
+longer block the commit of a login and a login no longer blocks reads. Writers
+wait up to `sqlite_busy_timeout` for each other instead of failing with
+"database is locked", and `synchronous=NORMAL` skips the fsync on each commit,
+which is safe in WAL mode.
+
+With a replica, reads are routed to it except right after the same client
+wrote: `LocalAuthState` sends its reads to the primary for `replica_lag` after
+logging in, logging out or registering, so a new session or user is never
+missed because the replica hasn't caught up yet.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+from typing import TYPE_CHECKING, Any, TypeVar, overload
+
+import reflex as rx
+import sqlalchemy
+import sqlmodel
+from reflex.config import get_config
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+if TYPE_CHECKING:
+    from sqlalchemy import Row
+    from sqlalchemy.sql.dml import UpdateBase
+    from sqlmodel.sql.expression import Select, SelectOfScalar
+    from typing_extensions import TypeVarTuple, Unpack
+
+    Ts = TypeVarTuple("Ts")
+
+T = TypeVar("T")
+
+DEFAULT_SQLITE_BUSY_TIMEOUT = datetime.timedelta(seconds=5)
+DEFAULT_REPLICA_LAG = datetime.timedelta(seconds=5)
+
+_use_async: bool = True
+
+
+@dataclasses.dataclass(frozen=True)
+class EngineConfig:
+    """Engine settings for auth queries.
+
+    Pool settings left as None use Reflex's defaults, from the SQLALCHEMY_*
+    environment variables. SQLite settings are ignored for other databases.
+    """
+
+    # Defaults to db_url and async_db_url from rxconfig.py.
+    url: str | None = None
+    async_url: str | None = None
+    # A read-only replica for the authenticated_user query and username lookup.
+    replica_url: str | None = None
+    async_replica_url: str | None = None
+    # After a client writes, its reads skip the replica for this long.
+    replica_lag: datetime.timedelta = DEFAULT_REPLICA_LAG
+    pool_size: int | None = None
+    max_overflow: int | None = None
+    pool_timeout: datetime.timedelta | None = None
+    sqlite_wal: bool = True
+    sqlite_busy_timeout: datetime.timedelta | None = DEFAULT_SQLITE_BUSY_TIMEOUT
+    # NORMAL is durable in WAL mode, except for the last commits on power loss.
+    sqlite_synchronous: str | None = "NORMAL"
+
+    def pragmas(self) -> list[str]:
+        """The PRAGMA statements run on each new SQLite connection.
+
+        Returns:
+            The statements, in the order they are executed.
+        """
+        pragmas = []
+        if self.sqlite_wal:
+            pragmas.append("PRAGMA journal_mode=WAL")
+        if self.sqlite_busy_timeout is not None:
+            milliseconds = int(self.sqlite_busy_timeout.total_seconds() * 1000)
+            pragmas.append(f"PRAGMA busy_timeout={milliseconds}")
+        if self.sqlite_synchronous is not None:
+            pragmas.append(f"PRAGMA synchronous={self.sqlite_synchronous}")
+        return pragmas
+
+    def engine_args(self, url: str) -> dict[str, Any]:
+        """The keyword arguments for creating an engine for url.
+
+        Args:
+            url: The database url.
+
+        Returns:
+            Reflex's engine arguments, with this config's pool settings.
+        """
+        from reflex.model import get_engine_args
+
+        kwargs = get_engine_args(url)
+        if self.pool_size is not None:
+            kwargs["pool_size"] = self.pool_size
+        if self.max_overflow is not None:
+            kwargs["max_overflow"] = self.max_overflow
+        if self.pool_timeout is not None:
+            kwargs["pool_timeout"] = self.pool_timeout.total_seconds()
+        return kwargs
+
+
+_engine_config: EngineConfig | None = None
+# Engines built for _engine_config, by url.
+_engines: dict[str, sqlalchemy.Engine] = {}
+_async_sessionmakers: dict[str, async_sessionmaker[AsyncSession]] = {}
+
+
+def set_engine_config(config: EngineConfig | None) -> None:
+    """Set the engine settings used by auth queries.
+
+    Engines built for a previous config are disposed.
+
+    Args:
+        config: The settings to use, or None to share Reflex's engines.
+    """
+    global _engine_config
+    for engine in _engines.values():
+        engine.dispose()
+    for maker in _async_sessionmakers.values():
+        bind = maker.kw["bind"]
+        # Connections of the async pool are closed when garbage collected.
+        bind.sync_engine.dispose(close=False)
+    _engines.clear()
+    _async_sessionmakers.clear()
+    _engine_config = config
+
+
+def get_engine_config() -> EngineConfig | None:
+    """Get the configured engine settings.
+
+    Returns:
+        The configured EngineConfig, or None if auth queries use Reflex's engines.
+    """
+    return _engine_config
+
+
+def replica_lag() -> datetime.timedelta | None:
+    """How long a client's reads skip the replica after it writes.
+
+    Returns:
+        The configured replica_lag, or None if no replica is configured.
+    """
+    config = _engine_config
+    if config is None or (config.replica_url or config.async_replica_url) is None:
+        return None
+    return config.replica_lag
+
+
+def as_utc(value: datetime.datetime) -> datetime.datetime:
+    """Attach the UTC timezone to a datetime read back without one.
+
+    SQLite does not store the timezone, but all auth timestamps are written in UTC.
+
+    Args:
+        value: A datetime read from the database.
+
+    Returns:
+        The datetime, timezone-aware.
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def _apply_pragmas(engine: sqlalchemy.Engine, config: EngineConfig) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = config.pragmas()
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def _configured_engine(url: str, config: EngineConfig) -> sqlalchemy.Engine:
+    engine = _engines.get(url)
+    if engine is None:
+        engine = _engines[url] = sqlalchemy.create_engine(
+            url, **config.engine_args(url)
+        )
+        _apply_pragmas(engine, config)
+    return engine
+
+
+def _configured_sessionmaker(
+    url: str, config: EngineConfig
+) -> async_sessionmaker[AsyncSession]:
+    maker = _async_sessionmakers.get(url)
+    if maker is None:
+        engine = create_async_engine(url, **config.engine_args(url))
+        _apply_pragmas(engine.sync_engine, config)
+        # The same options as rx.asession().
+        maker = _async_sessionmakers[url] = async_sessionmaker(
+            bind=engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autocommit=False,
+            autoflush=False,
+        )
+    return maker
+
+
+def get_engine(replica: bool = False) -> sqlalchemy.Engine:
+    """Get the sync engine used by auth queries.
+
+    Args:
+        replica: Get the read replica's engine, if one is configured.
+
+    Returns:
+        The configured engine, or Reflex's engine without an engine config.
+    """
+    config = _engine_config
+    if config is None:
+        from reflex.model import get_engine as get_reflex_engine
+
+        return get_reflex_engine()
+    url = (replica and config.replica_url) or config.url or get_config().db_url
+    if url is None:
+        msg = "No database url configured"
+        raise ValueError(msg)
+    return _configured_engine(url, config)
+
+
+def set_async_db(enabled: bool) -> None:
+    """Enable or disable the async database path.
+
+    Args:
+        enabled: Whether to use rx.asession() when async_db_url is configured.
+    """
+    global _use_async
+    _use_async = enabled
+
+
+def async_db_enabled() -> bool:
+    """Whether auth queries should use the async database path.
+
+    Returns:
+        True if the async path is enabled and async_db_url is configured.
+    """
+    return _use_async and get_config().async_db_url is not None
+
+
+def session() -> sqlmodel.Session:
+    """Get a sync session for auth queries.
+
+    Returns:
+        A database session.
+    """
+    if _engine_config is None:
+        return rx.session()
+    return sqlmodel.Session(get_engine())
+
+
+def asession() -> AsyncSession:
+    """Get an async session for auth queries.
+
+    Returns:
+        An async database session.
+    """
+    config = _engine_config
+    if config is None:
+        return rx.asession()
+    url = config.async_url or get_config().async_db_url
+    if url is None:
+        msg = "No async database url configured"
+        raise ValueError(msg)
+    return _configured_sessionmaker(url, config)()
+
+
+def read_session() -> sqlmodel.Session:
+    """Get a sync session for reads that tolerate replica lag.
+
+    Returns:
+        A session on the read replica, or on the primary if none is configured.
+    """
+    if _engine_config is None or _engine_config.replica_url is None:
+        return session()
+    return sqlmodel.Session(get_engine(replica=True))
+
+
+def aread_session() -> AsyncSession:
+    """Get an async session for reads that tolerate replica lag.
+
+    Returns:
+        A session on the read replica, or on the primary if none is configured.
+    """
+    if _engine_config is None or _engine_config.async_replica_url is None:
+        return asession()
+    return _configured_sessionmaker(_engine_config.async_replica_url, _engine_config)()
+
+
+@overload
+async def exec_first(
+    statement: SelectOfScalar[T],
+    params: dict[str, Any] | None = None,
+    replica: bool = False,
+) -> T | None: ...
+
+
+@overload
+async def exec_first(
+    statement: Select[Unpack[Ts]],
+    params: dict[str, Any] | None = None,
+    replica: bool = False,
+) -> Row[Unpack[Ts]] | None: ...
+
+
+async def exec_first(
+    statement: Any,
+    params: dict[str, Any] | None = None,
+    replica: bool = False,
+) -> Any:
+    """Execute a select statement and return the first result.
+
+    Uses the async session when enabled, otherwise the sync session.
+
+    Args:
+        statement: The select statement to execute.
+        params: Values for the statement's bound parameters.
+        replica: Read from the replica, if one is configured.
+
+    Returns:
+        The first result, a row for a multi-column select, or None if there
+        are no results.
+    """
+    if async_db_enabled():
+        async with aread_session() if replica else asession() as async_session:
+            return (await async_session.exec(statement, params=params)).first()
+    with read_session() if replica else session() as sync_session:
+        return sync_session.exec(statement, params=params).first()
+
+
+async def exec_all(statement: SelectOfScalar[T]) -> list[T]:
+    """Execute a single-entity select statement and return all results.
+
+    Uses the async session when enabled, otherwise the sync session.
+
+    Args:
+        statement: The select statement to execute.
+
+    Returns:
+        The results.
+    """
+    if async_db_enabled():
+        async with asession() as async_session:
+            return list((await async_session.exec(statement)).all())
+    with session() as sync_session:
+        return list(sync_session.exec(statement).all())
+
+
+async def exec_commit(statement: UpdateBase) -> int:
+    """Execute an INSERT, UPDATE or DELETE statement and commit it.
+
+    Uses the async session when enabled, otherwise the sync session.
+
+    Args:
+        statement: The statement to execute.
+
+    Returns:
+        The number of rows matched by the statement.
+    """
+    if async_db_enabled():
+        async with asession() as async_session:
+            result = await async_session.exec(statement)
+            await async_session.commit()
+        return result.rowcount
+    with session() as sync_session:
+        result = sync_session.exec(statement)
+        sync_session.commit()
+    return result.rowcount
+
+
+async def exec_commit_returning(statement: UpdateBase) -> list[Any]:
+    """Execute a statement with a single-column RETURNING clause and commit it.
+
+    Uses the async session when enabled, otherwise the sync session.
+
+    Args:
+        statement: The statement to execute.
+
+    Returns:
+        The returned values, one per affected row.
+    """
+    if async_db_enabled():
+        async with asession() as async_session:
+            result = await async_session.exec(statement)
+            values = list(result.scalars())
+            await async_session.commit()
+        return values
+    with session() as sync_session:
+        values = list(sync_session.exec(statement).scalars())
+        sync_session.commit()
+    return values
+
+
+def delete_returning_supported() -> bool:
+    """Whether the database supports DELETE ... RETURNING.
+
+    Returns:
+        True for SQLite 3.35+, PostgreSQL and other dialects with RETURNING.
+    """
+    return get_engine().dialect.delete_returning
@@ -0,0 +1,564 @@
+"""Pluggable password hashers, with cost tuning and rehash-on-login.
+
+New password hashes are created by the default hasher, `BcryptHasher(rounds=12)`
+unless configured otherwise. Stored hashes are verified by whichever registered
+hasher recognizes their modular crypt prefix (`$2b$`, `$scrypt$`, `$argon2id$`),
+so the default can be changed at any time:
+
+```python
+reflex_local_auth.hashers.set_password_hasher(
+    reflex_local_auth.hashers.Argon2Hasher(time_cost=3, memory_cost=65536),
+)
+```
+
+When a user logs in with a hash created by a different hasher, or with outdated
+parameters, `LoginState.on_submit` replaces it with a hash from the default
+hasher.
+
+Pick a cost for the current hardware with the calibration utility, which
+reports the highest cost whose verification stays within the target time:
+
+```console
+python -m reflex_local_auth calibrate --algorithm bcrypt --target-ms 250
+```
+
+`Argon2Hasher` requires the `argon2-cffi` package, installed separately.
+"""
+
+from __future__ import annotations
+
+import base64
+import dataclasses
+import datetime
+import functools
+import hashlib
+import hmac
+import os
+import time
+from typing import Any
+
+import bcrypt
+
+DEFAULT_CALIBRATION_TARGET = datetime.timedelta(milliseconds=250)
+
+
+class PasswordHasher:
+    """Base class for password hashers.
+
+    Subclasses are frozen dataclasses holding the hashing parameters, so they
+    can be compared, used as cache keys, and sent to a process pool.
+    """
+
+    # Identifies the algorithm in spans and calibration output.
+    name: str = ""
+    # Modular crypt prefixes of hashes this hasher can verify.
+    prefixes: tuple[bytes, ...] = ()
+    # The range searched by calibrate().
+    min_cost: int = 1
+    max_cost: int = 1
+
+    @property
+    def cost(self) -> int:
+        """The cost parameter adjusted by calibrate()."""
+        raise NotImplementedError
+
+    def with_cost(self, cost: int) -> PasswordHasher:
+        """Get a copy of this hasher with a different cost.
+
+        Args:
+            cost: The new cost parameter.
+
+        Returns:
+            The new hasher.
+        """
+        raise NotImplementedError
+
+    def identify(self, password_hash: bytes) -> bool:
+        """Whether this hasher can verify password_hash.
+
+        Args:
+            password_hash: A stored password hash.
+
+        Returns:
+            True if the hash has one of this hasher's prefixes.
+        """
+        return password_hash.startswith(self.prefixes)
+
+    def hash_cost(self, password_hash: bytes) -> int | None:
+        """Get the cost parameter a stored hash was created with.
+
+        Args:
+            password_hash: A hash recognized by this hasher.
+
+        Returns:
+            The cost, or None if the hash is malformed.
+        """
+        raise NotImplementedError
+
+    def hash(self, secret: str) -> bytes:
+        """Hash a password.
+
+        Args:
+            secret: The password to hash.
+
+        Returns:
+            The password hash in modular crypt format.
+        """
+        raise NotImplementedError
+
+    def verify(self, secret: str, password_hash: bytes) -> bool:
+        """Check a password against a stored hash.
+
+        Args:
+            secret: The password to check.
+            password_hash: A hash recognized by this hasher.
+
+        Returns:
+            True if the password matches.
+        """
+        raise NotImplementedError
+
+    def needs_rehash(self, password_hash: bytes) -> bool:
+        """Whether a stored hash uses parameters other than this hasher's.
+
+        Args:
+            password_hash: A hash recognized by this hasher.
+
+        Returns:
+            True if the hash should be replaced.
+        """
+        return self.hash_cost(password_hash) != self.cost
+
+
+@dataclasses.dataclass(frozen=True)
+class BcryptHasher(PasswordHasher):
+    """Hash passwords with bcrypt; rounds is the log2 of the work factor."""
+
+    rounds: int = 12
+
+    name = "bcrypt"
+    prefixes = (b"$2a$", b"$2b$", b"$2y$")
+    min_cost = 4
+    max_cost = 31
+
+    @property
+    def cost(self) -> int:
+        """The bcrypt rounds."""
+        return self.rounds
+
+    def with_cost(self, cost: int) -> BcryptHasher:
+        """Get a copy of this hasher with different rounds.
+
+        Args:
+            cost: The new bcrypt rounds.
+
+        Returns:
+            The new hasher.
+        """
+        return dataclasses.replace(self, rounds=cost)
+
+    def hash_cost(self, password_hash: bytes) -> int | None:
+        """Get the rounds a bcrypt hash was created with.
+
+        Args:
+            password_hash: A bcrypt hash, like $2b$12$...
+
+        Returns:
+            The rounds, or None if the hash is malformed.
+        """
+        try:
+            return int(password_hash.split(b"$")[2])
+        except (IndexError, ValueError):
+            return None
+
+    def hash(self, secret: str) -> bytes:
+        """Hash a password with bcrypt.
+
+        Args:
+            secret: The password to hash.
+
+        Returns:
+            The bcrypt hash.
+        """
+        return bcrypt.hashpw(
+            password=secret.encode("utf-8"),
+            salt=bcrypt.gensalt(self.rounds),
+        )
+
+    def verify(self, secret: str, password_hash: bytes) -> bool:
+        """Check a password against a bcrypt hash.
+
+        Args:
+            secret: The password to check.
+            password_hash: The bcrypt hash.
+
+        Returns:
+            True if the password matches.
+        """
+        return bcrypt.checkpw(
+            password=secret.encode("utf-8"),
+            hashed_password=password_hash,
+        )
+
+
+@dataclasses.dataclass(frozen=True)
+class ScryptHasher(PasswordHasher):
+    """Hash passwords with scrypt from the standard library.
+
+    Hashes look like `$scrypt$ln=15,r=8,p=1$<salt>$<hash>`, where ln is the log2
+    of the CPU/memory cost N. Memory use is 128 * r * 2**ln bytes.
+    """
+
+    ln: int = 15
+    r: int = 8
+    p: int = 1
+
+    name = "scrypt"
+    prefixes = (b"$scrypt$",)
+    min_cost = 10
+    max_cost = 22
+
+    @property
+    def cost(self) -> int:
+        """The scrypt ln (log2 of N)."""
+        return self.ln
+
+    def with_cost(self, cost: int) -> ScryptHasher:
+        """Get a copy of this hasher with a different ln.
+
+        Args:
+            cost: The new log2 of N.
+
+        Returns:
+            The new hasher.
+        """
+        return dataclasses.replace(self, ln=cost)
+
+    @staticmethod
+    def _parse(password_hash: bytes) -> tuple[dict[str, int], bytes, bytes]:
+        _, _, params, salt, digest = password_hash.decode("ascii").split("$")
+        values = {
+            key: int(value)
+            for key, _, value in (param.partition("=") for param in params.split(","))
+        }
+        return values, _b64decode(salt), _b64decode(digest)
+
+    @staticmethod
+    def _derive(secret: str, salt: bytes, ln: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(
+            secret.encode("utf-8"),
+            salt=salt,
+            n=2**ln,
+            r=r,
+            p=p,
+            maxmem=2 * 128 * r * 2**ln,
+            dklen=32,
+        )
+
+    def hash_cost(self, password_hash: bytes) -> int | None:
+        """Get the ln a scrypt hash was created with.
+
+        Args:
+            password_hash: A scrypt hash.
+
+        Returns:
+            The ln, or None if the hash is malformed.
+        """
+        try:
+            return self._parse(password_hash)[0]["ln"]
+        except (KeyError, ValueError):
+            return None
+
+    def hash(self, secret: str) -> bytes:
+        """Hash a password with scrypt.
+
+        Args:
+            secret: The password to hash.
+
+        Returns:
+            The scrypt hash.
+        """
+        salt = os.urandom(16)
+        digest = self._derive(secret, salt, self.ln, self.r, self.p)
+        return (
+            f"$scrypt$ln={self.ln},r={self.r},p={self.p}"
+            f"${_b64encode(salt)}${_b64encode(digest)}"
+        ).encode("ascii")
+
+    def verify(self, secret: str, password_hash: bytes) -> bool:
+        """Check a password against a scrypt hash.
+
+        Args:
+            secret: The password to check.
+            password_hash: The scrypt hash.
+
+        Returns:
+            True if the password matches.
+
+        Raises:
+            ValueError: If the hash is malformed.
+        """
+        try:
+            params, salt, digest = self._parse(password_hash)
+            derived = self._derive(secret, salt, params["ln"], params["r"], params["p"])
+        except (KeyError, ValueError) as err:
+            msg = "Invalid scrypt hash."
+            raise ValueError(msg) from err
+        return hmac.compare_digest(derived, digest)
+
+    def needs_rehash(self, password_hash: bytes) -> bool:
+        """Whether a scrypt hash uses parameters other than this hasher's.
+
+        Args:
+            password_hash: A scrypt hash.
+
+        Returns:
+            True if the hash should be replaced.
+        """
+        try:
+            params = self._parse(password_hash)[0]
+        except ValueError:
+            return True
+        return params != {"ln": self.ln, "r": self.r, "p": self.p}
+
+
+@dataclasses.dataclass(frozen=True)
+class Argon2Hasher(PasswordHasher):
+    """Hash passwords with argon2id; requires the `argon2-cffi` package.
+
+    memory_cost is in KiB, and time_cost is the cost tuned by calibrate().
+    """
+
+    time_cost: int = 3
+    memory_cost: int = 65536
+    parallelism: int = 4
+
+    name = "argon2id"
+    prefixes = (b"$argon2id$",)
+    min_cost = 1
+    max_cost = 50
+
+    def _hasher(self) -> Any:
+        try:
+            import argon2  # pyright: ignore[reportMissingImports]
+        except ImportError as err:
+            msg = "Argon2Hasher requires `pip install argon2-cffi`."
+            raise ImportError(msg) from err
+        return argon2.PasswordHasher(
+            time_cost=self.time_cost,
+            memory_cost=self.memory_cost,
+            parallelism=self.parallelism,
+            type=argon2.Type.ID,
+        )
+
+    @property
+    def cost(self) -> int:
+        """The argon2 time_cost."""
+        return self.time_cost
+
+    def with_cost(self, cost: int) -> Argon2Hasher:
+        """Get a copy of this hasher with a different time_cost.
+
+        Args:
+            cost: The new time_cost.
+
+        Returns:
+            The new hasher.
+        """
+        return dataclasses.replace(self, time_cost=cost)
+
+    def hash_cost(self, password_hash: bytes) -> int | None:
+        """Get the time_cost an argon2 hash was created with.
+
+        Args:
+            password_hash: An argon2id hash.
+
+        Returns:
+            The time_cost, or None if the hash is malformed.
+        """
+        try:
+            params = password_hash.decode("ascii").split("$")[3]
+        except (IndexError, UnicodeDecodeError):
+            return None
+        for param in params.split(","):
+            key, _, value = param.partition("=")
+            if key == "t" and value.isdigit():
+                return int(value)
+        return None
+
+    def hash(self, secret: str) -> bytes:
+        """Hash a password with argon2id.
+
+        Args:
+            secret: The password to hash.
+
+        Returns:
+            The argon2id hash.
+        """
+        return self._hasher().hash(secret).encode("ascii")
+
+    def verify(self, secret: str, password_hash: bytes) -> bool:
+        """Check a password against an argon2id hash.
+
+        Args:
+            secret: The password to check.
+            password_hash: The argon2id hash.
+
+        Returns:
+            True if the password matches.
+
+        Raises:
+            ValueError: If the hash is malformed.
+        """
+        from argon2 import exceptions  # pyright: ignore[reportMissingImports]
+
+        try:
+            return self._hasher().verify(password_hash, secret)
+        except exceptions.VerifyMismatchError:
+            return False
+        except exceptions.InvalidHashError as err:
+            msg = "Invalid argon2 hash."
+            raise ValueError(msg) from err
+
+    def needs_rehash(self, password_hash: bytes) -> bool:
+        """Whether an argon2id hash uses parameters other than this hasher's.
+
+        Args:
+            password_hash: An argon2id hash.
+
+        Returns:
+            True if the hash should be replaced.
+        """
+        return self._hasher().check_needs_rehash(password_hash)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+_default_hasher: PasswordHasher = BcryptHasher()
+_hashers: list[PasswordHasher] = [ScryptHasher()]
+
+
+def set_password_hasher(hasher: PasswordHasher) -> None:
+    """Set the hasher used for new password hashes.
+
+    Hashes created by the previous default can still be verified, and are
+    replaced when their user logs in.
+
+    Args:
+        hasher: The new default hasher.
+    """
+    global _default_hasher
+    register_hasher(_default_hasher)
+    _default_hasher = hasher
+
+
+def register_hasher(hasher: PasswordHasher) -> None:
+    """Allow verifying hashes created by another hasher, like a legacy format.
+
+    Args:
+        hasher: The hasher to register.
+    """
+    if hasher not in _hashers:
+        _hashers.insert(0, hasher)
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Get the hasher used for new password hashes.
+
+    Returns:
+        The default hasher.
+    """
+    return _default_hasher
+
+
+def identify_hasher(password_hash: bytes) -> PasswordHasher:
+    """Find the hasher that can verify a stored hash.
+
+    Args:
+        password_hash: A stored password hash.
+
+    Returns:
+        The default hasher if it recognizes the hash, otherwise the most recently
+        registered hasher that does.
+
+    Raises:
+        ValueError: If no hasher recognizes the hash.
+    """
+    for hasher in (_default_hasher, *_hashers):
+        if hasher.identify(password_hash):
+            return hasher
+    msg = "Unrecognized password hash format."
+    raise ValueError(msg)
+
+
+def needs_rehash(password_hash: bytes) -> bool:
+    """Whether a stored hash should be replaced by one from the default hasher.
+
+    Args:
+        password_hash: A stored password hash.
+
+    Returns:
+        True if the hash was created by another hasher or with other parameters.
+    """
+    return not _default_hasher.identify(password_hash) or _default_hasher.needs_rehash(
+        password_hash
+    )
+
+
+@functools.cache
+def dummy_password_hash(hasher: PasswordHasher) -> bytes:
+    """Get a hash that no password matches, with the cost of hasher's hashes.
+
+    Args:
+        hasher: The hasher creating the hash.
+
+    Returns:
+        The hash, computed once per hasher.
+    """
+    return hasher.hash(base64.b64encode(os.urandom(32)).decode("ascii"))
+
+
+def _time_verify(hasher: PasswordHasher, samples: int) -> float:
+    password_hash = hasher.hash("calibration")
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.verify("calibration", password_hash)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def calibrate(
+    hasher: PasswordHasher,
+    target: datetime.timedelta = DEFAULT_CALIBRATION_TARGET,
+    samples: int = 3,
+) -> tuple[PasswordHasher, float]:
+    """Find the highest cost whose verification takes at most target on this machine.
+
+    Costs are tried from hasher.min_cost upwards, so this takes a few times the
+    target to run.
+
+    Args:
+        hasher: The hasher to tune; its other parameters are kept.
+        target: The maximum time for one verification.
+        samples: The number of verifications timed per cost; the fastest counts.
+
+    Returns:
+        The tuned hasher and its verification time in seconds. If even the
+        minimum cost exceeds target, the minimum cost is returned.
+    """
+    best = hasher.with_cost(hasher.min_cost)
+    best_time = _time_verify(best, samples)
+    for cost in range(hasher.min_cost + 1, hasher.max_cost + 1):
+        candidate = hasher.with_cost(cost)
+        elapsed = _time_verify(candidate, samples)
+        if elapsed > target.total_seconds():
+            break
+        best, best_time = candidate, elapsed
+    return best, best_time
@@ -0,0 +1,105 @@
+"""Run password hashing in a bounded worker pool, off the event loop.
+
+bcrypt is deliberately slow, so hashing or verifying a password inline in an
+event handler stalls every other event processed by the same backend worker.
+The async helpers in this module submit the work to a thread (or process) pool
+instead, and refuse new work when too many jobs are already waiting.
+
+The pool may be tuned before the app starts handling events:
+
+```python
+reflex_local_auth.hashing.configure_hash_pool(max_workers=8, max_pending=128)
+```
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_HASH_MAX_WORKERS = 4
+DEFAULT_HASH_MAX_PENDING = 64
+
+_max_workers: int = DEFAULT_HASH_MAX_WORKERS
+_max_pending: int = DEFAULT_HASH_MAX_PENDING
+_use_processes: bool = False
+_executor: concurrent.futures.Executor | None = None
+_pending: int = 0
+_lock = threading.Lock()
+
+
+class HashPoolBusyError(RuntimeError):
+    """Raised when the hash pool already has max_pending jobs queued or running."""
+
+
+def configure_hash_pool(
+    max_workers: int = DEFAULT_HASH_MAX_WORKERS,
+    max_pending: int = DEFAULT_HASH_MAX_PENDING,
+    use_processes: bool = False,
+) -> None:
+    """Configure the worker pool used for password hashing.
+
+    Any existing pool is shut down (without waiting) and replaced lazily on
+    the next hashing request.
+
+    Args:
+        max_workers: The number of threads or processes hashing concurrently.
+        max_pending: The maximum number of jobs queued or running before new
+            jobs are rejected with HashPoolBusyError.
+        use_processes: Use a process pool instead of a thread pool.
+    """
+    global _max_workers, _max_pending, _use_processes, _executor
+    with _lock:
+        _max_workers = max_workers
+        _max_pending = max_pending
+        _use_processes = use_processes
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+
+def _get_executor() -> concurrent.futures.Executor:
+    global _executor
+    if _executor is None:
+        if _use_processes:
+            _executor = concurrent.futures.ProcessPoolExecutor(max_workers=_max_workers)
+        else:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=_max_workers,
+                thread_name_prefix="reflex_local_auth_hash",
+            )
+    return _executor
+
+
+async def run_in_hash_pool(fn: Callable[..., T], *args: Any) -> T:
+    """Run fn(*args) in the hash pool and await the result.
+
+    When using a process pool, fn and args must be picklable.
+
+    Args:
+        fn: The blocking function to run.
+        *args: Positional arguments for fn.
+
+    Returns:
+        The return value of fn.
+
+    Raises:
+        HashPoolBusyError: If the pool already has max_pending jobs.
+    """
+    global _pending
+    with _lock:
+        if _pending >= _max_pending:
+            raise HashPoolBusyError(
+                f"Password hashing pool is busy ({_pending} jobs pending)."
+            )
+        _pending += 1
+        executor = _get_executor()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    finally:
+        with _lock:
+            _pending -= 1
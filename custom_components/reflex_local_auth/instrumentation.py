@@ -0,0 +1,266 @@
+"""Optional timing and counting hooks for auth operations.
+
+reflex_local_auth reports spans around password hashing, password verification
+and each of its database queries, and counters for session cache hits and
+misses, for throttled login attempts, and for LoginState.redir and
+LoginState.check_login calls. Nothing is recorded until a hook is added; with no
+hooks, `span()` returns a shared no-op context manager and `count()` returns
+immediately; check `enabled()` before computing attributes that cost more than
+a lookup.
+
+```python
+class PrintHook(reflex_local_auth.instrumentation.InstrumentationHook):
+    def span_ended(self, name, attributes, duration, context, error):
+        print(f"{name} took {duration * 1000:.1f}ms {attributes}")
+
+
+reflex_local_auth.instrumentation.add_hook(PrintHook())
+```
+
+`OpenTelemetryHook` forwards everything to the OpenTelemetry API, which must be
+installed separately.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+SPAN_HASH_PASSWORD = "reflex_local_auth.hash_password"
+SPAN_VERIFY_PASSWORD = "reflex_local_auth.verify_password"
+SPAN_DB_AUTHENTICATED_USER = "reflex_local_auth.db.authenticated_user"
+SPAN_DB_AUTHENTICATED_USER_BATCH = "reflex_local_auth.db.authenticated_user_batch"
+SPAN_DB_LOGIN = "reflex_local_auth.db.login"
+SPAN_DB_LOGOUT = "reflex_local_auth.db.logout"
+SPAN_DB_USER_LOOKUP = "reflex_local_auth.db.user_lookup"
+SPAN_DB_REGISTER = "reflex_local_auth.db.register"
+SPAN_DB_REHASH = "reflex_local_auth.db.rehash"
+SPAN_DB_LIST_SESSIONS = "reflex_local_auth.db.list_sessions"
+SPAN_DB_REVOKE_SESSIONS = "reflex_local_auth.db.revoke_sessions"
+SPAN_DB_RENEW_SESSION = "reflex_local_auth.db.renew_session"
+COUNT_SESSION_CACHE_HIT = "reflex_local_auth.session_cache.hit"
+COUNT_SESSION_CACHE_MISS = "reflex_local_auth.session_cache.miss"
+COUNT_REDIR = "reflex_local_auth.redir"
+COUNT_CHECK_LOGIN = "reflex_local_auth.check_login"
+COUNT_LOGIN_THROTTLED = "reflex_local_auth.login_throttled"
+
+
+class InstrumentationHook:
+    """Base class for instrumentation hooks; override the methods you need."""
+
+    def span_started(self, name: str, attributes: dict[str, Any]) -> Any:
+        """Called when a span starts.
+
+        Args:
+            name: The span name.
+            attributes: Attributes describing the operation.
+
+        Returns:
+            Any context object, passed back to span_ended.
+        """
+        return None
+
+    def span_ended(
+        self,
+        name: str,
+        attributes: dict[str, Any],
+        duration: float,
+        context: Any,
+        error: BaseException | None,
+    ) -> None:
+        """Called when a span ends.
+
+        Args:
+            name: The span name.
+            attributes: Attributes describing the operation.
+            duration: The span duration in seconds.
+            context: The value returned by span_started.
+            error: The exception raised inside the span, if any.
+        """
+
+    def counter(self, name: str, value: int, attributes: dict[str, Any]) -> None:
+        """Called when a counter is incremented.
+
+        Args:
+            name: The counter name.
+            value: The amount to add.
+            attributes: Attributes describing the event.
+        """
+
+
+_hooks: list[InstrumentationHook] = []
+
+
+def add_hook(hook: InstrumentationHook) -> None:
+    """Start sending spans and counters to a hook.
+
+    Args:
+        hook: The hook to add.
+    """
+    _hooks.append(hook)
+
+
+def remove_hook(hook: InstrumentationHook) -> None:
+    """Stop sending spans and counters to a hook.
+
+    Args:
+        hook: The hook to remove.
+    """
+    _hooks.remove(hook)
+
+
+def enabled() -> bool:
+    """Check whether any hooks are added.
+
+    Returns:
+        True if spans and counters are reported anywhere.
+    """
+    return bool(_hooks)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> _NoopSpan:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("attributes", "contexts", "hooks", "name", "start")
+
+    def __init__(self, name: str, attributes: dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        # Snapshot the hooks, so each one sees matching start and end calls.
+        self.hooks = tuple(_hooks)
+        self.contexts: list[Any] = []
+        self.start = 0.0
+
+    def __enter__(self) -> _Span:
+        self.contexts = [
+            hook.span_started(self.name, self.attributes) for hook in self.hooks
+        ]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, error: BaseException | None, tb: Any) -> None:
+        duration = time.perf_counter() - self.start
+        for hook, context in zip(self.hooks, self.contexts, strict=True):
+            hook.span_ended(self.name, self.attributes, duration, context, error)
+
+
+def span(name: str, **attributes: Any) -> _Span | _NoopSpan:
+    """Time the enclosed block and report it to all hooks.
+
+    Args:
+        name: The span name.
+        **attributes: Attributes describing the operation; None values are
+            left out, as OpenTelemetry does not accept them.
+
+    Returns:
+        A context manager.
+    """
+    if not _hooks:
+        return _NOOP_SPAN
+    return _Span(
+        name, {key: value for key, value in attributes.items() if value is not None}
+    )
+
+
+def count(name: str, value: int = 1, **attributes: Any) -> None:
+    """Report a counter increment to all hooks.
+
+    Args:
+        name: The counter name.
+        value: The amount to add.
+        **attributes: Attributes describing the event.
+    """
+    for hook in _hooks:
+        hook.counter(name, value, attributes)
+
+
+class OpenTelemetryHook(InstrumentationHook):
+    """Report spans, span durations and counters through OpenTelemetry.
+
+    Requires the `opentelemetry-api` package; the app configures the SDK and
+    exporters as usual.
+    """
+
+    def __init__(self):
+        """Initialize the tracer and meter.
+
+        Raises:
+            ImportError: If opentelemetry-api is not installed.
+        """
+        try:
+            from opentelemetry import context, metrics, trace  # pyright: ignore[reportMissingImports]
+        except ImportError as err:
+            msg = "OpenTelemetryHook requires `pip install opentelemetry-api`."
+            raise ImportError(msg) from err
+        self._context = context
+        self._trace = trace
+        self._tracer = trace.get_tracer("reflex_local_auth")
+        self._meter = metrics.get_meter("reflex_local_auth")
+        self._histograms: dict[str, Any] = {}
+        self._counters: dict[str, Any] = {}
+
+    def span_started(self, name: str, attributes: dict[str, Any]) -> Any:
+        """Start an OpenTelemetry span and make it current.
+
+        Args:
+            name: The span name.
+            attributes: Attributes describing the operation.
+
+        Returns:
+            The span and the context token to restore.
+        """
+        otel_span = self._tracer.start_span(name, attributes=attributes)
+        token = self._context.attach(self._trace.set_span_in_context(otel_span))
+        return otel_span, token
+
+    def span_ended(
+        self,
+        name: str,
+        attributes: dict[str, Any],
+        duration: float,
+        context: Any,
+        error: BaseException | None,
+    ) -> None:
+        """End the OpenTelemetry span and record its duration.
+
+        Args:
+            name: The span name.
+            attributes: Attributes describing the operation.
+            duration: The span duration in seconds.
+            context: The span and context token from span_started.
+            error: The exception raised inside the span, if any.
+        """
+        otel_span, token = context
+        self._context.detach(token)
+        if error is not None:
+            otel_span.record_exception(error)
+            otel_span.set_status(self._trace.StatusCode.ERROR)
+        otel_span.end()
+        if name not in self._histograms:
+            self._histograms[name] = self._meter.create_histogram(
+                f"{name}.duration", unit="s"
+            )
+        self._histograms[name].record(duration, attributes)
+
+    def counter(self, name: str, value: int, attributes: dict[str, Any]) -> None:
+        """Add to an OpenTelemetry counter.
+
+        Args:
+            name: The counter name.
+            value: The amount to add.
+            attributes: Attributes describing the event.
+        """
+        if name not in self._counters:
+            self._counters[name] = self._meter.create_counter(name)
+        self._counters[name].add(value, attributes)
@@ -7,76 +7,390 @@ Your app may inherit from LocalAuthState, or it may access it via the `get_state
 
 from __future__ import annotations
 
+import dataclasses
 import datetime
+import time
+import zlib
+from collections.abc import Callable
+from typing import Any, TypeVar
 
 import reflex as rx
-from sqlmodel import select
+from reflex.vars.base import ComputedVar
+from sqlalchemy import bindparam
+from sqlmodel import col, delete, insert, select
 
+from . import db, push, sessions
 from .auth_session import LocalAuthSession
-from .user import LocalUser
+from .batch import get_session_batcher
+from .cache import get_session_cache
+from .instrumentation import (
+    SPAN_DB_AUTHENTICATED_USER,
+    SPAN_DB_LOGIN,
+    SPAN_DB_LOGOUT,
+    SPAN_DB_USER_LOOKUP,
+    span,
+)
+from .renewal import get_session_renewer
+from .tokens import (
+    decode_token,
+    is_signed_token,
+    issue_token,
+    revoke_token,
+    signed_tokens_enabled,
+)
+from .user import AuthenticatedUser, LocalUser
 
 AUTH_TOKEN_LOCAL_STORAGE_KEY = "_auth_token"
 DEFAULT_AUTH_SESSION_EXPIRATION_DELTA = datetime.timedelta(days=7)
 DEFAULT_AUTH_REFRESH_DELTA = datetime.timedelta(minutes=10)
+# Each client refreshes within +/- 10% of DEFAULT_AUTH_REFRESH_DELTA.
+DEFAULT_AUTH_REFRESH_JITTER = 0.2
+
+T = TypeVar("T")
+
+# The statements below are built once, with bound parameters: each call only
+# binds its values, and the engine's compiled cache skips recompiling them.
+
+# Select only the columns of AuthenticatedUser, never the password_hash.
+_AUTHENTICATED_USER_QUERY = select(
+    LocalUser.id, LocalUser.username, LocalUser.enabled, LocalAuthSession.expiration
+).where(
+    LocalAuthSession.session_id == bindparam("auth_token"),
+    LocalAuthSession.expiration >= bindparam("now"),
+    LocalUser.id == LocalAuthSession.user_id,
+)
+
+# A fresh session holds no objects to synchronize with the deleted rows.
+_LOGOUT_STATEMENT = (
+    delete(LocalAuthSession)
+    .where(col(LocalAuthSession.session_id) == bindparam("auth_token"))
+    .execution_options(synchronize_session=False)
+)
+
+_LOGIN_STATEMENT = insert(LocalAuthSession).values(
+    user_id=bindparam("user_id"),
+    session_id=bindparam("session_id"),
+    expiration=bindparam("expiration"),
+)
+
+_USERNAME_QUERY = select(LocalUser.username).where(LocalUser.id == bindparam("user_id"))
+
+
+def _authenticated_user_params(auth_token: str) -> dict[str, Any]:
+    return {
+        "auth_token": auth_token,
+        "now": datetime.datetime.now(datetime.timezone.utc),
+    }
+
+
+def _refresh_interval(client_token: str) -> datetime.timedelta:
+    """The refresh interval of the auth vars, adjusted for one client.
+
+    Args:
+        client_token: The client's token.
+
+    Returns:
+        DEFAULT_AUTH_REFRESH_DELTA, jittered by a factor stable per client.
+    """
+    # A fraction in [0, 1) derived from the client token.
+    fraction = zlib.crc32(client_token.encode()) / 2**32
+    return DEFAULT_AUTH_REFRESH_DELTA * (
+        1 + DEFAULT_AUTH_REFRESH_JITTER * (fraction - 0.5)
+    )
+
+
+@dataclasses.dataclass(eq=False, frozen=True, init=False, slots=True)
+class _JitteredComputedVar(ComputedVar[T]):
+    """A ComputedVar whose refresh interval is spread across clients.
+
+    Clients that connected together, like after a deploy, would otherwise all
+    refresh at the same time, every interval. The jitter is stable per client
+    token, so each client keeps a steady refresh period, and all the vars
+    using it expire together.
+    """
+
+    def needs_update(self, instance: Any) -> bool:
+        """Check if the interval, adjusted for this client, has passed.
+
+        Args:
+            instance: The state instance that the computed var is attached to.
+
+        Returns:
+            True if the computed var needs to be updated, False otherwise.
+        """
+        if self._update_interval is None:
+            return False
+        last_updated = getattr(instance, self._last_updated_attr, None)
+        if last_updated is None:
+            return True
+        interval = _refresh_interval(instance.router.session.client_token)
+        return datetime.datetime.now() - last_updated > interval
+
+
+def _jittered_var(
+    **kwargs: Any,
+) -> Callable[[Callable[[Any], T]], _JitteredComputedVar[T]]:
+    def wrapper(fget: Callable[[Any], T]) -> _JitteredComputedVar[T]:
+        return _JitteredComputedVar(fget, interval=DEFAULT_AUTH_REFRESH_DELTA, **kwargs)
+
+    return wrapper
+
+
+def _schedule_refresh(state: LocalAuthState) -> None:
+    """Ask the session batcher to prefetch the client's next refresh, if any.
+
+    Called from authenticated_user. A function rather than a method, so that
+    the router fields it reads are not dependencies of the computed var, which
+    would then be recomputed on every page change.
+
+    Args:
+        state: The LocalAuthState of the client.
+    """
+    batcher = get_session_batcher()
+    if batcher is None or is_signed_token(state.auth_token):
+        return
+    interval = _refresh_interval(state.router.session.client_token)
+    batcher.schedule_refresh(state.auth_token, time.time() + interval.total_seconds())
 
 
 class LocalAuthState(rx.State):
     # The auth_token is stored in local storage to persist across tab and browser sessions.
     auth_token: str = rx.LocalStorage(name=AUTH_TOKEN_LOCAL_STORAGE_KEY)
+    # Until this time (seconds since the epoch), this client reads from the
+    # primary, so the replica's lag can't hide its own writes.
+    _primary_reads_until: float = 0.0
 
-    @rx.var(
-        cache=True,
-        interval=DEFAULT_AUTH_REFRESH_DELTA,
-        initial_value=LocalUser(id=-1),  # pyright: ignore[reportCallIssue]
-    )
-    def authenticated_user(self) -> LocalUser:
+    @_jittered_var(cache=True, initial_value=AuthenticatedUser())
+    def authenticated_user(self) -> AuthenticatedUser:
         """The currently authenticated user, or a dummy user if not authenticated.
 
         Returns:
-            A LocalUser instance with id=-1 if not authenticated, or the LocalUser instance
-            corresponding to the currently authenticated user.
+            An AuthenticatedUser with id=-1 if not authenticated, or the id, username
+            and enabled flag of the currently authenticated user.
         """
-        with rx.session() as session:
-            result = session.exec(
-                select(LocalUser, LocalAuthSession).where(
-                    LocalAuthSession.session_id == self.auth_token,
-                    LocalAuthSession.expiration
-                    >= datetime.datetime.now(datetime.timezone.utc),
-                    LocalUser.id == LocalAuthSession.user_id,
-                ),
-            ).first()
-            if result:
-                user, session = result
-                return user
-        return LocalUser(id=-1)  # type: ignore
-
-    @rx.var(
-        cache=True,
-        interval=DEFAULT_AUTH_REFRESH_DELTA,
-        initial_value=False,
-    )
+        user = self._get_authenticated_user()
+        if user.id >= 0:
+            push.register_state(self, user.id)
+            _schedule_refresh(self)
+        return user
+
+    # With the same interval as authenticated_user, so that it is recomputed even
+    # when authenticated_user was refreshed by reading it in an event handler.
+    @_jittered_var(cache=True, initial_value=False)
     def is_authenticated(self) -> bool:
         """Whether the current user is authenticated.
 
         Returns:
             True if the authenticated user has a positive user ID, False otherwise.
         """
-        return (
-            self.authenticated_user.id is not None and self.authenticated_user.id >= 0
-        )
+        return self.authenticated_user.id >= 0
+
+    def _get_authenticated_user_without_db(self) -> AuthenticatedUser | None:
+        if is_signed_token(self.auth_token):
+            claims = decode_token(self.auth_token)
+            if claims is None:
+                return AuthenticatedUser()
+            return AuthenticatedUser(
+                id=claims.user_id,
+                username=claims.username,
+                enabled=True,
+            )
+        if not self.auth_token:
+            # Anonymous clients never have a session; _login assigns a token first.
+            return AuthenticatedUser()
+        cache = get_session_cache()
+        if cache is not None:
+            return cache.get(self.auth_token)
+        return None
+
+    def _get_rejected_user(self) -> AuthenticatedUser:
+        cache = get_session_cache()
+        if cache is not None:
+            # Skip the query for this token until the negative TTL or _login.
+            cache.reject(self.auth_token)
+        return AuthenticatedUser()
+
+    def _get_authenticated_user_from_result(
+        self, result: tuple[int | None, str, bool, datetime.datetime] | None
+    ) -> AuthenticatedUser:
+        if result is None:
+            return self._get_rejected_user()
+        user_id, username, enabled, expiration = result
+        if user_id is None:
+            return self._get_rejected_user()
+        user = AuthenticatedUser(id=user_id, username=username, enabled=enabled)
+        cache = get_session_cache()
+        if cache is not None:
+            cache.set(self.auth_token, user, expiration)
+        return user
+
+    def _read_from_primary(self) -> None:
+        """Send this client's reads to the primary until the replica catches up."""
+        lag = db.replica_lag()
+        if lag is not None:
+            self._primary_reads_until = time.time() + lag.total_seconds()
+
+    def _reads_from_replica(self) -> bool:
+        return time.time() >= self._primary_reads_until
+
+    def _get_authenticated_user(self) -> AuthenticatedUser:
+        user = self._get_authenticated_user_without_db()
+        if user is not None:
+            return user
+        read_session = db.read_session if self._reads_from_replica() else db.session
+        with span(SPAN_DB_AUTHENTICATED_USER), read_session() as session:
+            result = session.exec(
+                _AUTHENTICATED_USER_QUERY,
+                params=_authenticated_user_params(self.auth_token),
+            ).first()
+        renewer = get_session_renewer()
+        if renewer is not None and result is not None:
+            renewer.renew(self.auth_token, result[3])
+        return self._get_authenticated_user_from_result(result)
+
+    async def _aget_authenticated_user(self) -> AuthenticatedUser:
+        """Look up the authenticated user using the async database session.
+
+        Unlike the authenticated_user var, the result is not cached on the state.
+        Falls back to the sync session when the async path is not enabled. With a
+        session batcher configured, concurrent lookups share one query.
+
+        Returns:
+            An AuthenticatedUser with id=-1 if not authenticated, or the id, username
+            and enabled flag of the currently authenticated user.
+        """
+        replica = self._reads_from_replica()
+        # The batcher reads from the replica.
+        batcher = get_session_batcher() if replica else None
+        if batcher is None and not db.async_db_enabled():
+            return self._get_authenticated_user()
+        user = self._get_authenticated_user_without_db()
+        if user is not None:
+            return user
+        if batcher is not None:
+            result = await batcher.get(self.auth_token)
+        else:
+            with span(SPAN_DB_AUTHENTICATED_USER):
+                async with db.aread_session() if replica else db.asession() as session:
+                    result = (
+                        await session.exec(
+                            _AUTHENTICATED_USER_QUERY,
+                            params=_authenticated_user_params(self.auth_token),
+                        )
+                    ).first()
+        renewer = get_session_renewer()
+        if renewer is not None and result is not None:
+            await renewer.arenew(self.auth_token, result[3])
+        return self._get_authenticated_user_from_result(result)
+
+    def _refresh_other_tabs(self, auth_token: str) -> None:
+        if auth_token and push.get_client_registry() is not None:
+            # Other tabs share the auth_token through local storage.
+            push.schedule(
+                push.refresh_clients(
+                    [auth_token], exclude=self.router.session.client_token
+                )
+            )
+
+    def _on_logout(self, refresh_other_tabs: bool = True) -> None:
+        if is_signed_token(self.auth_token):
+            revoke_token(self.auth_token)
+        else:
+            cache = get_session_cache()
+            if cache is not None:
+                cache.invalidate(self.auth_token)
+        if refresh_other_tabs:
+            self._refresh_other_tabs(self.auth_token)
+        self._read_from_primary()
+        self.auth_token = self.auth_token
+
+    def _logout(self, refresh_other_tabs: bool = True) -> None:
+        if not is_signed_token(self.auth_token):
+            with span(SPAN_DB_LOGOUT), db.session() as session:
+                session.exec(_LOGOUT_STATEMENT, params={"auth_token": self.auth_token})
+                session.commit()
+        self._on_logout(refresh_other_tabs)
 
     @rx.event
     def do_logout(self):
         """Destroy LocalAuthSessions associated with the auth_token."""
-        with rx.session() as session:
-            for auth_session in session.exec(
-                select(LocalAuthSession).where(
-                    LocalAuthSession.session_id == self.auth_token
-                )
-            ).all():
-                session.delete(auth_session)
-            session.commit()
-        self.auth_token = self.auth_token
+        self._logout()
+
+    async def _alogout(self, refresh_other_tabs: bool = True) -> None:
+        """Destroy LocalAuthSessions associated with the auth_token.
+
+        Async version of do_logout, for use in async event handlers.
+
+        Args:
+            refresh_other_tabs: Whether to push the logout to the other tabs
+                sharing the auth_token.
+        """
+        if not db.async_db_enabled():
+            self._logout(refresh_other_tabs)
+            return
+        if not is_signed_token(self.auth_token):
+            with span(SPAN_DB_LOGOUT):
+                async with db.asession() as session:
+                    await session.exec(
+                        _LOGOUT_STATEMENT, params={"auth_token": self.auth_token}
+                    )
+                    await session.commit()
+        self._on_logout(refresh_other_tabs)
+
+    async def _alist_sessions(self) -> list[sessions.SessionInfo]:
+        """List the unexpired sessions of the authenticated user.
+
+        Returns:
+            One SessionInfo per session, with the current client's marked current,
+            or an empty list if not authenticated.
+        """
+        user = await self._aget_authenticated_user()
+        if user.id < 0:
+            return []
+        return await sessions.list_sessions(user.id, self.auth_token)
+
+    @rx.event
+    async def revoke_session(self, session_id: int):
+        """Destroy one LocalAuthSession of the authenticated user.
+
+        Args:
+            session_id: The id of the session, as listed by _alist_sessions.
+        """
+        user = await self._aget_authenticated_user()
+        if user.id >= 0 and await sessions.revoke_session(user.id, session_id):
+            # It may have been this client's own session.
+            self._read_from_primary()
+            self.auth_token = self.auth_token
+
+    @rx.event
+    async def revoke_other_sessions(self):
+        """Destroy the authenticated user's LocalAuthSessions on other devices."""
+        user = await self._aget_authenticated_user()
+        if user.id >= 0:
+            await sessions.revoke_other_sessions(user.id, self.auth_token)
+
+    @rx.event
+    async def do_logout_all(self):
+        """Destroy all LocalAuthSessions of the authenticated user, on every device."""
+        user = await self._aget_authenticated_user()
+        if user.id < 0:
+            self._on_logout()
+            return
+        await sessions.revoke_all_sessions(user.id)
+        # revoke_all_sessions already refreshes every tab of the user.
+        self._on_logout(refresh_other_tabs=False)
+
+    def _prepare_session_id(self) -> None:
+        if is_signed_token(self.auth_token):
+            # Signed tokens were disabled, fall back to a session id.
+            self.auth_token = ""
+        self.auth_token = self.auth_token or self.router.session.client_token
+
+    def _on_login(self) -> None:
+        cache = get_session_cache()
+        if cache is not None:
+            cache.invalidate(self.auth_token)
+        self._read_from_primary()
 
     def _login(
         self,
@@ -88,21 +402,93 @@ class LocalAuthState(rx.State):
         If the auth_token is already associated with an LocalAuthSession, it will be
         logged out first.
 
+        In signed token mode, no LocalAuthSession is created; instead the auth_token
+        is replaced with a new signed token.
+
         Args:
             user_id: The user ID to associate with the LocalAuthSession.
             expiration_delta: The amount of time before the LocalAuthSession expires.
         """
-        self.do_logout()
+        previous_auth_token = self.auth_token
+        # Other tabs are refreshed once the new session exists, so that they do
+        # not read and cache the token while it has no session.
+        self._logout(refresh_other_tabs=False)
+        try:
+            self._create_session(user_id, expiration_delta)
+        finally:
+            self._refresh_other_tabs(previous_auth_token)
+
+    def _create_session(
+        self, user_id: int, expiration_delta: datetime.timedelta
+    ) -> None:
         if user_id < 0:
             return
-        self.auth_token = self.auth_token or self.router.session.client_token
-        with rx.session() as session:
-            session.add(
-                LocalAuthSession(  # type: ignore
-                    user_id=user_id,
-                    session_id=self.auth_token,
-                    expiration=datetime.datetime.now(datetime.timezone.utc)
-                    + expiration_delta,
-                )
-            )
+        expiration = datetime.datetime.now(datetime.timezone.utc) + expiration_delta
+        if signed_tokens_enabled():
+            with span(SPAN_DB_USER_LOOKUP), db.session() as session:
+                username = session.exec(
+                    _USERNAME_QUERY, params={"user_id": user_id}
+                ).one_or_none()
+            if username is not None:
+                self.auth_token = issue_token(user_id, username, expiration)
+            return
+        self._prepare_session_id()
+        params = {
+            "user_id": user_id,
+            "session_id": self.auth_token,
+            "expiration": expiration,
+        }
+        with span(SPAN_DB_LOGIN), db.session() as session:
+            session.exec(_LOGIN_STATEMENT, params=params)
             session.commit()
+        self._on_login()
+
+    async def _alogin(
+        self,
+        user_id: int,
+        expiration_delta: datetime.timedelta = DEFAULT_AUTH_SESSION_EXPIRATION_DELTA,
+    ) -> None:
+        """Create an LocalAuthSession for the given user_id.
+
+        Async version of _login, for use in async event handlers.
+
+        Args:
+            user_id: The user ID to associate with the LocalAuthSession.
+            expiration_delta: The amount of time before the LocalAuthSession expires.
+        """
+        if not db.async_db_enabled():
+            self._login(user_id, expiration_delta)
+            return
+        previous_auth_token = self.auth_token
+        await self._alogout(refresh_other_tabs=False)
+        try:
+            await self._acreate_session(user_id, expiration_delta)
+        finally:
+            self._refresh_other_tabs(previous_auth_token)
+
+    async def _acreate_session(
+        self, user_id: int, expiration_delta: datetime.timedelta
+    ) -> None:
+        if user_id < 0:
+            return
+        expiration = datetime.datetime.now(datetime.timezone.utc) + expiration_delta
+        if signed_tokens_enabled():
+            with span(SPAN_DB_USER_LOOKUP):
+                async with db.asession() as session:
+                    username = (
+                        await session.exec(_USERNAME_QUERY, params={"user_id": user_id})
+                    ).one_or_none()
+            if username is not None:
+                self.auth_token = issue_token(user_id, username, expiration)
+            return
+        self._prepare_session_id()
+        params = {
+            "user_id": user_id,
+            "session_id": self.auth_token,
+            "expiration": expiration,
+        }
+        with span(SPAN_DB_LOGIN):
+            async with db.asession() as session:
+                await session.exec(_LOGIN_STATEMENT, params=params)
+                await session.commit()
+        self._on_login()
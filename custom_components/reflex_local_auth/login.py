@@ -2,15 +2,38 @@
 
 from __future__ import annotations
 
-from typing import Any
+import functools
+from typing import Any, Callable, overload
 
 import reflex as rx
-from sqlmodel import select
-
-from . import routes
+from reflex.event import EventSpec
+from reflex.utils import console
+from reflex.utils.exceptions import ReflexRuntimeError
+from reflex_base.registry import RegistrationContext
+from sqlalchemy import bindparam
+from sqlmodel import col, select, update
+
+from . import db, routes, throttle
+from .hashers import needs_rehash
+from .hashing import HashPoolBusyError
+from .instrumentation import (
+    COUNT_CHECK_LOGIN,
+    COUNT_LOGIN_THROTTLED,
+    COUNT_REDIR,
+    SPAN_DB_REHASH,
+    SPAN_DB_USER_LOOKUP,
+    count,
+    span,
+)
 from .local_auth import LocalAuthState
 from .user import LocalUser
 
+# Built once with a bound parameter, selecting only the columns login needs
+# instead of loading a LocalUser.
+_LOGIN_QUERY = select(LocalUser.id, LocalUser.password_hash, LocalUser.enabled).where(
+    LocalUser.username == bindparam("username")
+)
+
 
 class LoginState(LocalAuthState):
     """Handle login form submission and redirect to proper routes after authentication."""
@@ -19,7 +42,7 @@ class LoginState(LocalAuthState):
     redirect_to: str = ""
 
     @rx.event
-    def on_submit(self, form_data: dict[str, Any]):
+    async def on_submit(self, form_data: dict[str, Any]):
         """Handle login form on_submit.
 
         Args:
@@ -28,65 +51,177 @@ class LoginState(LocalAuthState):
         self.error_message = ""
         username = form_data["username"]
         password = form_data["password"]
-        with rx.session() as session:
-            user = session.exec(
-                select(LocalUser).where(LocalUser.username == username)
-            ).one_or_none()
-        if user is not None and not user.enabled:
+        client_ip = throttle.client_ip(self.router)
+        if not throttle.login_allowed(username, client_ip):
+            count(COUNT_LOGIN_THROTTLED)
+            self.error_message = "Too many login attempts, please try again later."
+            return rx.set_value("password", "")
+        with span(SPAN_DB_USER_LOOKUP):
+            row = await db.exec_first(
+                _LOGIN_QUERY,
+                params={"username": username},
+                replica=self._reads_from_replica(),
+            )
+        user_id, password_hash, enabled = row if row is not None else (None, b"", False)
+        try:
+            if user_id is not None and enabled:
+                verified = await LocalUser.averify_hash(password, password_hash)
+            else:
+                # Unknown and disabled users cost the same bcrypt work as real
+                # ones, so the response time doesn't reveal which usernames exist.
+                verified = await LocalUser.averify_dummy(password)
+        except HashPoolBusyError:
+            self.error_message = "The server is busy, please try again."
+            return rx.set_value("password", "")
+        if row is not None and not enabled:
             self.error_message = "This account is disabled."
             return rx.set_value("password", "")
-        if (
-            user is not None
-            and user.id is not None
-            and user.enabled
-            and password
-            and user.verify(password)
-        ):
+        if verified and password and user_id is not None:
+            if needs_rehash(password_hash):
+                await self._aupgrade_password_hash(user_id, password)
             # mark the user as logged in
-            self._login(user.id)
+            await self._alogin(user_id)
+            throttle.login_succeeded(username, client_ip)
         else:
             self.error_message = "There was a problem logging in, please try again."
             return rx.set_value("password", "")
         self.error_message = ""
         return LoginState.redir()  # type: ignore
 
-    @rx.event
-    def redir(self):
-        """Redirect to the redirect_to route if logged in, or to the login page if not."""
-        if not self.is_hydrated:
-            # wait until after hydration to ensure auth_token is known
-            return LoginState.redir()  # type: ignore
+    async def _aupgrade_password_hash(self, user_id: int, password: str) -> None:
+        # The hash was created by another hasher or with outdated parameters;
+        # replace it while the plaintext password is known.
+        try:
+            password_hash = await LocalUser.ahash_password(password)
+        except HashPoolBusyError:
+            # Not needed to log in; try again on the next login.
+            return
+        with span(SPAN_DB_REHASH):
+            await db.exec_commit(
+                update(LocalUser)
+                .where(col(LocalUser.id) == user_id)
+                .values(password_hash=password_hash)
+            )
+
+    def _auth_redirect(self) -> EventSpec | None:
         current_route = self.router.url.path
         if not self.is_authenticated and current_route != routes.LOGIN_ROUTE:
             self.redirect_to = current_route
             return rx.redirect(routes.LOGIN_ROUTE)
         elif self.is_authenticated and current_route == routes.LOGIN_ROUTE:
             return rx.redirect(self.redirect_to or "/")
+        return None
 
+    @rx.event
+    def redir(self):
+        """Redirect to the redirect_to route if logged in, or to the login page if not."""
+        count(COUNT_REDIR, hydrated=self.is_hydrated)
+        if not self.is_hydrated:
+            # wait until after hydration to ensure auth_token is known
+            return LoginState.redir()  # type: ignore
+        return self._auth_redirect()
 
-def require_login(page: rx.app.ComponentCallable) -> rx.app.ComponentCallable:
-    """Decorator to require authentication before rendering a page.
-
-    If the user is not authenticated, then redirect to the login page.
+    @rx.event
+    def check_login(self):
+        """Redirect to the redirect_to route if logged in, or to the login page if not.
 
-    Args:
-        page: The page to wrap.
+        Unlike redir, this never reschedules itself: it is meant to run as a page
+        on_load handler, where the auth_token from local storage is already known.
+        """
+        count(COUNT_CHECK_LOGIN)
+        return self._auth_redirect()
+
+
+def _is_check_login(event: Any) -> bool:
+    handler = getattr(event, "handler", event)
+    return getattr(handler, "fn", None) is LoginState.check_login.fn
+
+
+def _warn_missing_check_login(protected_page: rx.app.ComponentCallable) -> None:
+    # Without check_login in its on_load, nothing redirects from a
+    # redirect_on_load page and it renders "Loading..." forever.
+    try:
+        app = RegistrationContext.get().app
+    except (LookupError, ReflexRuntimeError):
+        return
+    for route, unevaluated in app._unevaluated_pages.items():
+        if unevaluated.component is not protected_page:
+            continue
+        on_load = unevaluated.on_load
+        events = on_load if isinstance(on_load, list) else [on_load]
+        if not any(_is_check_login(event) for event in events):
+            console.warn(
+                f"Page {route!r} uses require_login(redirect_on_load=True) but "
+                "does not register LoginState.check_login as an on_load handler, "
+                "so unauthenticated clients are never redirected.",
+                dedupe=True,
+            )
 
-    Returns:
-        The wrapped page component.
-    """
 
+def _protected_page(
+    page: rx.app.ComponentCallable, redirect_on_load: bool
+) -> rx.app.ComponentCallable:
     def protected_page():
+        if redirect_on_load:
+            _warn_missing_check_login(protected_page)
+            # The page's on_load handler (LoginState.check_login) redirects.
+            placeholder = rx.text("Loading...")
+        else:
+            # When this text mounts, it will redirect to the login page
+            placeholder = rx.text("Loading...", on_mount=LoginState.redir)
         return rx.fragment(
             rx.cond(
                 LoginState.is_hydrated & LoginState.is_authenticated,  # type: ignore
                 page(),
-                rx.center(
-                    # When this text mounts, it will redirect to the login page
-                    rx.text("Loading...", on_mount=LoginState.redir),
-                ),
+                rx.center(placeholder),
             )
         )
 
     protected_page.__name__ = page.__name__
     return protected_page
+
+
+@overload
+def require_login(page: rx.app.ComponentCallable) -> rx.app.ComponentCallable: ...
+
+
+@overload
+def require_login(
+    *, redirect_on_load: bool = False
+) -> Callable[[rx.app.ComponentCallable], rx.app.ComponentCallable]: ...
+
+
+def require_login(
+    page: rx.app.ComponentCallable | None = None,
+    *,
+    redirect_on_load: bool = False,
+) -> (
+    rx.app.ComponentCallable
+    | Callable[[rx.app.ComponentCallable], rx.app.ComponentCallable]
+):
+    """Decorator to require authentication before rendering a page.
+
+    If the user is not authenticated, then redirect to the login page.
+
+    By default, the page renders a placeholder whose on_mount event polls
+    LoginState.redir until the state is hydrated. With redirect_on_load=True,
+    the page must instead register LoginState.check_login as its on_load
+    handler, which checks authentication once as part of the hydrate chain.
+    Nothing else redirects such a page: without check_login it shows the
+    placeholder forever, so compiling it logs a warning.
+
+        @rx.page(on_load=reflex_local_auth.LoginState.check_login)
+        @reflex_local_auth.require_login(redirect_on_load=True)
+        def protected(): ...
+
+    Args:
+        page: The page to wrap.
+        redirect_on_load: Rely on LoginState.check_login in the page's on_load
+            instead of redirecting from the placeholder's on_mount.
+
+    Returns:
+        The wrapped page component, or a decorator if page is not given.
+    """
+    if page is None:
+        return functools.partial(_protected_page, redirect_on_load=redirect_on_load)
+    return _protected_page(page, redirect_on_load=redirect_on_load)
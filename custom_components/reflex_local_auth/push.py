@@ -0,0 +1,492 @@
+"""Push authenticated_user recomputes to the clients of revoked sessions.
+
+`LocalAuthState.authenticated_user` is only recomputed every
+`DEFAULT_AUTH_REFRESH_DELTA`, so without push invalidation a revoked session or
+a disabled account stays logged in on open tabs until the next refresh. With a
+client registry configured, every recompute records which client tokens (one
+per browser tab) resolved which auth_token, and for which user. Revocations
+then recompute `authenticated_user` for exactly those clients, and push the
+result to their browsers:
+
+* `do_logout` refreshes the other tabs sharing the logged out auth_token.
+* `reflex_local_auth.sessions` refreshes the clients of every revoked session.
+* Committing a change to `LocalUser.enabled` through the ORM refreshes every
+  client of that user. When the user is disabled, its signed tokens are
+  revoked first.
+
+```python
+reflex_local_auth.push.set_client_registry(
+    reflex_local_auth.push.MemoryClientRegistry(),
+)
+```
+
+Pushes run as background tasks on the event loop. Only clients with a connected
+socket are refreshed; the others recompute when they reconnect. With several
+backend workers, use `RedisClientRegistry`, so a revocation handled by one
+worker reaches clients registered by another.
+
+Changes made outside the ORM, like an UPDATE statement or another process
+editing the database, are not detected; call `refresh_user` afterwards.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Coroutine, Iterable
+from typing import TYPE_CHECKING, Any
+
+import reflex as rx
+import sqlalchemy.orm
+from sqlalchemy import event
+from sqlmodel import select
+
+from . import db
+from .auth_session import LocalAuthSession
+from .batch import get_session_batcher
+from .cache import get_session_cache
+from .redis_client import resolve_redis
+from .tokens import revoke_user_tokens, signed_tokens_enabled
+from .user import LocalUser
+
+if TYPE_CHECKING:
+    from .local_auth import LocalAuthState
+
+DEFAULT_CLIENT_REGISTRY_MAX_SIZE = 100_000
+DEFAULT_CLIENT_REGISTRY_TTL = datetime.timedelta(days=7)
+DEFAULT_REDIS_KEY_PREFIX = "reflex_local_auth:clients:"
+# session.info key collecting the users whose enabled flag changed in a
+# transaction, with their new flag.
+_CHANGED_USERS_KEY = "reflex_local_auth.changed_users"
+
+logger = logging.getLogger(__name__)
+
+
+class ClientRegistry:
+    """Base class for registries mapping auth_tokens and users to client tokens."""
+
+    def __init__(self, ttl: datetime.timedelta = DEFAULT_CLIENT_REGISTRY_TTL):
+        """Initialize the registry.
+
+        Args:
+            ttl: How long a client is remembered after it last resolved its
+                auth_token.
+        """
+        self.ttl = ttl
+
+    def register(self, auth_token: str, user_id: int, client_token: str) -> None:
+        """Record that a client resolved an auth_token to a user.
+
+        Args:
+            auth_token: The auth_token of the client.
+            user_id: The user the auth_token belongs to.
+            client_token: The client token of the browser tab.
+        """
+        raise NotImplementedError
+
+    def clients_for_tokens(self, auth_tokens: Iterable[str]) -> set[str]:
+        """Get the clients that resolved any of the auth_tokens.
+
+        Args:
+            auth_tokens: The auth_tokens to look up.
+
+        Returns:
+            The client tokens.
+        """
+        raise NotImplementedError
+
+    def tokens_for_user(self, user_id: int) -> set[str]:
+        """Get the auth_tokens resolved to a user.
+
+        Args:
+            user_id: The user to look up.
+
+        Returns:
+            The auth_tokens, including signed tokens.
+        """
+        raise NotImplementedError
+
+
+class MemoryClientRegistry(ClientRegistry):
+    """An in-process registry of the clients handled by this worker."""
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_CLIENT_REGISTRY_MAX_SIZE,
+        ttl: datetime.timedelta = DEFAULT_CLIENT_REGISTRY_TTL,
+    ):
+        """Initialize the registry.
+
+        Args:
+            max_size: The maximum number of clients before the least recently
+                registered client is forgotten.
+            ttl: How long a client is remembered after it last resolved its
+                auth_token.
+        """
+        super().__init__(ttl=ttl)
+        self.max_size = max_size
+        # client_token -> (expires at, auth_token, user_id)
+        self._clients: OrderedDict[str, tuple[float, str, int]] = OrderedDict()
+        self._by_token: dict[str, set[str]] = {}
+        self._by_user: dict[int, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def _forget(self, client_token: str) -> None:
+        _, auth_token, user_id = self._clients.pop(client_token)
+        self._by_token[auth_token].discard(client_token)
+        if not self._by_token[auth_token]:
+            del self._by_token[auth_token]
+        self._by_user[user_id].discard(client_token)
+        if not self._by_user[user_id]:
+            del self._by_user[user_id]
+
+    def register(self, auth_token: str, user_id: int, client_token: str) -> None:
+        """Record that a client resolved an auth_token to a user.
+
+        Args:
+            auth_token: The auth_token of the client.
+            user_id: The user the auth_token belongs to.
+            client_token: The client token of the browser tab.
+        """
+        expires_at = time.monotonic() + self.ttl.total_seconds()
+        with self._lock:
+            if client_token in self._clients:
+                self._forget(client_token)
+            self._clients[client_token] = (expires_at, auth_token, user_id)
+            self._by_token.setdefault(auth_token, set()).add(client_token)
+            self._by_user.setdefault(user_id, set()).add(client_token)
+            while len(self._clients) > self.max_size:
+                self._forget(next(iter(self._clients)))
+
+    def _live(self, client_tokens: Iterable[str]) -> list[tuple[str, str]]:
+        # (client_token, auth_token) pairs of unexpired clients.
+        now = time.monotonic()
+        live = []
+        for client_token in list(client_tokens):
+            expires_at, auth_token, _ = self._clients[client_token]
+            if expires_at <= now:
+                self._forget(client_token)
+            else:
+                live.append((client_token, auth_token))
+        return live
+
+    def clients_for_tokens(self, auth_tokens: Iterable[str]) -> set[str]:
+        """Get the clients that resolved any of the auth_tokens.
+
+        Args:
+            auth_tokens: The auth_tokens to look up.
+
+        Returns:
+            The client tokens.
+        """
+        with self._lock:
+            return {
+                client_token
+                for auth_token in auth_tokens
+                for client_token, _ in self._live(self._by_token.get(auth_token, ()))
+            }
+
+    def tokens_for_user(self, user_id: int) -> set[str]:
+        """Get the auth_tokens resolved to a user.
+
+        Args:
+            user_id: The user to look up.
+
+        Returns:
+            The auth_tokens, including signed tokens.
+        """
+        with self._lock:
+            return {
+                auth_token
+                for _, auth_token in self._live(self._by_user.get(user_id, ()))
+            }
+
+
+class RedisClientRegistry(ClientRegistry):
+    """A registry shared by all backend workers through Redis.
+
+    Each auth_token and each user keeps a Redis set, expiring `ttl` after its
+    last registration. A worker only writes a registration to Redis once per
+    half `ttl`.
+    """
+
+    def __init__(
+        self,
+        redis: Any = None,
+        ttl: datetime.timedelta = DEFAULT_CLIENT_REGISTRY_TTL,
+        key_prefix: str = DEFAULT_REDIS_KEY_PREFIX,
+        local_max_size: int = DEFAULT_CLIENT_REGISTRY_MAX_SIZE,
+    ):
+        """Initialize the registry.
+
+        Args:
+            redis: A synchronous redis client, see `redis_client.resolve_redis`.
+            ttl: How long a client is remembered after it last resolved its
+                auth_token.
+            key_prefix: Prefix for the registry keys.
+            local_max_size: The maximum number of registrations remembered
+                locally to skip redundant writes.
+
+        Raises:
+            ValueError: If no redis client is passed and redis_url is not configured.
+        """
+        super().__init__(ttl=ttl)
+        self.redis = resolve_redis(redis, "RedisClientRegistry")
+        self.key_prefix = key_prefix
+        self.local_max_size = local_max_size
+        self._written: OrderedDict[tuple[str, str], float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _token_key(self, auth_token: str) -> str:
+        return f"{self.key_prefix}token:{auth_token}"
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self.key_prefix}user:{user_id}"
+
+    def register(self, auth_token: str, user_id: int, client_token: str) -> None:
+        """Record that a client resolved an auth_token to a user.
+
+        Args:
+            auth_token: The auth_token of the client.
+            user_id: The user the auth_token belongs to.
+            client_token: The client token of the browser tab.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._written.get((client_token, auth_token), 0) > now:
+                return
+            self._written[client_token, auth_token] = now + self.ttl.total_seconds() / 2
+            self._written.move_to_end((client_token, auth_token))
+            while len(self._written) > self.local_max_size:
+                self._written.popitem(last=False)
+        ttl_ms = int(self.ttl.total_seconds() * 1000)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.sadd(self._token_key(auth_token), client_token)
+        pipe.pexpire(self._token_key(auth_token), ttl_ms)
+        pipe.sadd(self._user_key(user_id), auth_token)
+        pipe.pexpire(self._user_key(user_id), ttl_ms)
+        pipe.execute()
+
+    def clients_for_tokens(self, auth_tokens: Iterable[str]) -> set[str]:
+        """Get the clients that resolved any of the auth_tokens.
+
+        Args:
+            auth_tokens: The auth_tokens to look up.
+
+        Returns:
+            The client tokens.
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        for auth_token in auth_tokens:
+            pipe.smembers(self._token_key(auth_token))
+        return {
+            client_token.decode() if isinstance(client_token, bytes) else client_token
+            for members in pipe.execute()
+            for client_token in members
+        }
+
+    def tokens_for_user(self, user_id: int) -> set[str]:
+        """Get the auth_tokens resolved to a user.
+
+        Args:
+            user_id: The user to look up.
+
+        Returns:
+            The auth_tokens, including signed tokens.
+        """
+        return {
+            auth_token.decode() if isinstance(auth_token, bytes) else auth_token
+            for auth_token in self.redis.smembers(self._user_key(user_id))
+        }
+
+
+_client_registry: ClientRegistry | None = None
+_tasks: set[asyncio.Task] = set()
+
+
+def set_client_registry(registry: ClientRegistry | None) -> None:
+    """Set the registry used to push authenticated_user recomputes.
+
+    Args:
+        registry: The registry to use, or None to disable push invalidation.
+    """
+    global _client_registry
+    _client_registry = registry
+    if registry is not None:
+        listen_for_user_changes()
+
+
+def listen_for_user_changes() -> None:
+    """Act on commits that change `LocalUser.enabled` through the ORM.
+
+    Disabling a user revokes its signed tokens, and the clients of a changed
+    user are refreshed when a client registry is configured.
+    """
+    if not event.contains(LocalUser, "after_update", _record_enabled_change):
+        event.listen(LocalUser, "after_update", _record_enabled_change)
+        event.listen(sqlalchemy.orm.Session, "after_commit", _after_commit)
+        event.listen(sqlalchemy.orm.Session, "after_rollback", _after_rollback)
+
+
+def get_client_registry() -> ClientRegistry | None:
+    """Get the configured client registry.
+
+    Returns:
+        The configured ClientRegistry, or None if push invalidation is disabled.
+    """
+    return _client_registry
+
+
+def register_client(auth_token: str, user_id: int, client_token: str) -> None:
+    """Record a client in the configured registry, if any.
+
+    Args:
+        auth_token: The auth_token of the client.
+        user_id: The user the auth_token belongs to.
+        client_token: The client token of the browser tab.
+    """
+    if _client_registry is not None and client_token:
+        _client_registry.register(auth_token, user_id, client_token)
+
+
+def register_state(state: LocalAuthState, user_id: int) -> None:
+    """Record the client of a state in the configured registry, if any.
+
+    Called from authenticated_user. Reading the router here instead of in the
+    computed var keeps router fields out of the var's dependencies, so it is
+    not recomputed on every page change.
+
+    Args:
+        state: The LocalAuthState of the client.
+        user_id: The user its auth_token belongs to.
+    """
+    if _client_registry is not None:
+        register_client(state.auth_token, user_id, state.router.session.client_token)
+
+
+async def _refresh_client(app: rx.App, client_token: str) -> bool:
+    from .local_auth import LocalAuthState
+
+    # Disconnected clients recompute when they hydrate after reconnecting.
+    if not await app.event_namespace._token_manager.is_token_connected(  # pyright: ignore[reportOptionalMemberAccess]
+        client_token
+    ):
+        return False
+    async with app.modify_state(
+        rx.BaseStateToken(ident=client_token, cls=LocalAuthState)
+    ) as state:
+        auth_state = await state.get_state(LocalAuthState)
+        # The recompute must see the revocation, not a lagging replica.
+        auth_state._read_from_primary()
+        # Reassigning the token marks authenticated_user dirty.
+        auth_state.auth_token = auth_state.auth_token
+    return True
+
+
+async def refresh_clients(auth_tokens: Iterable[str], exclude: str = "") -> int:
+    """Recompute authenticated_user for every client of the auth_tokens.
+
+    Invalidate the auth_tokens in the session cache first, or the clients
+    recompute the cached user.
+
+    Args:
+        auth_tokens: The auth_tokens whose clients are refreshed.
+        exclude: A client token to skip, like the one handling the current event.
+
+    Returns:
+        The number of connected clients refreshed.
+    """
+    if _client_registry is None:
+        return 0
+    auth_tokens = list(auth_tokens)
+    client_tokens = _client_registry.clients_for_tokens(auth_tokens)
+    client_tokens.discard(exclude)
+    if not client_tokens:
+        return 0
+    batcher = get_session_batcher()
+    if batcher is not None:
+        # Resolve every token in one query, so the recomputes hit the cache.
+        await batcher.prefetch(auth_tokens)
+    from reflex.utils import prerequisites
+
+    app = prerequisites.get_and_validate_app().app
+    results = await asyncio.gather(
+        *(_refresh_client(app, client_token) for client_token in client_tokens),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.warning("Failed to refresh a client: %r", result)
+    return sum(result is True for result in results)
+
+
+async def refresh_user(user_id: int) -> int:
+    """Recompute authenticated_user for every client of a user.
+
+    Call after changing a user outside the ORM, for example with an UPDATE
+    statement.
+
+    Args:
+        user_id: The user whose clients are refreshed.
+
+    Returns:
+        The number of connected clients refreshed.
+    """
+    if _client_registry is None:
+        return 0
+    auth_tokens = _client_registry.tokens_for_user(user_id)
+    cache = get_session_cache()
+    if cache is not None:
+        auth_tokens.update(
+            await db.exec_all(
+                select(LocalAuthSession.session_id).where(
+                    LocalAuthSession.user_id == user_id
+                )
+            )
+        )
+        cache.invalidate_many(auth_tokens)
+    return await refresh_clients(auth_tokens)
+
+
+def schedule(coro: Coroutine[Any, Any, Any]) -> None:
+    """Run a refresh in the background, if called from the event loop.
+
+    Args:
+        coro: The refresh_clients or refresh_user coroutine.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Not running in the app, like a CLI script: there are no clients to refresh.
+        coro.close()
+        return
+    task = loop.create_task(coro)
+    # Keep a reference until the task is done, so it is not garbage collected.
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def _record_enabled_change(mapper: Any, connection: Any, target: LocalUser) -> None:
+    if sqlalchemy.orm.attributes.get_history(target, "enabled").has_changes():
+        session = sqlalchemy.orm.object_session(target)
+        if session is not None and target.id is not None:
+            session.info.setdefault(_CHANGED_USERS_KEY, {})[target.id] = target.enabled
+
+
+def _after_commit(session: sqlalchemy.orm.Session) -> None:
+    for user_id, enabled in session.info.pop(_CHANGED_USERS_KEY, {}).items():
+        if not enabled and signed_tokens_enabled():
+            revoke_user_tokens(user_id)
+        if _client_registry is not None:
+            schedule(refresh_user(user_id))
+
+
+def _after_rollback(session: sqlalchemy.orm.Session) -> None:
+    session.info.pop(_CHANGED_USERS_KEY, None)
@@ -0,0 +1,141 @@
+"""Periodically delete expired LocalAuthSession rows.
+
+Only `do_logout` deletes sessions, so without a reaper the localauthsession
+table grows forever. Register the reaper as an app lifespan task:
+
+```python
+app = rx.App()
+app.register_lifespan_task(
+    reflex_local_auth.reaper.reap_expired_sessions_task,
+    interval=datetime.timedelta(hours=1),
+)
+```
+
+Expired rows are deleted in batches of `batch_size`, each in its own short
+transaction followed by a pause, so the reaper never holds the SQLite write lock
+for long. Database work runs in a thread to keep the event loop responsive.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import datetime
+import logging
+import time
+
+from sqlmodel import col, delete, select
+
+from . import db
+from .auth_session import LocalAuthSession
+
+DEFAULT_REAP_INTERVAL = datetime.timedelta(hours=1)
+DEFAULT_REAP_BATCH_SIZE = 500
+DEFAULT_REAP_BATCH_PAUSE = datetime.timedelta(milliseconds=50)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class ReaperMetrics:
+    """Counters describing the work done by the session reaper."""
+
+    runs: int = 0
+    batches: int = 0
+    rows_reaped: int = 0
+    seconds_spent: float = 0.0
+    last_run_rows_reaped: int = 0
+    last_run_seconds: float = 0.0
+    last_run_at: datetime.datetime | None = None
+
+
+metrics = ReaperMetrics()
+
+
+def reap_expired_sessions_batch(
+    batch_size: int = DEFAULT_REAP_BATCH_SIZE,
+    now: datetime.datetime | None = None,
+) -> int:
+    """Delete up to batch_size expired LocalAuthSession rows in one transaction.
+
+    Args:
+        batch_size: The maximum number of rows to delete.
+        now: Rows expiring before this time are deleted. Defaults to the current time.
+
+    Returns:
+        The number of rows deleted.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    with db.session() as session:
+        expired_ids = session.exec(
+            select(LocalAuthSession.id)
+            .where(LocalAuthSession.expiration < now)
+            .limit(batch_size)
+        ).all()
+        if not expired_ids:
+            return 0
+        session.exec(
+            delete(LocalAuthSession).where(col(LocalAuthSession.id).in_(expired_ids))
+        )
+        session.commit()
+    return len(expired_ids)
+
+
+async def reap_expired_sessions(
+    batch_size: int = DEFAULT_REAP_BATCH_SIZE,
+    batch_pause: datetime.timedelta = DEFAULT_REAP_BATCH_PAUSE,
+) -> int:
+    """Delete all expired LocalAuthSession rows, one batch at a time.
+
+    Args:
+        batch_size: The maximum number of rows deleted per transaction.
+        batch_pause: How long to wait between batches, letting other writers
+            acquire the database lock.
+
+    Returns:
+        The number of rows deleted.
+    """
+    start = time.perf_counter()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    reaped = 0
+    while True:
+        deleted = await asyncio.to_thread(reap_expired_sessions_batch, batch_size, now)
+        metrics.batches += 1
+        reaped += deleted
+        if deleted < batch_size:
+            break
+        await asyncio.sleep(batch_pause.total_seconds())
+    elapsed = time.perf_counter() - start
+    metrics.runs += 1
+    metrics.rows_reaped += reaped
+    metrics.seconds_spent += elapsed
+    metrics.last_run_rows_reaped = reaped
+    metrics.last_run_seconds = elapsed
+    metrics.last_run_at = now
+    return reaped
+
+
+async def reap_expired_sessions_task(
+    interval: datetime.timedelta = DEFAULT_REAP_INTERVAL,
+    batch_size: int = DEFAULT_REAP_BATCH_SIZE,
+    batch_pause: datetime.timedelta = DEFAULT_REAP_BATCH_PAUSE,
+) -> None:
+    """Reap expired sessions every interval, for the lifetime of the app.
+
+    Args:
+        interval: How long to wait between reaper runs.
+        batch_size: The maximum number of rows deleted per transaction.
+        batch_pause: How long to wait between batches.
+    """
+    while True:
+        try:
+            reaped = await reap_expired_sessions(batch_size, batch_pause)
+        except Exception:
+            logger.exception("Failed to reap expired LocalAuthSession rows.")
+        else:
+            logger.debug(
+                "Reaped %d expired LocalAuthSession rows in %.3fs.",
+                reaped,
+                metrics.last_run_seconds,
+            )
+        await asyncio.sleep(interval.total_seconds())
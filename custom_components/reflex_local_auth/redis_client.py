@@ -0,0 +1,34 @@
+"""The Redis client shared by the Redis-backed auth stores.
+
+`RedisSessionCache`, `RedisClientRegistry`, `RedisRateLimiter` and
+`RedisRevocationList` accept a synchronous redis client, or anything compatible
+like fakeredis. Without one, they connect to the app's configured `redis_url`.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+
+def resolve_redis(redis: Any, owner: str) -> Any:
+    """Get the redis client a Redis-backed store should use.
+
+    Args:
+        redis: The client passed to the store, or None for the app's client.
+        owner: The name of the store, for the error message.
+
+    Returns:
+        The given client, or a client for the app's configured redis_url.
+
+    Raises:
+        ValueError: If no client was given and redis_url is not configured.
+    """
+    if redis is not None:
+        return redis
+    from reflex.utils import prerequisites
+
+    redis = prerequisites.get_redis_sync()
+    if redis is None:
+        msg = f"{owner} requires redis_url to be configured."
+        raise ValueError(msg)
+    return redis
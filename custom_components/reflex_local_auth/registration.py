@@ -7,9 +7,12 @@ from typing import Any
 
 import reflex as rx
 from reflex.event import EventSpec
-from sqlmodel import select
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import insert
 
-from . import routes
+from . import db, routes
+from .hashing import HashPoolBusyError
+from .instrumentation import SPAN_DB_REGISTER, span
 from .local_auth import LocalAuthState
 from .user import LocalUser
 
@@ -29,15 +32,6 @@ class RegistrationState(LocalAuthState):
         if not username:
             self.error_message = "Username cannot be empty"
             return rx.set_focus("username")
-        with rx.session() as session:
-            existing_user = session.exec(
-                select(LocalUser).where(LocalUser.username == username)
-            ).one_or_none()
-        if existing_user is not None:
-            self.error_message = (
-                f"Username {username} is already registered. Try a different name"
-            )
-            return [rx.set_value("username", ""), rx.set_focus("username")]
         if not password:
             self.error_message = "Password cannot be empty"
             return rx.set_focus("password")
@@ -48,21 +42,43 @@ class RegistrationState(LocalAuthState):
                 rx.set_focus("confirm_password"),
             ]
 
-    def _register_user(self, username, password) -> None:
-        with rx.session() as session:
-            # Create the new user and add it to the database.
-            new_user = LocalUser()  # type: ignore
-            new_user.username = username
-            new_user.password_hash = LocalUser.hash_password(password)
-            new_user.enabled = True
-            session.add(new_user)
-            session.commit()
-            session.refresh(new_user)
-            if new_user.id is not None:
-                self.new_user_id = new_user.id
+    def _username_taken(self, username) -> list[EventSpec]:
+        self.error_message = (
+            f"Username {username} is already registered. Try a different name"
+        )
+        return [rx.set_value("username", ""), rx.set_focus("username")]
+
+    async def _register_user(self, username, password) -> bool:
+        # Hash before touching the database, so no connection is held meanwhile.
+        password_hash = await LocalUser.ahash_password(password)
+        # A single INSERT; the unique index on username rejects duplicates, and the
+        # new id comes back via RETURNING (or lastrowid) in the same round trip.
+        statement = insert(LocalUser).values(
+            username=username,
+            password_hash=password_hash,
+            enabled=True,
+        )
+        try:
+            if db.async_db_enabled():
+                with span(SPAN_DB_REGISTER):
+                    async with db.asession() as session:
+                        result = await session.exec(statement)
+                        await session.commit()
+            else:
+                with span(SPAN_DB_REGISTER), db.session() as session:
+                    result = session.exec(statement)
+                    session.commit()
+        except IntegrityError:
+            return False
+        # Logging in next looks the new user up on the primary.
+        self._read_from_primary()
+        new_user_id = result.inserted_primary_key
+        if new_user_id is not None and new_user_id[0] is not None:
+            self.new_user_id = new_user_id[0]
+        return True
 
     @rx.event
-    def handle_registration(
+    async def handle_registration(
         self,
         form_data: dict[str, Any],
     ):
@@ -81,7 +97,15 @@ class RegistrationState(LocalAuthState):
         if validation_errors:
             self.new_user_id = -1
             return validation_errors
-        self._register_user(username, password)
+        try:
+            registered = await self._register_user(username, password)
+        except HashPoolBusyError:
+            self.new_user_id = -1
+            self.error_message = "The server is busy, please try again."
+            return None
+        if not registered:
+            self.new_user_id = -1
+            return self._username_taken(username)
         return type(self).successful_registration
 
     @rx.event
@@ -0,0 +1,208 @@
+"""Slide the expiration of active sessions forward.
+
+`_login` sets a fixed expiration, so without renewal even an active user is
+logged out `DEFAULT_AUTH_SESSION_EXPIRATION_DELTA` after logging in. With a
+session renewer configured, resolving `authenticated_user` from the database
+extends the session to `expiration_delta` from now, but only once its remaining
+lifetime has dropped below `renew_threshold`:
+
+```python
+reflex_local_auth.renewal.set_session_renewer(
+    reflex_local_auth.renewal.SessionRenewer(
+        expiration_delta=datetime.timedelta(days=7),
+        renew_threshold=datetime.timedelta(days=6),
+    )
+)
+```
+
+A renewed session is not due again for `expiration_delta - renew_threshold`,
+the renewal window. Renewals are coalesced at two levels:
+
+* Each worker remembers the sessions it renewed, and skips them until the
+  window ends. Many tabs sharing a session issue at most one UPDATE per worker
+  per window.
+* The UPDATE only matches while the session is still below the threshold.
+  When several workers renew the same session concurrently, one of them writes
+  the row and the others match nothing.
+
+Signed session tokens carry their own expiration and are not renewed.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import threading
+from collections import OrderedDict
+
+from sqlmodel import col, update
+
+from . import db
+from .auth_session import LocalAuthSession
+from .instrumentation import SPAN_DB_RENEW_SESSION, span
+
+DEFAULT_RENEWER_MAX_TRACKED = 100_000
+
+
+@dataclasses.dataclass
+class RenewalMetrics:
+    """Counters describing the work done by a session renewer."""
+
+    # Sessions resolved from the database and checked for renewal.
+    checks: int = 0
+    # Checks that found the session below the renewal threshold.
+    due: int = 0
+    # Due renewals skipped because this worker renewed the session in the window.
+    coalesced: int = 0
+    statements: int = 0
+    rows_renewed: int = 0
+
+
+class SessionRenewer:
+    """Extend sessions below a remaining-lifetime threshold, once per window."""
+
+    def __init__(
+        self,
+        expiration_delta: datetime.timedelta | None = None,
+        renew_threshold: datetime.timedelta | None = None,
+        max_tracked: int = DEFAULT_RENEWER_MAX_TRACKED,
+    ):
+        """Initialize the renewer.
+
+        Args:
+            expiration_delta: The lifetime of a renewed session. Defaults to
+                DEFAULT_AUTH_SESSION_EXPIRATION_DELTA.
+            renew_threshold: Sessions are renewed when their remaining lifetime
+                is below this. Defaults to half of expiration_delta.
+            max_tracked: The maximum number of recently renewed sessions this
+                worker remembers.
+
+        Raises:
+            ValueError: If renew_threshold is not shorter than expiration_delta.
+        """
+        if expiration_delta is None:
+            from .local_auth import DEFAULT_AUTH_SESSION_EXPIRATION_DELTA
+
+            expiration_delta = DEFAULT_AUTH_SESSION_EXPIRATION_DELTA
+        if renew_threshold is None:
+            renew_threshold = expiration_delta / 2
+        if renew_threshold >= expiration_delta:
+            msg = "renew_threshold must be shorter than expiration_delta."
+            raise ValueError(msg)
+        self.expiration_delta = expiration_delta
+        self.renew_threshold = renew_threshold
+        self.max_tracked = max_tracked
+        self.metrics = RenewalMetrics()
+        # auth_token -> timestamp when its renewal window ends
+        self._renewed: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def window(self) -> datetime.timedelta:
+        """The minimum time between two renewals of the same session."""
+        return self.expiration_delta - self.renew_threshold
+
+    def _due(
+        self, auth_token: str, expiration: datetime.datetime, now: datetime.datetime
+    ) -> bool:
+        self.metrics.checks += 1
+        if db.as_utc(expiration) - now >= self.renew_threshold:
+            return False
+        self.metrics.due += 1
+        timestamp = now.timestamp()
+        with self._lock:
+            if self._renewed.get(auth_token, 0) > timestamp:
+                self.metrics.coalesced += 1
+                return False
+            self._renewed[auth_token] = timestamp + self.window.total_seconds()
+            self._renewed.move_to_end(auth_token)
+            while len(self._renewed) > self.max_tracked:
+                self._renewed.popitem(last=False)
+        return True
+
+    def _statement(self, auth_token: str, now: datetime.datetime):
+        return (
+            update(LocalAuthSession)
+            .where(
+                col(LocalAuthSession.session_id) == auth_token,
+                # Lost races match nothing, so each window writes the row once.
+                col(LocalAuthSession.expiration) < now + self.renew_threshold,
+            )
+            .values(expiration=now + self.expiration_delta)
+        )
+
+    def _renewed_rows(self, rowcount: int) -> bool:
+        self.metrics.statements += 1
+        self.metrics.rows_renewed += rowcount
+        return rowcount > 0
+
+    def renew(
+        self,
+        auth_token: str,
+        expiration: datetime.datetime,
+        now: datetime.datetime | None = None,
+    ) -> bool:
+        """Extend a session if it is due for renewal.
+
+        Args:
+            auth_token: The session_id of the LocalAuthSession.
+            expiration: The current expiration of the session.
+            now: The current time; defaults to now.
+
+        Returns:
+            True if this call wrote the new expiration.
+        """
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        if not self._due(auth_token, expiration, now):
+            return False
+        with span(SPAN_DB_RENEW_SESSION), db.session() as session:
+            result = session.exec(self._statement(auth_token, now))
+            session.commit()
+        return self._renewed_rows(result.rowcount)
+
+    async def arenew(
+        self,
+        auth_token: str,
+        expiration: datetime.datetime,
+        now: datetime.datetime | None = None,
+    ) -> bool:
+        """Extend a session if it is due for renewal.
+
+        Async version of renew; uses the async session when enabled.
+
+        Args:
+            auth_token: The session_id of the LocalAuthSession.
+            expiration: The current expiration of the session.
+            now: The current time; defaults to now.
+
+        Returns:
+            True if this call wrote the new expiration.
+        """
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        if not self._due(auth_token, expiration, now):
+            return False
+        with span(SPAN_DB_RENEW_SESSION):
+            rowcount = await db.exec_commit(self._statement(auth_token, now))
+        return self._renewed_rows(rowcount)
+
+
+_session_renewer: SessionRenewer | None = None
+
+
+def set_session_renewer(renewer: SessionRenewer | None) -> None:
+    """Set the renewer used when resolving authenticated_user.
+
+    Args:
+        renewer: The renewer to use, or None for fixed session expiration.
+    """
+    global _session_renewer
+    _session_renewer = renewer
+
+
+def get_session_renewer() -> SessionRenewer | None:
+    """Get the configured session renewer.
+
+    Returns:
+        The configured SessionRenewer, or None if sessions are not renewed.
+    """
+    return _session_renewer
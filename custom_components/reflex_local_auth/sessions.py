@@ -0,0 +1,155 @@
+"""List and revoke a user's sessions across devices.
+
+A user logged in on several devices has one LocalAuthSession per device. These
+functions manage all of them through the indexed `user_id` column, and each
+revocation is a single set-based DELETE, however many sessions it removes.
+
+```python
+class DevicesState(reflex_local_auth.LocalAuthState):
+    sessions: list[reflex_local_auth.sessions.SessionInfo] = []
+
+    @rx.event
+    async def load_sessions(self):
+        self.sessions = await self._alist_sessions()
+```
+
+`LocalAuthState` wraps these functions for the authenticated user with the
+`revoke_session`, `revoke_other_sessions` and `do_logout_all` event handlers.
+
+Revoked tokens are removed from the session cache in one batch, so other
+workers stop accepting them immediately. Clients already holding a computed
+`authenticated_user` keep it until their next refresh, unless push invalidation
+is enabled with `reflex_local_auth.push.set_client_registry`.
+
+Signed session tokens are not stored in the database, so they are not listed
+here. `revoke_all_sessions` also revokes every signed token of the user; the
+other functions only cover LocalAuthSession rows.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+from typing import Any
+
+from sqlmodel import col, delete, select
+
+from . import db, push, tokens
+from .auth_session import LocalAuthSession
+from .cache import get_session_cache
+from .instrumentation import SPAN_DB_LIST_SESSIONS, SPAN_DB_REVOKE_SESSIONS, span
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class SessionInfo:
+    """An active session, without its secret session_id."""
+
+    id: int = -1
+    expiration: datetime.datetime | None = None
+    # Whether this is the session of the client that listed the sessions.
+    current: bool = False
+
+
+async def list_sessions(user_id: int, auth_token: str = "") -> list[SessionInfo]:
+    """Get the unexpired sessions of a user, soonest to expire first.
+
+    Args:
+        user_id: The user whose sessions are listed.
+        auth_token: The auth_token of the requesting client, to mark its session
+            as current.
+
+    Returns:
+        One SessionInfo per unexpired session.
+    """
+    with span(SPAN_DB_LIST_SESSIONS):
+        sessions = await db.exec_all(
+            select(LocalAuthSession)
+            .where(
+                LocalAuthSession.user_id == user_id,
+                LocalAuthSession.expiration
+                >= datetime.datetime.now(datetime.timezone.utc),
+            )
+            .order_by(col(LocalAuthSession.expiration))
+        )
+    return [
+        SessionInfo(
+            id=session.id,
+            expiration=session.expiration,
+            current=bool(auth_token) and session.session_id == auth_token,
+        )
+        for session in sessions
+        if session.id is not None
+    ]
+
+
+async def _revoke(*criteria: Any) -> int:
+    statement = delete(LocalAuthSession).where(*criteria)
+    cache = get_session_cache()
+    push_enabled = push.get_client_registry() is not None
+    with span(SPAN_DB_REVOKE_SESSIONS):
+        if cache is None and not push_enabled:
+            return await db.exec_commit(statement)
+        if db.delete_returning_supported():
+            auth_tokens = await db.exec_commit_returning(
+                statement.returning(col(LocalAuthSession.session_id))
+            )
+        else:
+            auth_tokens = await db.exec_all(
+                select(LocalAuthSession.session_id).where(*criteria)
+            )
+            await db.exec_commit(statement)
+    if cache is not None:
+        cache.invalidate_many(auth_tokens)
+    if push_enabled:
+        push.schedule(push.refresh_clients(auth_tokens))
+    return len(auth_tokens)
+
+
+async def revoke_session(user_id: int, session_id: int) -> int:
+    """Delete one session of a user.
+
+    Args:
+        user_id: The user owning the session.
+        session_id: The id of the session, as listed by list_sessions.
+
+    Returns:
+        The number of sessions deleted: 0 if the user has no such session.
+    """
+    return await _revoke(
+        col(LocalAuthSession.id) == session_id,
+        col(LocalAuthSession.user_id) == user_id,
+    )
+
+
+async def revoke_other_sessions(user_id: int, auth_token: str) -> int:
+    """Delete every session of a user, except the one for auth_token.
+
+    Args:
+        user_id: The user whose sessions are deleted.
+        auth_token: The auth_token of the session to keep.
+
+    Returns:
+        The number of sessions deleted.
+    """
+    return await _revoke(
+        col(LocalAuthSession.user_id) == user_id,
+        col(LocalAuthSession.session_id) != auth_token,
+    )
+
+
+async def revoke_all_sessions(user_id: int) -> int:
+    """Delete every session of a user, logging them out on all devices.
+
+    Signed tokens issued to the user until now are revoked as well.
+
+    Args:
+        user_id: The user whose sessions are deleted.
+
+    Returns:
+        The number of sessions deleted.
+    """
+    if tokens.signed_tokens_enabled():
+        tokens.revoke_user_tokens(user_id)
+        if push.get_client_registry() is not None:
+            push.schedule(push.refresh_user(user_id))
+    return await _revoke(col(LocalAuthSession.user_id) == user_id)
@@ -0,0 +1,307 @@
+"""Throttle login attempts per username and client IP pair, and per client IP.
+
+Every login attempt costs a bcrypt verification, so unlimited attempts are both
+a brute-force and a CPU exhaustion risk. `LoginState.on_submit` consults the
+rate limiters before touching the database or bcrypt, and rejects the attempt
+when the username from this client IP, or the client IP itself, is over its
+limit.
+
+The strict limit is keyed on the username and client IP together, so failed
+attempts from one address cannot lock the user out everywhere else. A global
+per-username limit, which anyone knowing a username can exhaust, is opt-in.
+
+The limiters use a sliding-window counter: each key keeps only the attempt
+count of the current and previous fixed window, and the previous count is
+weighted by how much of it still overlaps the sliding window. Memory per key is
+constant, and `MemoryRateLimiter` evicts the least recently used keys beyond
+`max_keys`. Only allowed attempts are counted, and a successful login resets
+the counters of its username.
+
+Throttling per username and client IP, and per client IP, is enabled by default
+with in-memory limiters. With several backend workers, share the counters
+through Redis:
+
+```python
+reflex_local_auth.throttle.set_login_throttle(
+    username_ip_limiter=reflex_local_auth.throttle.RedisRateLimiter(
+        limit=10, window=datetime.timedelta(minutes=5), key_prefix="login:user_ip:"
+    ),
+    ip_limiter=reflex_local_auth.throttle.RedisRateLimiter(
+        limit=100, window=datetime.timedelta(minutes=5), key_prefix="login:ip:"
+    ),
+    # Optional, and loose: a cap on one username across all addresses.
+    username_limiter=reflex_local_auth.throttle.RedisRateLimiter(
+        limit=1000, window=datetime.timedelta(hours=1), key_prefix="login:user:"
+    ),
+    trusted_proxies=1,
+)
+```
+
+The client IP is the address of the socket peer. Behind reverse proxies, set
+`trusted_proxies` to the number of proxies appending to X-Forwarded-For, so the
+address they recorded is used instead; hops added by the client itself are
+never trusted.
+"""
+
+from __future__ import annotations
+
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any
+
+from .redis_client import resolve_redis
+
+if TYPE_CHECKING:
+    from reflex.istate.data import RouterData
+
+DEFAULT_USERNAME_IP_LIMIT = 10
+DEFAULT_IP_LIMIT = 100
+DEFAULT_THROTTLE_WINDOW = datetime.timedelta(minutes=5)
+DEFAULT_THROTTLE_MAX_KEYS = 100_000
+DEFAULT_REDIS_KEY_PREFIX = "reflex_local_auth:throttle:"
+
+
+class RateLimiter:
+    """Base class for sliding-window rate limiters keyed by string."""
+
+    def __init__(self, limit: int, window: datetime.timedelta):
+        """Initialize the limiter.
+
+        Args:
+            limit: The number of attempts allowed per window.
+            window: The length of the sliding window.
+        """
+        self.limit = limit
+        self.window = window.total_seconds()
+        self.rejected = 0
+
+    def _estimate(self, previous: int, current: int, now: float) -> float:
+        elapsed = (now % self.window) / self.window
+        return previous * (1 - elapsed) + current
+
+    def hit(self, key: str) -> bool:
+        """Record an attempt for key, unless it is over the limit.
+
+        Args:
+            key: The key to check, like a username or client IP.
+
+        Returns:
+            True if the attempt is allowed, False if it should be rejected.
+        """
+        allowed = self._hit(key, time.time())
+        if not allowed:
+            self.rejected += 1
+        return allowed
+
+    def _hit(self, key: str, now: float) -> bool:
+        raise NotImplementedError
+
+    def reset(self, key: str) -> None:
+        """Forget all attempts recorded for key.
+
+        Args:
+            key: The key to reset.
+        """
+        raise NotImplementedError
+
+
+class MemoryRateLimiter(RateLimiter):
+    """An in-process rate limiter holding at most max_keys counters."""
+
+    def __init__(
+        self,
+        limit: int,
+        window: datetime.timedelta = DEFAULT_THROTTLE_WINDOW,
+        max_keys: int = DEFAULT_THROTTLE_MAX_KEYS,
+    ):
+        """Initialize the limiter.
+
+        Args:
+            limit: The number of attempts allowed per window.
+            window: The length of the sliding window.
+            max_keys: The maximum number of keys tracked; the least recently
+                used keys are evicted first.
+        """
+        super().__init__(limit=limit, window=window)
+        self.max_keys = max_keys
+        # key -> (window number, previous window count, current window count)
+        self._counters: OrderedDict[str, tuple[int, int, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _hit(self, key: str, now: float) -> bool:
+        window_number = int(now // self.window)
+        with self._lock:
+            counter_window, previous, current = self._counters.get(key, (0, 0, 0))
+            if counter_window != window_number:
+                previous = current if counter_window == window_number - 1 else 0
+                current = 0
+            allowed = self._estimate(previous, current, now) < self.limit
+            if allowed:
+                current += 1
+            self._counters[key] = (window_number, previous, current)
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+        return allowed
+
+    def reset(self, key: str) -> None:
+        """Forget all attempts recorded for key.
+
+        Args:
+            key: The key to reset.
+        """
+        with self._lock:
+            self._counters.pop(key, None)
+
+
+class RedisRateLimiter(RateLimiter):
+    """A rate limiter shared by all backend workers through Redis.
+
+    Each key uses one Redis counter per fixed window, expiring after two windows.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        window: datetime.timedelta = DEFAULT_THROTTLE_WINDOW,
+        redis: Any = None,
+        key_prefix: str = DEFAULT_REDIS_KEY_PREFIX,
+    ):
+        """Initialize the limiter.
+
+        Args:
+            limit: The number of attempts allowed per window.
+            window: The length of the sliding window.
+            redis: A synchronous redis client, see `redis_client.resolve_redis`.
+            key_prefix: Prefix for counter keys; use a different prefix for
+                each limiter sharing a Redis instance.
+
+        Raises:
+            ValueError: If no redis client is passed and redis_url is not configured.
+        """
+        super().__init__(limit=limit, window=window)
+        self.redis = resolve_redis(redis, "RedisRateLimiter")
+        self.key_prefix = key_prefix
+
+    def _key(self, key: str, window_number: int) -> str:
+        return f"{self.key_prefix}{key}:{window_number}"
+
+    def _hit(self, key: str, now: float) -> bool:
+        window_number = int(now // self.window)
+        current_key = self._key(key, window_number)
+        pipe = self.redis.pipeline()
+        pipe.get(self._key(key, window_number - 1))
+        pipe.incr(current_key)
+        pipe.pexpire(current_key, int(self.window * 2000))
+        previous, current, _ = pipe.execute()
+        # INCR is atomic, so concurrent attempts each see a distinct count.
+        if self._estimate(int(previous or 0), current - 1, now) < self.limit:
+            return True
+        self.redis.decr(current_key)
+        return False
+
+    def reset(self, key: str) -> None:
+        """Forget all attempts recorded for key.
+
+        Args:
+            key: The key to reset.
+        """
+        window_number = int(time.time() // self.window)
+        self.redis.delete(
+            self._key(key, window_number - 1), self._key(key, window_number)
+        )
+
+
+_username_ip_limiter: RateLimiter | None = MemoryRateLimiter(
+    limit=DEFAULT_USERNAME_IP_LIMIT
+)
+_ip_limiter: RateLimiter | None = MemoryRateLimiter(limit=DEFAULT_IP_LIMIT)
+_username_limiter: RateLimiter | None = None
+_trusted_proxies: int = 0
+
+
+def set_login_throttle(
+    username_ip_limiter: RateLimiter | None,
+    ip_limiter: RateLimiter | None,
+    username_limiter: RateLimiter | None = None,
+    trusted_proxies: int = 0,
+) -> None:
+    """Set the rate limiters consulted by LoginState.on_submit.
+
+    Args:
+        username_ip_limiter: The limiter keyed by username and client IP
+            together, or None to disable it.
+        ip_limiter: The limiter keyed by client IP, or None to disable it.
+        username_limiter: The limiter keyed by username alone, or None to
+            disable it. Attempts from any address count against it, so keep
+            its limit loose.
+        trusted_proxies: The number of reverse proxies appending the client
+            address to X-Forwarded-For.
+    """
+    global _username_ip_limiter, _ip_limiter, _username_limiter, _trusted_proxies
+    _username_ip_limiter = username_ip_limiter
+    _ip_limiter = ip_limiter
+    _username_limiter = username_limiter
+    _trusted_proxies = trusted_proxies
+
+
+def _username_ip_key(username: str, ip: str) -> str:
+    # Addresses never contain "/", so the key is unambiguous.
+    return f"{ip}/{username}"
+
+
+def client_ip(router: RouterData) -> str:
+    """Get the address used to throttle a client.
+
+    Args:
+        router: The router data of the client's state.
+
+    Returns:
+        The client IP, or an empty string if it is unknown.
+    """
+    headers = router.headers.raw_headers
+    if _trusted_proxies:
+        hops = [
+            hop.strip()
+            for hop in headers.get("x-forwarded-for", "").split(",")
+            if hop.strip()
+        ]
+        if len(hops) >= _trusted_proxies:
+            return hops[-_trusted_proxies]
+    # router.session.client_ip is the first X-Forwarded-For hop, which the
+    # client controls, so prefer the socket peer address.
+    return headers.get("asgi-scope-client", router.session.client_ip)
+
+
+def login_allowed(username: str, ip: str) -> bool:
+    """Record a login attempt, unless any of its keys is over its limit.
+
+    Args:
+        username: The submitted username.
+        ip: The client IP.
+
+    Returns:
+        True if the attempt may proceed.
+    """
+    if _ip_limiter is not None and ip and not _ip_limiter.hit(ip):
+        return False
+    if _username_ip_limiter is not None and not _username_ip_limiter.hit(
+        _username_ip_key(username, ip)
+    ):
+        return False
+    return _username_limiter is None or _username_limiter.hit(username)
+
+
+def login_succeeded(username: str, ip: str) -> None:
+    """Clear the failed attempts counted against a username.
+
+    Args:
+        username: The username that logged in.
+        ip: The client IP it logged in from.
+    """
+    if _username_ip_limiter is not None:
+        _username_ip_limiter.reset(_username_ip_key(username, ip))
+    if _username_limiter is not None:
+        _username_limiter.reset(username)
@@ -0,0 +1,493 @@
+"""Stateless, HMAC-signed session tokens.
+
+By default, `auth_token` is an opaque identifier looked up in the
+LocalAuthSession table whenever `authenticated_user` is recomputed. In signed
+token mode, `_login` instead stores a token carrying the user id, username,
+expiration and a random session id, signed with HMAC-SHA256. Verifying it needs
+no database access.
+
+Logging out adds the token's session id to a revocation list until the token
+would have expired anyway. `revoke_user_tokens` revokes every token issued to a
+user until now, through a per-user "not before" time in the same list. The
+default MemoryRevocationList only covers a single backend worker; use
+RedisRevocationList when running several workers.
+
+```python
+reflex_local_auth.tokens.configure_signed_tokens(
+    keys={"2": os.environ["AUTH_KEY_2"], "1": os.environ["AUTH_KEY_1"]},
+    current_key_id="2",
+)
+```
+
+New tokens are signed with `current_key_id`; tokens signed with any other
+configured key are still accepted. To rotate keys, add a new key and make it
+current, then drop the old key once its tokens have expired.
+
+Because tokens are verified without a database query, the user's enabled flag
+is not checked: only enabled users are issued tokens. Committing
+`LocalUser.enabled = False` through the ORM revokes the user's tokens, and so
+does `reflex_local_auth.sessions.revoke_all_sessions`. After disabling a user
+outside the ORM, like with an UPDATE statement, call `revoke_user_tokens`.
+"""
+
+from __future__ import annotations
+
+import base64
+import dataclasses
+import datetime
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from typing import Any
+
+from .redis_client import resolve_redis
+
+TOKEN_VERSION = "v1"
+DEFAULT_REDIS_REVOCATION_KEY_PREFIX = "reflex_local_auth:revoked:"
+_EPOCH = datetime.datetime.fromtimestamp(0, tz=datetime.timezone.utc)
+
+
+@dataclasses.dataclass(frozen=True)
+class TokenClaims:
+    """The verified contents of a signed token."""
+
+    user_id: int
+    username: str
+    expiration: datetime.datetime
+    session_id: str
+    key_id: str
+    # Tokens issued before the "iat" claim was added count as issued at the epoch.
+    issued_at: datetime.datetime = _EPOCH
+
+
+class RevocationList:
+    """Base class for stores of revoked token session ids and users."""
+
+    def revoke(self, session_id: str, expiration: datetime.datetime) -> None:
+        """Revoke a session id until its token expires.
+
+        Args:
+            session_id: The session id from the token's claims.
+            expiration: When the token expires and no longer needs to be tracked.
+        """
+        raise NotImplementedError
+
+    def is_revoked(self, session_id: str) -> bool:
+        """Check whether a session id was revoked.
+
+        Args:
+            session_id: The session id from the token's claims.
+
+        Returns:
+            True if the session id was revoked.
+        """
+        raise NotImplementedError
+
+    def revoke_user(
+        self, user_id: int, not_before: float, expiration: datetime.datetime
+    ) -> None:
+        """Revoke every token of a user issued before a time.
+
+        Args:
+            user_id: The user whose tokens are revoked.
+            not_before: Tokens issued before this timestamp are revoked.
+            expiration: When every token issued before not_before has expired.
+        """
+        raise NotImplementedError
+
+    def user_not_before(self, user_id: int) -> float:
+        """Get the time before which a user's tokens are revoked.
+
+        Args:
+            user_id: The user id from the token's claims.
+
+        Returns:
+            The timestamp passed to revoke_user, or 0 if the user has none.
+        """
+        raise NotImplementedError
+
+    def is_token_revoked(self, claims: TokenClaims) -> bool:
+        """Check whether a token was revoked, by session id or for its user.
+
+        Args:
+            claims: The verified claims of the token.
+
+        Returns:
+            True if the token was revoked.
+        """
+        return self.is_revoked(
+            claims.session_id
+        ) or claims.issued_at.timestamp() < self.user_not_before(claims.user_id)
+
+
+class MemoryRevocationList(RevocationList):
+    """An in-process revocation list that forgets entries once their token expires."""
+
+    def __init__(self):
+        """Initialize the revocation list."""
+        self._entries: dict[str, float] = {}
+        # user id -> (not before, expiration) timestamps
+        self._users: dict[int, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, session_id: str, expiration: datetime.datetime) -> None:
+        """Revoke a session id until its token expires.
+
+        Args:
+            session_id: The session id from the token's claims.
+            expiration: When the token expires and no longer needs to be tracked.
+        """
+        now = time.time()
+        with self._lock:
+            # Prune expired entries so the list only holds live tokens.
+            for expired in [sid for sid, exp in self._entries.items() if exp <= now]:
+                del self._entries[expired]
+            self._entries[session_id] = expiration.timestamp()
+
+    def is_revoked(self, session_id: str) -> bool:
+        """Check whether a session id was revoked.
+
+        Args:
+            session_id: The session id from the token's claims.
+
+        Returns:
+            True if the session id was revoked.
+        """
+        return session_id in self._entries
+
+    def revoke_user(
+        self, user_id: int, not_before: float, expiration: datetime.datetime
+    ) -> None:
+        """Revoke every token of a user issued before a time.
+
+        Args:
+            user_id: The user whose tokens are revoked.
+            not_before: Tokens issued before this timestamp are revoked.
+            expiration: When every token issued before not_before has expired.
+        """
+        now = time.time()
+        with self._lock:
+            for expired in [uid for uid, (_, exp) in self._users.items() if exp <= now]:
+                del self._users[expired]
+            previous_not_before, previous_expiration = self._users.get(
+                user_id, (0.0, 0.0)
+            )
+            self._users[user_id] = (
+                max(not_before, previous_not_before),
+                max(expiration.timestamp(), previous_expiration),
+            )
+
+    def user_not_before(self, user_id: int) -> float:
+        """Get the time before which a user's tokens are revoked.
+
+        Args:
+            user_id: The user id from the token's claims.
+
+        Returns:
+            The timestamp passed to revoke_user, or 0 if the user has none.
+        """
+        return self._users.get(user_id, (0.0, 0.0))[0]
+
+
+class RedisRevocationList(RevocationList):
+    """A revocation list shared by all backend workers through Redis.
+
+    Revocations seen by this worker are remembered locally, so only session ids
+    not known to be revoked are checked against Redis, with the user's "not
+    before" time in the same round trip.
+    """
+
+    def __init__(
+        self,
+        redis: Any = None,
+        key_prefix: str = DEFAULT_REDIS_REVOCATION_KEY_PREFIX,
+    ):
+        """Initialize the revocation list.
+
+        Args:
+            redis: A synchronous redis client, see `redis_client.resolve_redis`.
+            key_prefix: Prefix for revocation keys.
+
+        Raises:
+            ValueError: If no redis client is passed and redis_url is not configured.
+        """
+        self.redis = resolve_redis(redis, "RedisRevocationList")
+        self.key_prefix = key_prefix
+        self.local = MemoryRevocationList()
+
+    def revoke(self, session_id: str, expiration: datetime.datetime) -> None:
+        """Revoke a session id until its token expires.
+
+        Args:
+            session_id: The session id from the token's claims.
+            expiration: When the token expires and no longer needs to be tracked.
+        """
+        ttl_ms = int((expiration.timestamp() - time.time()) * 1000)
+        if ttl_ms <= 0:
+            return
+        self.local.revoke(session_id, expiration)
+        self.redis.set(f"{self.key_prefix}{session_id}", b"1", px=ttl_ms)
+
+    def is_revoked(self, session_id: str) -> bool:
+        """Check whether a session id was revoked.
+
+        Args:
+            session_id: The session id from the token's claims.
+
+        Returns:
+            True if the session id was revoked.
+        """
+        if self.local.is_revoked(session_id):
+            return True
+        return bool(self.redis.exists(f"{self.key_prefix}{session_id}"))
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self.key_prefix}user:{user_id}"
+
+    def revoke_user(
+        self, user_id: int, not_before: float, expiration: datetime.datetime
+    ) -> None:
+        """Revoke every token of a user issued before a time.
+
+        Args:
+            user_id: The user whose tokens are revoked.
+            not_before: Tokens issued before this timestamp are revoked.
+            expiration: When every token issued before not_before has expired.
+        """
+        ttl_ms = int((expiration.timestamp() - time.time()) * 1000)
+        if ttl_ms <= 0:
+            return
+        self.local.revoke_user(user_id, not_before, expiration)
+        self.redis.set(self._user_key(user_id), repr(not_before), px=ttl_ms)
+
+    def user_not_before(self, user_id: int) -> float:
+        """Get the time before which a user's tokens are revoked.
+
+        Args:
+            user_id: The user id from the token's claims.
+
+        Returns:
+            The timestamp passed to revoke_user, or 0 if the user has none.
+        """
+        value = self.redis.get(self._user_key(user_id))
+        return float(value) if value is not None else 0.0
+
+    def is_token_revoked(self, claims: TokenClaims) -> bool:
+        """Check whether a token was revoked, by session id or for its user.
+
+        Args:
+            claims: The verified claims of the token.
+
+        Returns:
+            True if the token was revoked.
+        """
+        if self.local.is_token_revoked(claims):
+            return True
+        session_revoked, not_before = self.redis.mget(
+            f"{self.key_prefix}{claims.session_id}", self._user_key(claims.user_id)
+        )
+        return session_revoked is not None or (
+            not_before is not None and claims.issued_at.timestamp() < float(not_before)
+        )
+
+
+_keys: dict[str, bytes] = {}
+_current_key_id: str | None = None
+_revocation_list: RevocationList = MemoryRevocationList()
+
+
+def configure_signed_tokens(
+    keys: dict[str, str | bytes] | None,
+    current_key_id: str | None = None,
+    revocation_list: RevocationList | None = None,
+) -> None:
+    """Enable (or disable) signed token mode.
+
+    Args:
+        keys: Mapping of key id to secret key. Pass None to disable signed tokens.
+        current_key_id: The key id used to sign new tokens. Defaults to the
+            first key in `keys`.
+        revocation_list: Where revoked session ids are stored. Defaults to a
+            MemoryRevocationList.
+
+    Raises:
+        ValueError: If a key id is invalid or current_key_id is not in keys.
+    """
+    global _keys, _current_key_id, _revocation_list
+    if not keys:
+        _keys = {}
+        _current_key_id = None
+        return
+    for key_id in keys:
+        if not key_id or "." in key_id:
+            msg = f"Invalid signing key id {key_id!r}."
+            raise ValueError(msg)
+    current_key_id = current_key_id or next(iter(keys))
+    if current_key_id not in keys:
+        msg = f"current_key_id {current_key_id!r} is not one of the signing keys."
+        raise ValueError(msg)
+    _keys = {
+        key_id: key.encode("utf-8") if isinstance(key, str) else key
+        for key_id, key in keys.items()
+    }
+    _current_key_id = current_key_id
+    if revocation_list is not None:
+        _revocation_list = revocation_list
+    from .push import listen_for_user_changes
+
+    # Disabling a user revokes its tokens.
+    listen_for_user_changes()
+
+
+def signed_tokens_enabled() -> bool:
+    """Whether signed token mode is enabled.
+
+    Returns:
+        True if signing keys are configured.
+    """
+    return _current_key_id is not None
+
+
+def is_signed_token(token: str) -> bool:
+    """Whether a token looks like a signed token (as opposed to a session id).
+
+    Args:
+        token: The auth_token value.
+
+    Returns:
+        True if the token has the signed token prefix.
+    """
+    return token.startswith(f"{TOKEN_VERSION}.")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(key: bytes, message: str) -> str:
+    return _b64encode(hmac.new(key, message.encode("ascii"), hashlib.sha256).digest())
+
+
+def issue_token(user_id: int, username: str, expiration: datetime.datetime) -> str:
+    """Create a signed token for a user.
+
+    Args:
+        user_id: The user's id.
+        username: The user's username.
+        expiration: When the token stops being valid.
+
+    Returns:
+        The signed token.
+
+    Raises:
+        RuntimeError: If signed tokens are not configured.
+    """
+    if _current_key_id is None:
+        msg = "Signed tokens are not configured."
+        raise RuntimeError(msg)
+    payload = _b64encode(
+        json.dumps(
+            {
+                "uid": user_id,
+                "usr": username,
+                "exp": int(expiration.timestamp()),
+                # Rounded down, so a token is never issued after a revocation.
+                "iat": int(time.time() * 1000) / 1000,
+                "sid": secrets.token_urlsafe(16),
+            },
+            separators=(",", ":"),
+        ).encode("utf-8")
+    )
+    message = f"{TOKEN_VERSION}.{_current_key_id}.{payload}"
+    return f"{message}.{_sign(_keys[_current_key_id], message)}"
+
+
+def _verify(token: str) -> TokenClaims | None:
+    try:
+        version, key_id, payload, signature = token.split(".")
+    except ValueError:
+        return None
+    key = _keys.get(key_id)
+    if version != TOKEN_VERSION or key is None:
+        return None
+    expected = _sign(key, f"{version}.{key_id}.{payload}")
+    if not hmac.compare_digest(expected, signature):
+        return None
+    try:
+        fields = json.loads(_b64decode(payload))
+        claims = TokenClaims(
+            user_id=int(fields["uid"]),
+            username=str(fields["usr"]),
+            expiration=datetime.datetime.fromtimestamp(
+                fields["exp"], tz=datetime.timezone.utc
+            ),
+            session_id=str(fields["sid"]),
+            key_id=key_id,
+            issued_at=datetime.datetime.fromtimestamp(
+                fields.get("iat", 0), tz=datetime.timezone.utc
+            ),
+        )
+    except (ValueError, KeyError, TypeError):
+        return None
+    if claims.expiration <= datetime.datetime.now(datetime.timezone.utc):
+        return None
+    return claims
+
+
+def decode_token(token: str) -> TokenClaims | None:
+    """Verify a signed token.
+
+    Args:
+        token: The signed token.
+
+    Returns:
+        The token's claims, or None if the token is malformed, signed with an
+        unknown key, expired or revoked.
+    """
+    claims = _verify(token)
+    if claims is None or _revocation_list.is_token_revoked(claims):
+        return None
+    return claims
+
+
+def revoke_token(token: str) -> None:
+    """Revoke a signed token until it expires.
+
+    Args:
+        token: The signed token. Invalid tokens are ignored.
+    """
+    claims = _verify(token)
+    if claims is not None:
+        _revocation_list.revoke(claims.session_id, claims.expiration)
+
+
+def revoke_user_tokens(
+    user_id: int, max_lifetime: datetime.timedelta | None = None
+) -> None:
+    """Revoke every signed token issued to a user until now.
+
+    Tokens issued afterwards, like after the user logs in again, are accepted.
+
+    Args:
+        user_id: The user whose tokens are revoked.
+        max_lifetime: The longest expiration_delta tokens are issued with.
+            Defaults to DEFAULT_AUTH_SESSION_EXPIRATION_DELTA.
+    """
+    if max_lifetime is None:
+        from .local_auth import DEFAULT_AUTH_SESSION_EXPIRATION_DELTA
+
+        max_lifetime = DEFAULT_AUTH_SESSION_EXPIRATION_DELTA
+    now = time.time()
+    _revocation_list.revoke_user(
+        user_id,
+        not_before=now,
+        expiration=datetime.datetime.fromtimestamp(now, tz=datetime.timezone.utc)
+        + max_lifetime,
+    )
@@ -1,14 +1,55 @@
 from __future__ import annotations
 
-import bcrypt
+import dataclasses
+from contextlib import AbstractContextManager
+from typing import Any
+
+import sqlalchemy
+from sqlalchemy.orm import deferred
 from sqlmodel import Field, SQLModel, String
 
+from .hashers import (
+    PasswordHasher,
+    dummy_password_hash,
+    get_password_hasher,
+    identify_hasher,
+    needs_rehash,
+)
+from .hashing import run_in_hash_pool
+from .instrumentation import SPAN_HASH_PASSWORD, SPAN_VERIFY_PASSWORD, enabled, span
+
+# Deferred, so only queries that verify passwords load the hash.
+_password_hash_column = sqlalchemy.Column(
+    "password_hash", sqlalchemy.LargeBinary, nullable=False
+)
+
+
+def _hash_span(
+    name: str, pool: bool, hasher: PasswordHasher, password_hash: bytes | None = None
+) -> AbstractContextManager[Any]:
+    # Reading the cost of a stored hash parses it, so only do it for the hooks.
+    if not enabled():
+        return span(name)
+    cost = hasher.cost if password_hash is None else hasher.hash_cost(password_hash)
+    return span(name, pool=pool, algorithm=hasher.name, cost=cost)
+
+
+def _verify_dummy(hasher: PasswordHasher, secret: str) -> bool:
+    # The dummy hash is computed on first use, inside the hash pool.
+    return hasher.verify(secret, dummy_password_hash(hasher))
+
 
 class LocalUser(
     SQLModel,
     table=True,  # type: ignore
 ):
-    """A local User model with bcrypt password hashing."""
+    """A local User model with bcrypt (or other configured) password hashing.
+
+    The password_hash column is deferred: queries that need it, like the login
+    lookup, must add `.options(undefer(LocalUser.password_hash))`.
+    """
+
+    __mapper_args__ = {"properties": {"password_hash": deferred(_password_hash_column)}}
 
     id: int | None = Field(default=None, primary_key=True)
     username: str = Field(
@@ -17,12 +58,12 @@ class LocalUser(
         index=True,
         sa_type=String(255),  # pyright: ignore[reportArgumentType]
     )
-    password_hash: bytes = Field(nullable=False)
+    password_hash: bytes = Field(sa_column=_password_hash_column)
     enabled: bool = False
 
     @staticmethod
     def hash_password(secret: str) -> bytes:
-        """Hash the secret using bcrypt.
+        """Hash the secret using the default password hasher.
 
         Args:
             secret: The password to hash.
@@ -30,10 +71,26 @@ class LocalUser(
         Returns:
             The hashed password.
         """
-        return bcrypt.hashpw(
-            password=secret.encode("utf-8"),
-            salt=bcrypt.gensalt(),
-        )
+        hasher = get_password_hasher()
+        with _hash_span(SPAN_HASH_PASSWORD, False, hasher):
+            return hasher.hash(secret)
+
+    @staticmethod
+    async def ahash_password(secret: str) -> bytes:
+        """Hash the secret using the default password hasher in the hash pool.
+
+        Args:
+            secret: The password to hash.
+
+        Returns:
+            The hashed password.
+
+        Raises:
+            HashPoolBusyError: If too many hashing jobs are already pending.
+        """
+        hasher = get_password_hasher()
+        with _hash_span(SPAN_HASH_PASSWORD, True, hasher):
+            return await run_in_hash_pool(hasher.hash, secret)
 
     def verify(self, secret: str) -> bool:
         """Validate the user's password.
@@ -43,11 +100,94 @@ class LocalUser(
 
         Returns:
             True if the hashed secret matches this user's password_hash.
+
+        Raises:
+            ValueError: If no registered hasher recognizes the password_hash.
         """
-        return bcrypt.checkpw(
-            password=secret.encode("utf-8"),
-            hashed_password=self.password_hash,
-        )
+        hasher = identify_hasher(self.password_hash)
+        with _hash_span(SPAN_VERIFY_PASSWORD, False, hasher, self.password_hash):
+            return hasher.verify(secret, self.password_hash)
+
+    async def averify(self, secret: str) -> bool:
+        """Validate the user's password in the hash pool.
+
+        Args:
+            secret: The password to check.
+
+        Returns:
+            True if the hashed secret matches this user's password_hash.
+
+        Raises:
+            HashPoolBusyError: If too many hashing jobs are already pending.
+            ValueError: If no registered hasher recognizes the password_hash.
+        """
+        return await LocalUser.averify_hash(secret, self.password_hash)
+
+    @staticmethod
+    async def averify_hash(secret: str, password_hash: bytes) -> bool:
+        """Validate a password against a stored hash in the hash pool.
+
+        Like averify, for queries that select the password_hash column instead
+        of loading a LocalUser.
+
+        Args:
+            secret: The password to check.
+            password_hash: The stored password hash.
+
+        Returns:
+            True if the hashed secret matches password_hash.
+
+        Raises:
+            HashPoolBusyError: If too many hashing jobs are already pending.
+            ValueError: If no registered hasher recognizes the password_hash.
+        """
+        hasher = identify_hasher(password_hash)
+        with _hash_span(SPAN_VERIFY_PASSWORD, True, hasher, password_hash):
+            return await run_in_hash_pool(hasher.verify, secret, password_hash)
+
+    def needs_rehash(self) -> bool:
+        """Whether the password_hash should be replaced using the default hasher.
+
+        Returns:
+            True if the hash was created by another hasher or with other parameters.
+        """
+        return needs_rehash(self.password_hash)
+
+    @staticmethod
+    def verify_dummy(secret: str) -> bool:
+        """Spend the same time as verify, for a user that doesn't exist.
+
+        Call this when there is no user to verify, so the response time does
+        not reveal whether a username exists.
+
+        Args:
+            secret: The submitted password.
+
+        Returns:
+            Always False.
+        """
+        hasher = get_password_hasher()
+        with _hash_span(SPAN_VERIFY_PASSWORD, False, hasher):
+            _verify_dummy(hasher, secret)
+        return False
+
+    @staticmethod
+    async def averify_dummy(secret: str) -> bool:
+        """Spend the same time as averify, for a user that doesn't exist.
+
+        Args:
+            secret: The submitted password.
+
+        Returns:
+            Always False.
+
+        Raises:
+            HashPoolBusyError: If too many hashing jobs are already pending.
+        """
+        hasher = get_password_hasher()
+        with _hash_span(SPAN_VERIFY_PASSWORD, True, hasher):
+            await run_in_hash_pool(_verify_dummy, hasher, secret)
+        return False
 
     def model_dump(self, *args, **kwargs) -> dict:
         """Return a dictionary representation of the user."""
@@ -55,3 +195,32 @@ class LocalUser(
         # Never return the hash when serializing to the frontend.
         d.pop("password_hash", None)
         return d
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class AuthenticatedUser:
+    """The LocalUser fields held by LocalAuthState.authenticated_user.
+
+    Never carries the password_hash, so it stays small in per-client state and
+    in the session cache.
+    """
+
+    id: int = -1
+    username: str = ""
+    enabled: bool = False
+
+    @classmethod
+    def from_user(cls, user: LocalUser) -> AuthenticatedUser:
+        """Project a LocalUser onto the fields kept in state.
+
+        Args:
+            user: The user to project.
+
+        Returns:
+            The projection, with id=-1 if the user has no id.
+        """
+        return cls(
+            id=user.id if user.id is not None else -1,
+            username=user.username,
+            enabled=user.enabled,
+        )
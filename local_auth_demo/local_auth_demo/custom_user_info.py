@@ -29,8 +29,8 @@ class MyLocalAuthState(reflex_local_auth.LocalAuthState):
 
 class MyRegisterState(reflex_local_auth.RegistrationState):
     @rx.event
-    def handle_registration_email(self, form_data: dict[str, Any]):
-        registration_result = self.handle_registration(form_data)
+    async def handle_registration_email(self, form_data: dict[str, Any]):
+        registration_result = await self.handle_registration(form_data)
         if self.new_user_id >= 0:
             with rx.session() as session:
                 session.add(
@@ -46,8 +46,8 @@ def index() -> rx.Component:
     )
 
 
-@rx.page()
-@reflex_local_auth.require_login
+@rx.page(on_load=reflex_local_auth.LoginState.check_login)
+@reflex_local_auth.require_login(redirect_on_load=True)
 def need2login():
     return rx.vstack(
         rx.heading(
@@ -66,7 +66,7 @@ class ProtectedState(reflex_local_auth.LocalAuthState):
     @rx.event
     def on_load(self):
         if not self.is_authenticated:
-            return reflex_local_auth.LoginState.redir
+            return reflex_local_auth.LoginState.check_login
         self.data = f"This is truly private data for {self.authenticated_user.username}"
 
     @rx.event
@@ -88,6 +88,7 @@ def protected():
 
 
 app = rx.App()
+app.register_lifespan_task(reflex_local_auth.reaper.reap_expired_sessions_task)
 app.add_page(
     reflex_local_auth.pages.login_page,
     route=reflex_local_auth.routes.LOGIN_ROUTE,
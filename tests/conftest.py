@@ -0,0 +1,93 @@
+"""Shared fixtures: a throwaway SQLite database and states outside of an app."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TypeVar
+
+import pytest
+
+# Before reflex loads its config, so auth queries use a scratch database.
+_DB_PATH = Path(tempfile.mkdtemp()) / "test.db"
+os.environ.setdefault("REFLEX_DB_URL", f"sqlite:///{_DB_PATH}")
+
+import reflex as rx  # noqa: E402
+import sqlmodel  # noqa: E402
+from reflex.istate.data import RouterData  # noqa: E402
+from reflex.model import get_engine  # noqa: E402
+from reflex.state import State  # noqa: E402
+from reflex_local_auth import LocalUser, batch, cache, hashers  # noqa: E402
+from sqlalchemy import Engine, event  # noqa: E402
+
+S = TypeVar("S", bound=rx.State)
+
+
+@pytest.fixture
+def database() -> Iterator[None]:
+    """Empty auth tables, with a cheap password hasher and no cache or batcher."""
+    engine = get_engine()
+    sqlmodel.SQLModel.metadata.drop_all(engine)
+    sqlmodel.SQLModel.metadata.create_all(engine)
+    default_hasher = hashers.get_password_hasher()
+    hashers.set_password_hasher(hashers.BcryptHasher(rounds=4))
+    yield
+    hashers.set_password_hasher(default_hasher)
+    cache.set_session_cache(None)
+    batch.set_session_batcher(None)
+
+
+@pytest.fixture
+def queries() -> Iterator[list[str]]:
+    """The SELECT statements executed during the test, on any engine."""
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(Engine, "before_cursor_execute", record)
+
+
+def create_user(username: str, password: str = "password", **fields) -> int:
+    """Insert a user with the current hasher.
+
+    Args:
+        username: The username.
+        password: The plaintext password.
+        **fields: Other LocalUser fields, like enabled or password_hash.
+
+    Returns:
+        The new user's id.
+    """
+    fields.setdefault("password_hash", LocalUser.hash_password(password))
+    fields.setdefault("enabled", True)
+    with rx.session() as session:
+        user = LocalUser(username=username, **fields)
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        assert user.id is not None
+        return user.id
+
+
+def new_state(state_cls: type[S], client_token: str = "client", path: str = "/") -> S:
+    """Create a state instance as if a client had connected.
+
+    Args:
+        state_cls: The substate to return.
+        client_token: The client token for the connection.
+        path: The current page path.
+
+    Returns:
+        The substate instance.
+    """
+    root = State(_reflex_internal_init=True)  # pyright: ignore[reportCallIssue]
+    root.router = RouterData.from_router_data(
+        {"token": client_token, "pathname": path, "asPath": path, "headers": {}}
+    )
+    return root.get_substate(state_cls.get_full_name().split("."))  # pyright: ignore[reportReturnType]
@@ -0,0 +1,112 @@
+"""Tests for the session batcher."""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import time
+
+import pytest
+from conftest import create_user, new_state
+from reflex_local_auth import AuthenticatedUser, LocalAuthState, batch, cache
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def log_in(user_id: int, *client_tokens: str) -> list[str]:
+    auth_tokens = []
+    for client_token in client_tokens:
+        state = new_state(LocalAuthState, client_token)
+        state._login(user_id)
+        auth_tokens.append(state.auth_token)
+    return auth_tokens
+
+
+def test_concurrent_lookups_share_a_query(queries: list[str]):
+    user_id = create_user("alice")
+    auth_tokens = log_in(user_id, "client-1", "client-2", "client-3")
+    batcher = batch.SessionBatcher()
+    queries.clear()
+
+    async def lookups():
+        return await asyncio.gather(
+            *(batcher.get(token) for token in [*auth_tokens, "unknown", "client-1"])
+        )
+
+    rows = asyncio.run(lookups())
+    assert [row[0] if row else None for row in rows] == [
+        user_id,
+        user_id,
+        user_id,
+        None,
+        user_id,
+    ]
+    assert len(queries) == 1
+    assert batcher.metrics.batches == 1
+    assert batcher.metrics.largest_batch == 4
+
+
+def test_full_batch_is_split(queries: list[str]):
+    user_id = create_user("alice")
+    auth_tokens = log_in(user_id, "client-1", "client-2", "client-3")
+    batcher = batch.SessionBatcher(max_batch_size=2)
+    queries.clear()
+    rows = batcher.resolve_many(auth_tokens)
+    assert set(rows) == set(auth_tokens)
+    assert len(queries) == 2
+
+
+def test_states_resolve_through_the_batcher(queries: list[str]):
+    user_id = create_user("alice")
+    auth_tokens = log_in(user_id, "client-1", "client-2")
+    batch.set_session_batcher(batch.SessionBatcher())
+    states = []
+    for i, auth_token in enumerate([*auth_tokens, "unknown"]):
+        state = new_state(LocalAuthState, f"tab-{i}")
+        state.auth_token = auth_token
+        states.append(state)
+    queries.clear()
+
+    async def lookups():
+        return await asyncio.gather(
+            *(state._aget_authenticated_user() for state in states)
+        )
+
+    users = asyncio.run(lookups())
+    assert [user.id for user in users] == [user_id, user_id, -1]
+    assert len(queries) == 1
+
+
+def test_prefetch_refreshes(queries: list[str]):
+    session_cache = cache.MemorySessionCache()
+    cache.set_session_cache(session_cache)
+    user_id = create_user("alice")
+    soon, later = log_in(user_id, "client-1", "client-2")
+    batcher = batch.SessionBatcher()
+    now = time.time()
+    batcher.schedule_refresh(soon, now + 60)
+    # Another tab with the same token refreshing later doesn't delay it.
+    batcher.schedule_refresh(soon, now + 3600)
+    batcher.schedule_refresh(later, now + 3600)
+    batcher.schedule_refresh("revoked", now)
+    session_cache.clear()
+    queries.clear()
+    # Within the default 10 seconds, only the revoked token is due.
+    assert asyncio.run(batcher.prefetch_refreshes()) == 0
+    assert session_cache.get("revoked") == AuthenticatedUser()
+    assert (
+        asyncio.run(batcher.prefetch_refreshes(within=datetime.timedelta(minutes=2)))
+        == 1
+    )
+    assert len(queries) == 2
+    assert session_cache.get(soon) == AuthenticatedUser(
+        id=user_id, username="alice", enabled=True
+    )
+    assert session_cache.get(later) is None
+
+
+def test_schedule_refresh_needs_a_cache():
+    batcher = batch.SessionBatcher()
+    batcher.schedule_refresh("token", time.time())
+    assert asyncio.run(batcher.prefetch_refreshes()) == 0
+    assert batcher.metrics.prefetched == 0
@@ -0,0 +1,58 @@
+"""Tests for bulk user import."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+import reflex as rx
+from reflex.model import get_engine
+from reflex_local_auth import LocalUser, bulk, hashers
+from sqlmodel import select
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+class ImportInterruptedError(Exception):
+    pass
+
+
+def usernames() -> list[str]:
+    with rx.session() as session:
+        return sorted(session.exec(select(LocalUser.username)).all())
+
+
+def test_import_resumes_from_checkpoint(tmp_path: Path):
+    password_hash = hashers.get_password_hasher().hash("password").decode()
+    records = [
+        {"username": f"user{i}", "password_hash": password_hash} for i in range(5)
+    ]
+    records.append({"username": "user5", "password": "plaintext"})
+    checkpoint = tmp_path / "import.checkpoint"
+
+    def interrupt(progress: bulk.ImportProgress) -> None:
+        raise ImportInterruptedError
+
+    with pytest.raises(ImportInterruptedError):
+        bulk.import_users(
+            get_engine(),
+            records,
+            batch_size=2,
+            max_workers=1,
+            checkpoint=checkpoint,
+            on_batch=interrupt,
+        )
+    # The first batch was committed before the interruption.
+    assert bulk.read_checkpoint(checkpoint) == 2
+    assert usernames() == ["user0", "user1"]
+
+    progress = bulk.import_users(
+        get_engine(), records, batch_size=2, max_workers=1, checkpoint=checkpoint
+    )
+    assert progress.records == 6
+    assert progress.inserted == 4
+    # Resumed past the first batch rather than skipping its users as existing.
+    assert progress.skipped_existing == 0
+    assert progress.hashed == 1
+    assert bulk.read_checkpoint(checkpoint) == 6
+    assert usernames() == [f"user{i}" for i in range(6)]
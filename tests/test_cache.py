@@ -0,0 +1,178 @@
+"""Tests for the session caches."""
+
+from __future__ import annotations
+
+import datetime
+
+import pytest
+from conftest import create_user, new_state
+from reflex_local_auth import AuthenticatedUser, LocalAuthState, cache
+
+ALICE = AuthenticatedUser(id=1, username="alice", enabled=True)
+
+
+def in_one_day() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
+
+
+def test_get_and_set():
+    session_cache = cache.MemorySessionCache()
+    assert session_cache.get("token") is None
+    session_cache.set("token", ALICE, in_one_day())
+    assert session_cache.get("token") is ALICE
+    assert (session_cache.hits, session_cache.misses) == (1, 1)
+
+
+def test_ttl_is_capped_by_session_expiration():
+    session_cache = cache.MemorySessionCache(ttl=datetime.timedelta(hours=1))
+    expired = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+        seconds=1
+    )
+    session_cache.set("token", ALICE, expired)
+    assert session_cache.get("token") is None
+    # SQLite returns expirations without a timezone; they are UTC.
+    session_cache.set("token", ALICE, in_one_day().replace(tzinfo=None))
+    assert session_cache.get("token") is ALICE
+
+
+def test_least_recently_used_is_evicted():
+    session_cache = cache.MemorySessionCache(max_size=2)
+    for token in ("a", "b"):
+        session_cache.set(token, ALICE, in_one_day())
+    session_cache.get("a")
+    session_cache.set("c", ALICE, in_one_day())
+    assert session_cache.get("b") is None
+    assert session_cache.get("a") is ALICE
+    assert session_cache.get("c") is ALICE
+
+
+def test_invalidate():
+    session_cache = cache.MemorySessionCache()
+    session_cache.set("a", ALICE, in_one_day())
+    session_cache.set("b", ALICE, in_one_day())
+    session_cache.invalidate("a")
+    assert session_cache.get("a") is None
+    assert session_cache.get("b") is ALICE
+    session_cache.clear()
+    assert len(session_cache) == 0
+
+
+@pytest.mark.usefixtures("database")
+def test_authenticated_user_is_cached(queries: list[str]):
+    cache.set_session_cache(cache.MemorySessionCache())
+    user_id = create_user("alice")
+    state = new_state(LocalAuthState, "client-1")
+    state._login(user_id)
+    queries.clear()
+    for _ in range(3):
+        user = new_state(LocalAuthState, "client-1")
+        user.auth_token = state.auth_token
+        assert user._get_authenticated_user().id == user_id
+    assert len(queries) == 1
+
+
+@pytest.mark.usefixtures("database")
+def test_logout_invalidates(queries: list[str]):
+    session_cache = cache.MemorySessionCache()
+    cache.set_session_cache(session_cache)
+    user_id = create_user("alice")
+    state = new_state(LocalAuthState, "client-1")
+    state._login(user_id)
+    assert state._get_authenticated_user().id == user_id
+    state.do_logout()
+    assert session_cache._get(state.auth_token) is None
+    queries.clear()
+    # Another tab sharing the auth_token sees the logout right away.
+    other_tab = new_state(LocalAuthState, "client-2")
+    other_tab.auth_token = state.auth_token
+    assert other_tab._get_authenticated_user().id == -1
+    assert len(queries) == 1
+
+
+@pytest.fixture
+def redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeRedis()
+
+
+def test_redis_cache_is_shared(redis):
+    worker_1 = cache.RedisSessionCache(redis=redis)
+    worker_2 = cache.RedisSessionCache(redis=redis)
+    worker_1.set("token", ALICE, in_one_day())
+    assert worker_2.get("token") == ALICE
+    # Expires in Redis with the session, not only in the local LRU.
+    assert 0 < redis.pttl(f"{cache.DEFAULT_REDIS_KEY_PREFIX}token") <= 60_000
+
+
+def test_redis_cache_invalidation_reaches_other_workers(redis):
+    worker_1 = cache.RedisSessionCache(redis=redis)
+    worker_2 = cache.RedisSessionCache(redis=redis)
+    worker_1.set("token", ALICE, in_one_day())
+    assert worker_2.get("token") == ALICE
+    subscriber = redis.pubsub(ignore_subscribe_messages=True)
+    subscriber.subscribe(worker_1.channel)
+    subscriber.get_message(timeout=1)  # The subscription confirmation.
+    worker_1.invalidate("token")
+    message = subscriber.get_message(timeout=1)
+    assert message is not None
+    # Delivered to worker_2's listener, it drops the local copy.
+    worker_2._on_invalidate(message)
+    assert worker_2.get("token") is None
+    assert worker_1.get("token") is None
+
+
+def test_redis_cache_rejections_are_local(redis):
+    worker_1 = cache.RedisSessionCache(redis=redis)
+    worker_2 = cache.RedisSessionCache(redis=redis)
+    worker_1.reject("unknown")
+    assert worker_1.get("unknown") == AuthenticatedUser()
+    assert worker_2.get("unknown") is None
+    assert not list(redis.scan_iter(match=f"{cache.DEFAULT_REDIS_KEY_PREFIX}unknown"))
+
+
+def test_rejected_token_is_remembered_for_negative_ttl():
+    session_cache = cache.MemorySessionCache(negative_ttl=datetime.timedelta(hours=1))
+    session_cache.reject("unknown")
+    assert session_cache.get("unknown") == AuthenticatedUser()
+    # Setting a user for the token replaces the rejection.
+    session_cache.set("unknown", ALICE, in_one_day())
+    assert session_cache.get("unknown") is ALICE
+    without_negative = cache.MemorySessionCache(negative_ttl=None)
+    without_negative.reject("unknown")
+    assert without_negative.get("unknown") is None
+
+
+def test_rejections_do_not_evict_users():
+    session_cache = cache.MemorySessionCache(max_size=1, negative_max_size=2)
+    session_cache.set("token", ALICE, in_one_day())
+    for i in range(5):
+        session_cache.reject(f"unknown-{i}")
+    assert session_cache.get("token") is ALICE
+    assert session_cache.get("unknown-0") is None
+    assert session_cache.get("unknown-4") == AuthenticatedUser()
+
+
+@pytest.mark.usefixtures("database")
+def test_unknown_token_queries_once(queries: list[str]):
+    cache.set_session_cache(cache.MemorySessionCache())
+    for client in ("client-1", "client-2", "client-3"):
+        state = new_state(LocalAuthState, client)
+        state.auth_token = "stale-token"
+        assert state._get_authenticated_user().id == -1
+    assert len(queries) == 1
+    # Clients without a token never query.
+    assert new_state(LocalAuthState, "client-4")._get_authenticated_user().id == -1
+    assert len(queries) == 1
+
+
+@pytest.mark.usefixtures("database")
+def test_login_clears_rejection():
+    cache.set_session_cache(cache.MemorySessionCache())
+    user_id = create_user("alice")
+    state = new_state(LocalAuthState, "client-1")
+    state.auth_token = "client-1"
+    assert state._get_authenticated_user().id == -1
+    # The token now has a session, which the negative entry must not hide.
+    state._login(user_id)
+    assert state.auth_token == "client-1"
+    assert state._get_authenticated_user().id == user_id
@@ -0,0 +1,56 @@
+"""Tests for the instrumentation hooks around password hashing."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import pytest
+from reflex_local_auth import LocalUser, hashers, instrumentation
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+class SpanRecorder(instrumentation.InstrumentationHook):
+    def __init__(self):
+        self.spans: list[tuple[str, dict[str, Any]]] = []
+
+    def span_ended(self, name, attributes, duration, context, error):
+        self.spans.append((name, attributes))
+
+
+@pytest.fixture
+def recorder():
+    hook = SpanRecorder()
+    instrumentation.add_hook(hook)
+    yield hook
+    instrumentation.remove_hook(hook)
+
+
+def test_no_hooks_skip_hash_cost(monkeypatch: pytest.MonkeyPatch):
+    def hash_cost(self, password_hash: bytes) -> int | None:
+        raise AssertionError("hash_cost called without hooks")
+
+    monkeypatch.setattr(hashers.BcryptHasher, "hash_cost", hash_cost)
+    password_hash = LocalUser.hash_password("password")
+    assert not instrumentation.enabled()
+    assert LocalUser(username="alice", password_hash=password_hash).verify("password")
+    assert asyncio.run(LocalUser.averify_hash("password", password_hash))
+    assert not asyncio.run(LocalUser.averify_dummy("password"))
+
+
+def test_verify_span_attributes(recorder: SpanRecorder):
+    password_hash = LocalUser.hash_password("password")
+    assert instrumentation.enabled()
+    assert asyncio.run(LocalUser.averify_hash("password", password_hash))
+    assert recorder.spans[-1] == (
+        instrumentation.SPAN_VERIFY_PASSWORD,
+        {"pool": True, "algorithm": "bcrypt", "cost": 4},
+    )
+
+
+def test_none_attributes_are_left_out(recorder: SpanRecorder):
+    # hash_cost() returns None for a malformed hash.
+    with instrumentation.span(instrumentation.SPAN_VERIFY_PASSWORD, cost=None):
+        pass
+    assert recorder.spans == [(instrumentation.SPAN_VERIFY_PASSWORD, {})]
@@ -0,0 +1,48 @@
+"""Tests for LocalAuthState."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Coroutine
+from typing import Any
+
+import pytest
+from conftest import create_user, new_state
+from reflex_local_auth import LocalAuthState, push
+
+
+def test_authenticated_user_dependencies():
+    # Router fields would recompute the var, and query, on every page change.
+    authenticated_user = LocalAuthState.computed_vars["authenticated_user"]
+    assert authenticated_user._deps(objclass=LocalAuthState) == {
+        LocalAuthState.get_full_name(): {"auth_token", "_primary_reads_until"}
+    }
+
+
+@pytest.fixture
+def scheduled(monkeypatch: pytest.MonkeyPatch):
+    """The refreshes scheduled during the test, with a client registry set."""
+    refreshes: list[str] = []
+
+    def schedule(coro: Coroutine[Any, Any, Any]) -> None:
+        refreshes.append(coro.__qualname__)
+        coro.close()
+
+    monkeypatch.setattr(push, "schedule", schedule)
+    push.set_client_registry(push.MemoryClientRegistry())
+    yield refreshes
+    push.set_client_registry(None)
+
+
+@pytest.mark.usefixtures("database")
+def test_logout_all_refreshes_other_tabs_once(scheduled: list[str]):
+    user_id = create_user("alice")
+    state = new_state(LocalAuthState, client_token="tab-1")
+    state._login(user_id)
+    push.register_client(state.auth_token, user_id, "tab-1")
+    push.register_client(state.auth_token, user_id, "tab-2")
+    scheduled.clear()
+    asyncio.run(state.do_logout_all())
+    # revoke_all_sessions refreshes every tab; do_logout_all adds no refresh.
+    assert scheduled == ["refresh_clients"]
+    assert state._get_authenticated_user().id < 0
@@ -0,0 +1,104 @@
+"""Tests for LoginState."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+import reflex as rx
+import reflex_local_auth
+from conftest import create_user, new_state
+from reflex.utils import console
+from reflex_base.registry import RegistrationContext
+from reflex_local_auth import LocalUser, LoginState, hashers
+from sqlmodel import select
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+class PageDataState(rx.State):
+    """Stands in for a page's own on_load data loading."""
+
+    rows: list[str] = []
+
+    @rx.event
+    def load(self):
+        self.rows = ["a", "b", "c"]
+
+
+def stored_hash(user_id: int) -> bytes:
+    with rx.session() as session:
+        return session.exec(
+            select(LocalUser.password_hash).where(LocalUser.id == user_id)
+        ).one()
+
+
+def log_in(username: str, password: str) -> LoginState:
+    state = new_state(LoginState, path="/login")
+    asyncio.run(state.on_submit({"username": username, "password": password}))
+    return state
+
+
+@pytest.mark.parametrize(
+    "old_hasher",
+    [hashers.BcryptHasher(rounds=5), hashers.ScryptHasher(ln=10)],
+    ids=["bcrypt-cost", "scrypt"],
+)
+def test_outdated_hash_is_upgraded_on_login(old_hasher: hashers.PasswordHasher):
+    user_id = create_user("alice", password_hash=old_hasher.hash("password"))
+    state = log_in("alice", "password")
+    assert state.error_message == ""
+    assert state._get_authenticated_user().id == user_id
+    password_hash = stored_hash(user_id)
+    # The default hasher in these tests is bcrypt with 4 rounds.
+    assert not hashers.needs_rehash(password_hash)
+    assert hashers.identify_hasher(password_hash).verify("password", password_hash)
+
+
+def test_current_hash_is_kept():
+    user_id = create_user("alice")
+    password_hash = stored_hash(user_id)
+    log_in("alice", "password")
+    assert stored_hash(user_id) == password_hash
+
+
+def test_wrong_password_does_not_rehash():
+    old_hash = hashers.BcryptHasher(rounds=5).hash("password")
+    user_id = create_user("alice", password_hash=old_hash)
+    state = log_in("alice", "wrong")
+    assert state.error_message
+    assert stored_hash(user_id) == old_hash
+
+
+@pytest.fixture
+def app():
+    context = RegistrationContext.ensure_context().fork()
+    token = RegistrationContext.set(context)
+    try:
+        yield rx.App()
+    finally:
+        RegistrationContext.reset(token)
+
+
+@reflex_local_auth.require_login(redirect_on_load=True)
+def check_login_page() -> rx.Component:
+    return rx.text("protected")
+
+
+@pytest.mark.parametrize(
+    ("on_load", "warned"),
+    [
+        (None, True),
+        (PageDataState.load, True),
+        (LoginState.check_login, False),
+        ([PageDataState.load, LoginState.check_login()], False),
+    ],
+)
+def test_redirect_on_load_warns_without_check_login(
+    app: rx.App, monkeypatch: pytest.MonkeyPatch, on_load, warned: bool
+):
+    warnings = []
+    monkeypatch.setattr(console, "warn", lambda msg, **kwargs: warnings.append(msg))
+    app.add_page(check_login_page, route="/protected", on_load=on_load)
+    check_login_page()
+    assert bool(warnings) == warned
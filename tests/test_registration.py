@@ -0,0 +1,63 @@
+"""Tests for RegistrationState."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+import pytest
+import reflex as rx
+from conftest import create_user, new_state
+from reflex_local_auth import LocalUser, RegistrationState, hashers
+from sqlmodel import select
+
+pytestmark = pytest.mark.usefixtures("database")
+
+
+def find_users(username: str) -> list[Any]:
+    with rx.session() as session:
+        return list(
+            session.exec(
+                select(LocalUser.id, LocalUser.enabled, LocalUser.password_hash).where(
+                    LocalUser.username == username
+                )
+            )
+        )
+
+
+def verify(password_hash: bytes, password: str) -> bool:
+    return hashers.identify_hasher(password_hash).verify(password, password_hash)
+
+
+def register(username: str, password: str = "password") -> RegistrationState:
+    state = new_state(RegistrationState)
+    asyncio.run(
+        state.handle_registration(
+            {
+                "username": username,
+                "password": password,
+                "confirm_password": password,
+            },
+        )
+    )
+    return state
+
+
+def test_register_user():
+    state = register("alice")
+    assert state.error_message == ""
+    [(user_id, enabled, password_hash)] = find_users("alice")
+    assert state.new_user_id == user_id
+    assert enabled
+    assert verify(password_hash, "password")
+
+
+def test_register_taken_username():
+    user_id = create_user("alice", "first")
+    state = register("alice", "second")
+    # The unique index rejects the INSERT, reported as the username being taken.
+    assert state.new_user_id == -1
+    assert state.error_message.startswith("Username alice is already registered")
+    [(existing_id, _, password_hash)] = find_users("alice")
+    assert existing_id == user_id
+    assert verify(password_hash, "first")
@@ -0,0 +1,114 @@
+"""Tests for the login rate limiters."""
+
+from __future__ import annotations
+
+import datetime
+
+import pytest
+from reflex_local_auth import throttle
+
+# Long enough that tests using the real clock stay within one window.
+WINDOW = datetime.timedelta(hours=1)
+W = WINDOW.total_seconds()
+# The start of a window, for both limiters' window numbering.
+START = 2000 * W
+
+
+@pytest.fixture(params=["memory", "redis"])
+def limiter(request) -> throttle.RateLimiter:
+    if request.param == "memory":
+        return throttle.MemoryRateLimiter(limit=3, window=WINDOW)
+    fakeredis = pytest.importorskip("fakeredis")
+    return throttle.RedisRateLimiter(
+        limit=3, window=WINDOW, redis=fakeredis.FakeRedis()
+    )
+
+
+def test_limit_within_window(limiter: throttle.RateLimiter):
+    assert [limiter._hit("alice", START + i) for i in range(4)] == [
+        True,
+        True,
+        True,
+        False,
+    ]
+    # Keys are counted separately.
+    assert limiter._hit("bob", START + 5)
+
+
+def test_sliding_window(limiter: throttle.RateLimiter):
+    for i in range(3):
+        assert limiter._hit("alice", START + i)
+    # Halfway into the next window, half of the previous window still counts:
+    # 1.5 attempts, so one more attempt is allowed, and a second at 2.5.
+    assert limiter._hit("alice", START + 1.5 * W)
+    assert limiter._hit("alice", START + 1.5 * W)
+    assert not limiter._hit("alice", START + 1.5 * W)
+    # Once the previous window has slid out entirely, only this window counts.
+    for _ in range(3):
+        assert limiter._hit("alice", START + 3 * W)
+    assert not limiter._hit("alice", START + 3 * W)
+
+
+def test_rejected_attempts_are_not_counted(limiter: throttle.RateLimiter):
+    for i in range(10):
+        limiter._hit("alice", START + i)
+    # Only the 3 allowed attempts carry over: 3 * 0.5 < 3.
+    assert limiter._hit("alice", START + 1.5 * W)
+
+
+def test_reset(limiter: throttle.RateLimiter):
+    for _ in range(3):
+        assert limiter.hit("alice")
+    assert not limiter.hit("alice")
+    limiter.reset("alice")
+    assert limiter.hit("alice")
+
+
+def test_hit_counts_rejections(limiter: throttle.RateLimiter):
+    for _ in range(5):
+        limiter.hit("alice")
+    assert limiter.rejected == 2
+
+
+def test_memory_limiter_evicts_least_recently_used():
+    limiter = throttle.MemoryRateLimiter(limit=1, window=WINDOW, max_keys=2)
+    assert limiter._hit("alice", START)
+    assert limiter._hit("bob", START)
+    assert limiter._hit("carol", START)
+    # alice was evicted, so her attempt is counted afresh.
+    assert limiter._hit("alice", START)
+    assert not limiter._hit("carol", START)
+
+
+@pytest.fixture
+def login_throttle():
+    throttle.set_login_throttle(
+        username_ip_limiter=throttle.MemoryRateLimiter(limit=2, window=WINDOW),
+        ip_limiter=throttle.MemoryRateLimiter(limit=5, window=WINDOW),
+    )
+    yield
+    throttle.set_login_throttle(
+        username_ip_limiter=throttle.MemoryRateLimiter(
+            limit=throttle.DEFAULT_USERNAME_IP_LIMIT
+        ),
+        ip_limiter=throttle.MemoryRateLimiter(limit=throttle.DEFAULT_IP_LIMIT),
+    )
+
+
+@pytest.mark.usefixtures("login_throttle")
+def test_username_limit_is_per_client_ip():
+    assert throttle.login_allowed("alice", "10.0.0.1")
+    assert throttle.login_allowed("alice", "10.0.0.1")
+    assert not throttle.login_allowed("alice", "10.0.0.1")
+    # Another address is not locked out.
+    assert throttle.login_allowed("alice", "10.0.0.2")
+    throttle.login_succeeded("alice", "10.0.0.1")
+    assert throttle.login_allowed("alice", "10.0.0.1")
+
+
+@pytest.mark.usefixtures("login_throttle")
+def test_ip_limit_spans_usernames():
+    for i in range(5):
+        assert throttle.login_allowed(f"user{i}", "10.0.0.1")
+    assert not throttle.login_allowed("user5", "10.0.0.1")
+    assert throttle.login_allowed("user5", "10.0.0.2")
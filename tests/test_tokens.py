@@ -0,0 +1,170 @@
+"""Tests for signed auth tokens."""
+
+from __future__ import annotations
+
+import datetime
+import time
+
+import pytest
+from reflex_local_auth import tokens
+
+
+def in_one_day() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
+
+
+@pytest.fixture(params=["memory", "redis"])
+def revocation_list(request) -> tokens.RevocationList:
+    if request.param == "memory":
+        return tokens.MemoryRevocationList()
+    fakeredis = pytest.importorskip("fakeredis")
+    return tokens.RedisRevocationList(redis=fakeredis.FakeRedis())
+
+
+@pytest.fixture(autouse=True)
+def signing_keys(revocation_list: tokens.RevocationList):
+    tokens.configure_signed_tokens(
+        {"k1": "first-secret", "k2": "second-secret"},
+        current_key_id="k1",
+        revocation_list=revocation_list,
+    )
+    yield
+    tokens.configure_signed_tokens(None)
+
+
+def test_issue_and_decode():
+    expiration = in_one_day()
+    token = tokens.issue_token(7, "alice", expiration)
+    assert tokens.is_signed_token(token)
+    claims = tokens.decode_token(token)
+    assert claims is not None
+    assert claims.user_id == 7
+    assert claims.username == "alice"
+    assert claims.key_id == "k1"
+    assert claims.expiration == datetime.datetime.fromtimestamp(
+        int(expiration.timestamp()), tz=datetime.timezone.utc
+    )
+    # Every token gets its own session id.
+    other = tokens.decode_token(tokens.issue_token(7, "alice", expiration))
+    assert other is not None
+    assert other.session_id != claims.session_id
+
+
+def test_session_id_is_not_signed_token():
+    assert not tokens.is_signed_token("c3b1a2d4-client-token")
+    assert tokens.decode_token("c3b1a2d4-client-token") is None
+
+
+@pytest.mark.parametrize("part", [1, 2, 3])
+def test_tampered_token_rejected(part: int):
+    token = tokens.issue_token(7, "alice", in_one_day())
+    parts = token.split(".")
+    parts[part] = parts[part][:-2] + ("AA" if parts[part][-2:] != "AA" else "BB")
+    assert tokens.decode_token(".".join(parts)) is None
+
+
+def test_forged_payload_rejected():
+    token = tokens.issue_token(7, "alice", in_one_day())
+    admin = tokens.issue_token(1, "admin", in_one_day())
+    version, key_id, _, signature = token.split(".")
+    forged_payload = admin.split(".")[2]
+    assert (
+        tokens.decode_token(f"{version}.{key_id}.{forged_payload}.{signature}") is None
+    )
+
+
+@pytest.mark.parametrize("token", ["", "v1", "v1.k1.payload", "v1.k1.a.b.c"])
+def test_malformed_token_rejected(token: str):
+    assert tokens.decode_token(token) is None
+
+
+def test_expired_token_rejected():
+    expired = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+        seconds=1
+    )
+    assert tokens.decode_token(tokens.issue_token(7, "alice", expired)) is None
+
+
+def test_unknown_key_rejected(revocation_list: tokens.RevocationList):
+    token = tokens.issue_token(7, "alice", in_one_day())
+    tokens.configure_signed_tokens(
+        {"k2": "second-secret"}, revocation_list=revocation_list
+    )
+    assert tokens.decode_token(token) is None
+
+
+def test_key_rotation(revocation_list: tokens.RevocationList):
+    old_token = tokens.issue_token(7, "alice", in_one_day())
+    # Rotate: sign with k2, keep accepting k1 until its tokens expire.
+    tokens.configure_signed_tokens(
+        {"k1": "first-secret", "k2": "second-secret"},
+        current_key_id="k2",
+        revocation_list=revocation_list,
+    )
+    new_token = tokens.issue_token(7, "alice", in_one_day())
+    new_claims = tokens.decode_token(new_token)
+    assert new_claims is not None
+    assert new_claims.key_id == "k2"
+    old_claims = tokens.decode_token(old_token)
+    assert old_claims is not None
+    assert old_claims.key_id == "k1"
+    # Retire k1.
+    tokens.configure_signed_tokens(
+        {"k2": "second-secret"}, revocation_list=revocation_list
+    )
+    assert tokens.decode_token(old_token) is None
+    assert tokens.decode_token(new_token) is not None
+
+
+def test_same_key_id_with_another_secret_rejected(
+    revocation_list: tokens.RevocationList,
+):
+    token = tokens.issue_token(7, "alice", in_one_day())
+    tokens.configure_signed_tokens(
+        {"k1": "replaced-secret"}, revocation_list=revocation_list
+    )
+    assert tokens.decode_token(token) is None
+
+
+@pytest.mark.parametrize(
+    ("keys", "current_key_id"),
+    [({"": "secret"}, None), ({"k.1": "secret"}, None), ({"k1": "secret"}, "k2")],
+)
+def test_invalid_configuration(keys: dict[str, str | bytes], current_key_id):
+    with pytest.raises(ValueError):
+        tokens.configure_signed_tokens(keys, current_key_id=current_key_id)
+
+
+def test_issue_without_keys():
+    tokens.configure_signed_tokens(None)
+    assert not tokens.signed_tokens_enabled()
+    with pytest.raises(RuntimeError):
+        tokens.issue_token(7, "alice", in_one_day())
+
+
+def test_revoke_token():
+    token = tokens.issue_token(7, "alice", in_one_day())
+    other = tokens.issue_token(7, "alice", in_one_day())
+    tokens.revoke_token(token)
+    assert tokens.decode_token(token) is None
+    assert tokens.decode_token(other) is not None
+
+
+def test_revoke_user_tokens():
+    token = tokens.issue_token(7, "alice", in_one_day())
+    other_user = tokens.issue_token(8, "bob", in_one_day())
+    tokens.revoke_user_tokens(7)
+    assert tokens.decode_token(token) is None
+    assert tokens.decode_token(other_user) is not None
+    # Tokens issued after the revocation, like after logging in again, work.
+    time.sleep(0.01)
+    assert tokens.decode_token(tokens.issue_token(7, "alice", in_one_day()))
+
+
+def test_revoke_user_keeps_latest_not_before(revocation_list: tokens.RevocationList):
+    now = time.time()
+    expiration = in_one_day()
+    revocation_list.revoke_user(7, not_before=now, expiration=expiration)
+    revocation_list.revoke_user(7, not_before=now - 60, expiration=expiration)
+    assert revocation_list.user_not_before(7) == pytest.approx(now)
+    assert revocation_list.user_not_before(8) == 0